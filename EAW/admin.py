@@ -8,14 +8,17 @@ from .forms import CategoryAdminForm, ItemAdminForm, ReviewDayAdminForm
 from django.core.exceptions import ValidationError
 from django.contrib import messages
 from django.utils.html import format_html
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404
-from .translate import baidu_translate, check_api_keys
+from .translate import abaidu_translate, check_api_keys
 from django.template.response import TemplateResponse
 import re
 import logging
 import difflib
-from .utils import fetch_and_merge_translation
+from .utils import merge_translation
+from .asyncviews import aget_user
+from .review import sync_review_schedule, rebuild_review_schedule
+from .search import search_items
 
 logger = logging.getLogger(__name__)
 
@@ -165,6 +168,23 @@ class ItemAdmin(BaseAdmin):
             return qs.filter(user=request.user)  # 普通用户只能看到自己创建的条目
         return qs  # 超级用户可以看到所有条目
 
+    def get_search_results(self, request, queryset, search_term):
+        """
+        通过搜索索引查找 item 和 content，代替默认的逐行 LIKE 扫描。
+        """
+        if not search_term.strip():
+            return queryset, False
+        user = None if request.user.is_superuser else request.user
+        return queryset.filter(id__in=search_items(user, search_term)), False
+
+    def save_model(self, request, obj, form, change):
+        """
+        新建条目或修改 initDate 后，重新生成该条目的复习到期记录。
+        """
+        super().save_model(request, obj, form, change)
+        if not change or 'initDate' in form.changed_data:
+            sync_review_schedule(obj.user, [obj])
+
     # 添加翻译按钮
     def get_translate_button(self, obj):
         if obj.category.name == "单词":
@@ -183,17 +203,29 @@ class ItemAdmin(BaseAdmin):
         ]
         return custom_urls + urls
     
-    def translate_item(self, request, item_id):
+    async def translate_item(self, request, item_id):
         """
         调用翻译函数，逐行比较释义并合并新内容。
+        async 视图：等待百度接口响应时不占用线程，条目的读取和保存使用异步 ORM。
         """
         logger.debug(f"Received item_id: {item_id}")
-        item = get_object_or_404(Item, id=item_id)
+        # 该地址没有经过 admin_site.admin_view，需要自行检查权限：普通用户只能翻译自己的条目
+        user = await aget_user(request)
+        if not (user.is_active and user.is_staff):
+            return JsonResponse({"success": False, "message": "没有权限。"}, status=403)
+        items = Item.objects.select_related('category')
+        if not user.is_superuser:
+            items = items.filter(user=user)
+        try:
+            item = await items.aget(id=item_id)
+        except Item.DoesNotExist:
+            raise Http404("Item not found")
         if item.category.name != "单词":
             return JsonResponse({"success": False, "message": "当前类别不是 '单词'，无法翻译。"})
 
-        # 使用工具函数来获取和合并翻译
-        updated_content, src_tts, phonetic_am, phonetic_en = fetch_and_merge_translation(item.item, item.content)
+        # 获取释义并与现有内容合并
+        result = await abaidu_translate(item.item)
+        updated_content, src_tts, phonetic_am, phonetic_en = merge_translation(result, item.content)
 
         if not updated_content:
             return JsonResponse({"success": False, "message": "翻译失败，请稍后重试。"})
@@ -203,7 +235,7 @@ class ItemAdmin(BaseAdmin):
         item.src_tts = src_tts
         item.us_phonetic = phonetic_am
         item.uk_phonetic = phonetic_en
-        item.save()
+        await item.asave()
 
         # 返回结果
         return JsonResponse({
@@ -248,6 +280,24 @@ class ReviewDayAdmin(BaseAdmin):
             return qs  # 超级用户可以看到所有复习天
         return qs.filter(user=request.user)  # 普通用户只能看到自己创建的复习天
 
+    def save_model(self, request, obj, form, change):
+        """
+        复习曲线改变后，重建该用户的复习到期记录。
+        """
+        super().save_model(request, obj, form, change)
+        rebuild_review_schedule(obj.user)
+
+    def delete_model(self, request, obj):
+        user = obj.user
+        super().delete_model(request, obj)
+        rebuild_review_schedule(user)
+
+    def delete_queryset(self, request, queryset):
+        users = {review_day.user for review_day in queryset.select_related('user')}
+        super().delete_queryset(request, queryset)
+        for user in users:
+            rebuild_review_schedule(user)
+
 
 # 注册所有模型到admin
 admin.site.register(Category, CategoryAdmin)
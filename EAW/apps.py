@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class EawConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "EAW"
+
+    def ready(self):
+        # 注册信号处理函数
+        from . import signals
+        # 注册数据库连接的计时钩子（请求指标）
+        from . import metrics
@@ -0,0 +1,38 @@
+# asyncviews.py
+
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+
+# Django 5.0 之前 login_required、csrf_exempt 等装饰器不支持 async 视图（会把视图变成返回协程的同步函数），
+# 这里提供 async 视图使用的等价实现。
+
+
+async def aget_user(request):
+    """
+    返回当前用户。request.user 是惰性对象，第一次访问时查询会话和用户表，需要在同步线程中完成；
+    之后在 async 代码中可以直接使用 request.user。
+    """
+    await sync_to_async(lambda: request.user.is_authenticated)()
+    return request.user
+
+
+def async_login_required(view_func):
+    """
+    async 视图的 login_required：未登录时重定向到登录页面。
+    """
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def async_csrf_exempt(view_func):
+    """
+    async 视图的 csrf_exempt：CsrfViewMiddleware 只检查视图的 csrf_exempt 属性。
+    """
+    view_func.csrf_exempt = True
+    return view_func
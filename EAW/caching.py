@@ -0,0 +1,100 @@
+# caching.py
+
+import hashlib
+import time
+from functools import wraps
+import environ
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.timezone import localdate
+
+env = environ.Env()
+
+# 按用户缓存的页面的有效期（秒），条目、类别、复习曲线或账号信息变化后立即失效
+USER_VIEW_CACHE_TIMEOUT = env.int('USER_VIEW_CACHE_TIMEOUT', default=600)
+
+
+def _version_key(user_id):
+    return f"user-cache-version:{user_id}"
+
+
+def _new_version():
+    # 版本号键被淘汰后重新生成时，使用时间戳避免与旧版本号重复而读到过期数据
+    return int(time.time() * 1000)
+
+
+def user_cache_version(user_id):
+    """
+    返回用户当前的缓存版本号。所有按用户缓存的数据都带上这个版本号，版本号改变后旧数据自然失效。
+    """
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        cache.add(_version_key(user_id), _new_version(), None)
+        version = cache.get(_version_key(user_id), _new_version())
+    return version
+
+
+def invalidate_user_cache(user_id):
+    """
+    用户的条目、类别、复习曲线或账号信息发生变化后调用，使该用户的所有缓存（包括缓存的页面）失效。
+    """
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), _new_version(), None)
+
+
+def cached_for_user(user_id, name, compute, timeout=3600):
+    """
+    读取按用户缓存的数据，未命中时调用 compute() 计算并缓存。
+    """
+    key = f"user-cache:{user_id}:{user_cache_version(user_id)}:{name}"
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+
+def _view_cache_key(request, name):
+    # 页面中的 CSRF 令牌由 Cookie 中的密钥生成，不同会话不能共用；日期影响首页的天数和到期数量
+    parts = [
+        name,
+        localdate().isoformat(),
+        request.get_full_path(),
+        request.headers.get('x-requested-with', ''),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    ]
+    digest = hashlib.md5("\n".join(parts).encode('utf-8')).hexdigest()
+    return f"user-view:{request.user.pk}:{user_cache_version(request.user.pk)}:{digest}"
+
+
+def cached_per_user(name, timeout=None):
+    """
+    按用户缓存 GET 请求的完整响应，键中带有用户的缓存版本号，用户的数据变化后旧页面自然失效。
+    以下情况不使用缓存：未登录、非 GET/HEAD 请求、还没有 CSRF Cookie（页面中的令牌会随响应设置新的 Cookie）、
+    有待显示的消息。缓存的响应带有 ETag 时，命中后仍按 If-None-Match 返回 304。
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (
+                request.method not in ('GET', 'HEAD')
+                or not request.user.is_authenticated
+                or settings.CSRF_COOKIE_NAME not in request.COOKIES
+                or request.session.get('_messages')
+            ):
+                return view(request, *args, **kwargs)
+
+            key = _view_cache_key(request, name)
+            response = cache.get(key)
+            if response is not None:
+                return get_conditional_response(request, etag=response.get('ETag'), response=response)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                cache.set(key, response, USER_VIEW_CACHE_TIMEOUT if timeout is None else timeout)
+            return response
+        return wrapper
+    return decorator
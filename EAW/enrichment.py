@@ -0,0 +1,167 @@
+# enrichment.py
+
+import logging
+from datetime import timedelta
+import environ
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils.timezone import now
+from .models import EnrichmentJob, Item
+from .translate import batch_translate, TranslationError
+from .utils import append_translation, merge_translation
+
+logger = logging.getLogger(__name__)
+
+env = environ.Env()
+
+# 为 True 时录入和导入只保存条目并创建任务，释义由 manage.py run_enrichment_worker 在后台获取；
+# 默认在请求中直接获取，开启前需要先运行 worker（容器中设置 SERVER_MODE=worker），否则任务不会被处理
+ENRICHMENT_IN_BACKGROUND = env.bool('ENRICHMENT_IN_BACKGROUND', default=False)
+# 每个用户同时处理中的任务上限，避免一次大批量导入占满 worker
+ENRICHMENT_PER_USER_LIMIT = env.int('ENRICHMENT_PER_USER_LIMIT', default=20)
+# 第 n 次失败后等待 base * 2^(n-1) 秒再重试
+ENRICHMENT_RETRY_BASE = env.int('ENRICHMENT_RETRY_BASE', default=30)
+# 处理中超过这么多秒仍未完成的任务视为 worker 已退出，重新放回队列
+ENRICHMENT_STALE_SECONDS = env.int('ENRICHMENT_STALE_SECONDS', default=600)
+
+
+def with_primary_keys(user, items):
+    """
+    MySQL 等数据库的 bulk_create 不回填主键，此时取回该用户最新插入的同样数量的条目。
+    """
+    if all(item.pk is not None for item in items):
+        return items
+    return list(reversed(Item.objects.filter(user=user).order_by('-id')[:len(items)]))
+
+
+def enqueue_enrichment(user, items, mode=EnrichmentJob.APPEND):
+    """
+    为新保存的条目创建获取释义的任务，返回创建的任务列表。
+    """
+    items = with_primary_keys(user, list(items))
+    return EnrichmentJob.objects.bulk_create(
+        [EnrichmentJob(user=user, item=item, mode=mode) for item in items],
+        batch_size=1000,
+    )
+
+
+def job_status_counts(user):
+    """
+    返回用户各状态的任务数量，用于前端轮询。
+    """
+    counts = {status: 0 for status, label in EnrichmentJob.STATUS_CHOICES}
+    for row in EnrichmentJob.objects.filter(user=user).values('status').annotate(count=Count('id')):
+        counts[row['status']] = row['count']
+    return counts
+
+
+def requeue_stale_jobs():
+    """
+    将超时仍处于 running 状态的任务放回队列（worker 异常退出时）；领取时已计入一次尝试，
+    重试次数用尽的任务转入 dead 状态，避免反复导致 worker 退出的任务被无限重试。返回放回队列的任务数。
+    """
+    deadline = now() - timedelta(seconds=ENRICHMENT_STALE_SECONDS)
+    stale = EnrichmentJob.objects.filter(status=EnrichmentJob.RUNNING, locked_at__lt=deadline)
+    dead = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=EnrichmentJob.DEAD, locked_at=None, last_error="worker 超时未完成", updated_at=now()
+    )
+    if dead:
+        logger.warning(f"{dead} stale enrichment jobs dead after reaching max attempts")
+    return stale.filter(attempts__lt=F('max_attempts')).update(
+        status=EnrichmentJob.PENDING, locked_at=None, updated_at=now()
+    )
+
+
+def claim_jobs(limit, per_user_limit=ENRICHMENT_PER_USER_LIMIT):
+    """
+    领取最多 limit 个到期的任务并标记为 running，每个用户同时处理的任务不超过 per_user_limit。
+    通过带状态条件的 UPDATE 领取，多个 worker 同时运行也不会重复处理同一个任务。
+    """
+    running = dict(
+        EnrichmentJob.objects.filter(status=EnrichmentJob.RUNNING)
+        .values('user_id').annotate(count=Count('id')).values_list('user_id', 'count')
+    )
+    candidates = (
+        EnrichmentJob.objects.filter(status=EnrichmentJob.PENDING, run_after__lte=now())
+        .order_by('id').values_list('id', 'user_id')[:limit * 10]
+    )
+
+    claimed_ids = []
+    for job_id, user_id in candidates:
+        if len(claimed_ids) >= limit:
+            break
+        if running.get(user_id, 0) >= per_user_limit:
+            continue
+        claimed = EnrichmentJob.objects.filter(id=job_id, status=EnrichmentJob.PENDING).update(
+            status=EnrichmentJob.RUNNING, locked_at=now(), attempts=F('attempts') + 1, updated_at=now()
+        )
+        if claimed:
+            claimed_ids.append(job_id)
+            running[user_id] = running.get(user_id, 0) + 1
+
+    return list(EnrichmentJob.objects.filter(id__in=claimed_ids).select_related('item'))
+
+
+def _apply(job, result):
+    """
+    按任务模式把释义写入条目，只更新释义相关的字段。没有释义（如输入为中文）时保持条目不变。
+    """
+    if not result:
+        return
+    item = job.item
+    if job.mode == EnrichmentJob.MERGE:
+        content, src_tts, phonetic_am, phonetic_en = merge_translation(result, item.content)
+    else:
+        content, src_tts, phonetic_am, phonetic_en = append_translation(item.content or '', result)
+    item.content = content
+    item.src_tts = src_tts
+    item.us_phonetic = phonetic_am
+    item.uk_phonetic = phonetic_en
+    item.save(update_fields=['content', 'src_tts', 'us_phonetic', 'uk_phonetic', 'updated_at'])
+
+
+def _fail(job, error):
+    """
+    记录失败原因；还有重试次数时按指数退避延后，否则转入 dead 状态。
+    """
+    job.last_error = str(error)
+    job.locked_at = None
+    if job.attempts >= job.max_attempts:
+        job.status = EnrichmentJob.DEAD
+        logger.warning(f"Enrichment job {job.pk} dead after {job.attempts} attempts: {error}")
+    else:
+        job.status = EnrichmentJob.PENDING
+        job.run_after = now() + timedelta(seconds=ENRICHMENT_RETRY_BASE * 2 ** (job.attempts - 1))
+    job.save(update_fields=['status', 'last_error', 'locked_at', 'run_after', 'updated_at'])
+
+
+def process_jobs(jobs):
+    """
+    批量获取释义并写入条目，返回 (成功数, 失败数)。
+    """
+    results = batch_translate([job.item.item for job in jobs], return_exceptions=True)
+    done = failed = 0
+    for job, result in zip(jobs, results):
+        try:
+            if isinstance(result, TranslationError):
+                raise result
+            with transaction.atomic():
+                _apply(job, result)
+                job.status = EnrichmentJob.DONE
+                job.locked_at = None
+                job.last_error = ''
+                job.save(update_fields=['status', 'locked_at', 'last_error', 'updated_at'])
+            done += 1
+        except Exception as e:
+            _fail(job, e)
+            failed += 1
+    return done, failed
+
+
+def purge_finished_jobs(days):
+    """
+    删除 days 天前已完成的任务。
+    """
+    return EnrichmentJob.objects.filter(
+        status=EnrichmentJob.DONE, updated_at__lt=now() - timedelta(days=days)
+    ).delete()[0]
@@ -0,0 +1,119 @@
+# events.py
+
+import atexit
+import logging
+import os
+import threading
+import environ
+from django.db import close_old_connections, connection, transaction
+from .caching import invalidate_user_cache
+from .models import ReviewEvent
+
+logger = logging.getLogger(__name__)
+
+env = environ.Env()
+
+# 为 True 时复习记录先放入进程内缓冲区，由后台线程批量写入；为 False 时在请求中直接写入。
+# 未设置时 SQLite 直接写入：SQLite 只允许一个写入者，后台线程写入会与请求中的事务互相锁住
+REVIEW_EVENT_BUFFERED = env.bool('REVIEW_EVENT_BUFFERED', default=None)
+# 缓冲区达到这么多条时立即写入
+REVIEW_EVENT_FLUSH_SIZE = env.int('REVIEW_EVENT_FLUSH_SIZE', default=200)
+# 缓冲区中的记录最多等待这么多毫秒后写入
+REVIEW_EVENT_FLUSH_MS = env.int('REVIEW_EVENT_FLUSH_MS', default=2000)
+
+# 反馈操作对应的记录类型
+EVENT_ACTIONS = {
+    'yes': ReviewEvent.YES,
+    'no': ReviewEvent.NO,
+    'reset': ReviewEvent.RESET,
+}
+
+
+class EventBuffer:
+    """
+    进程内的复习记录缓冲区。add 只把记录放入列表，由后台线程在达到 flush_size 条
+    或等待 flush_ms 毫秒后用一条 bulk_create 写入，使用缓冲区时反馈接口不因记录日志增加查询。
+    进程退出时写入剩余的记录；进程异常终止时缓冲区中的记录会丢失。
+    """
+
+    def __init__(self, flush_size, flush_ms):
+        self.flush_size = flush_size
+        self.flush_seconds = flush_ms / 1000
+        self._events = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._pid = None
+
+    def add(self, events):
+        with self._condition:
+            self._ensure_thread()
+            self._events.extend(events)
+            if len(self._events) >= self.flush_size:
+                self._condition.notify()
+
+    def _ensure_thread(self):
+        # gunicorn 等预先 fork 的服务器中，每个 worker 进程启动自己的线程
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        self._pid = os.getpid()
+        self._events = []
+        self._thread = threading.Thread(target=self._run, name='review-event-writer', daemon=True)
+        self._thread.start()
+
+    def _take(self):
+        with self._condition:
+            events, self._events = self._events, []
+        return events
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if len(self._events) < self.flush_size:
+                    self._condition.wait(self.flush_seconds)
+            self.flush()
+
+    def flush(self):
+        """
+        立即写入缓冲区中的记录，返回写入的条数。
+        """
+        events = self._take()
+        if not events:
+            return 0
+        close_old_connections()
+        try:
+            ReviewEvent.objects.bulk_create(events, batch_size=1000)
+        except Exception:
+            logger.exception(f"Failed to write {len(events)} review events")
+            return 0
+        # 复习日历等按用户缓存的统计包含复习记录，写入后使其失效
+        for user_id in {event.user_id for event in events}:
+            invalidate_user_cache(user_id)
+        return len(events)
+
+
+_buffer = EventBuffer(REVIEW_EVENT_FLUSH_SIZE, REVIEW_EVENT_FLUSH_MS)
+atexit.register(_buffer.flush)
+
+
+def record_review_events(events):
+    """
+    记录复习反馈。
+    - 使用缓冲区时（REVIEW_EVENT_BUFFERED=True，未设置时 SQLite 以外的数据库），事务提交后才放入缓冲区，
+      回滚的反馈不会留下记录，反馈接口不增加查询
+    - 否则（未设置时的 SQLite，也是默认的数据库）在当前事务中直接用一条 bulk_create 写入，
+      每次反馈请求多一条 INSERT，随事务一起提交或回滚
+    """
+    if not events:
+        return
+    buffered = REVIEW_EVENT_BUFFERED if REVIEW_EVENT_BUFFERED is not None else connection.vendor != 'sqlite'
+    if buffered:
+        transaction.on_commit(lambda: _buffer.add(events))
+    else:
+        ReviewEvent.objects.bulk_create(events, batch_size=1000)
+
+
+def flush_review_events():
+    """
+    立即写入缓冲区中的记录（管理命令和测试中使用）。
+    """
+    return _buffer.flush()
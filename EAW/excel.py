@@ -0,0 +1,298 @@
+# excel.py
+
+import csv
+import logging
+import tempfile
+from datetime import date, datetime
+import openpyxl
+from django.db import transaction
+from django.utils.dateparse import parse_date
+from django.utils.timezone import localdate
+from .models import Item, Category, Proficiency, EnrichmentJob
+from .enrichment import ENRICHMENT_IN_BACKGROUND, enqueue_enrichment, with_primary_keys
+from .caching import invalidate_user_cache
+from .review import sync_review_schedule
+from .search import index_items
+from .stats import update_user_stats, item_snapshot
+from .translate import batch_translate, cached_translations
+from .utils import merge_translation
+
+logger = logging.getLogger(__name__)
+
+# 导出文件的表头，导入时按同样的列名读取
+EXPORT_HEADERS = ["Item", "Content", "Input Date", "Init Date", "Proficiency", "Category", "TTS URL", "US Phonetic", "UK Phonetic"]
+# 每次从数据库读取的条目数量
+EXPORT_CHUNK_SIZE = 2000
+# 导入时每批写入数据库的条目数量
+IMPORT_BATCH_SIZE = 500
+# 导入结果中最多保留的错误信息条数
+IMPORT_MAX_ERRORS = 200
+
+# Proficiency 字段的映射
+PROFICIENCY_MAP = {
+    "Unfamiliar": Proficiency.UNFAMILIAR,
+    "Mastered": Proficiency.MASTERED,
+}
+
+
+def export_rows(user):
+    """
+    逐行生成用户数据，关联 category 分批读取，内存占用与条目数量无关。
+    """
+    items = (
+        Item.objects.filter(user=user)
+        .select_related('category')
+        .order_by('id')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for item in items:
+        yield [
+            item.item,
+            item.content,
+            item.inputDate,
+            item.initDate,
+            item.get_proficiency_display(),
+            item.category.name if item.category else "",
+            item.src_tts,
+            item.us_phonetic,
+            item.uk_phonetic,
+        ]
+
+
+def export_xlsx(user):
+    """
+    使用 openpyxl 的 write-only 模式写入临时文件并返回该文件，供 FileResponse 分块发送。
+    write-only 模式下每行写入后即落盘，不在内存中保留整个工作表。
+    xlsx 是 zip 格式，要等整个工作簿保存完才能开始发送，首字节时间仍随条目数量增长；
+    条目很多时应使用 export_csv 流式导出。
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("User Data")
+    sheet.append(EXPORT_HEADERS)
+    for row in export_rows(user):
+        sheet.append(row)
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+
+class _Echo:
+    """
+    csv.writer 需要一个带 write 方法的对象，这里直接返回写入的内容以便逐行输出。
+    """
+
+    def write(self, value):
+        return value
+
+
+def export_csv(user):
+    """
+    逐行生成 CSV 内容，用于 StreamingHttpResponse。开头加上 BOM 以便 Excel 正确识别中文。
+    """
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow(EXPORT_HEADERS)
+    for row in export_rows(user):
+        yield writer.writerow(row)
+
+
+def _to_date(value):
+    """
+    把单元格中的日期（datetime、date 或 YYYY-MM-DD 字符串）转换为 date，为空时返回今天。
+    """
+    if not value:
+        return localdate()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    parsed = parse_date(str(value).strip()[:10])
+    if parsed is None:
+        raise ValueError(f"无法识别的日期: {value}")
+    return parsed
+
+
+class ImportFormatError(Exception):
+    """
+    文件无法读取或缺少必要的列。
+    """
+
+
+class ImportResult:
+    """
+    导入结果：成功条数、错误条数，以及最多 IMPORT_MAX_ERRORS 条错误信息。
+    """
+
+    def __init__(self):
+        self.rows_processed = 0
+        self.success_count = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, message):
+        self.error_count += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append(message)
+        elif len(self.errors) == IMPORT_MAX_ERRORS:
+            self.errors.append("错误过多，其余错误未显示。")
+
+
+class _ItemImporter:
+    """
+    按批次写入导入的条目：批量插入、生成复习到期记录，并处理需要获取释义的条目。
+    """
+
+    def __init__(self, user, result, progress):
+        self.user = user
+        self.result = result
+        self.progress = progress
+        self.batch = []
+        self.enrich_indexes = []  # 需要获取释义的条目在当前批次中的位置
+
+    def add(self, item, fetch_definition):
+        if fetch_definition:
+            self.enrich_indexes.append(len(self.batch))
+        self.batch.append(item)
+        if len(self.batch) >= IMPORT_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.batch:
+            return
+        enrich_items = [self.batch[i] for i in self.enrich_indexes]
+        if enrich_items and not ENRICHMENT_IN_BACKGROUND:
+            # 同步模式：释义已在打开事务之前由 _prefetch_definitions 写入缓存，这里只读缓存，再与现有内容合并
+            results = cached_translations([item.item for item in enrich_items])
+            for item, translation_result in zip(enrich_items, results):
+                item.content, item.src_tts, item.us_phonetic, item.uk_phonetic = merge_translation(
+                    translation_result, item.content
+                )
+
+        Item.objects.bulk_create(self.batch)
+        sync_review_schedule(self.user, self.batch)
+        index_items(self.user, self.batch)
+        invalidate_user_cache(self.user.pk)
+        update_user_stats(self.user.pk, added=[item_snapshot(item) for item in self.batch])
+        if enrich_items and ENRICHMENT_IN_BACKGROUND:
+            created_items = with_primary_keys(self.user, self.batch)
+            enqueue_enrichment(self.user, [created_items[i] for i in self.enrich_indexes], EnrichmentJob.MERGE)
+
+        self.result.success_count += len(self.batch)
+        self.batch = []
+        self.enrich_indexes = []
+        logger.info(f"Import for user {self.user.pk}: {self.result.rows_processed} rows read, "
+                    f"{self.result.success_count} saved, {self.result.error_count} errors")
+        if self.progress:
+            self.progress(self.result)
+
+
+def _prefetch_definitions(sheet, column_index):
+    """
+    同步获取释义时，在打开导入事务之前先读一遍文件，把需要释义的条目按批请求百度接口并写入释义缓存。
+    避免事务打开期间等待网络请求（SQLite 上会一直占用写锁）。
+    """
+    item_index = column_index["Item"]
+    category_index = column_index.get("Category")
+    words = []
+    for row in sheet.iter_rows(min_row=2, values_only=True):
+        name = row[item_index] if item_index < len(row) else None
+        category = row[category_index] if category_index is not None and category_index < len(row) else None
+        # 与导入时相同，只有类别为“单词”的条目才获取释义
+        if name and category == "单词":
+            words.append(str(name))
+        if len(words) >= IMPORT_BATCH_SIZE:
+            batch_translate(words)
+            words = []
+    if words:
+        batch_translate(words)
+
+
+def import_items(user, file, fetch_definitions=False, progress=None):
+    """
+    以只读模式逐行读取 Excel 文件并分批导入，返回 ImportResult。
+    - 类别从预先加载的字典中查找，不存在时创建
+    - 每 IMPORT_BATCH_SIZE 行批量写入一次，全部在一个事务中完成，失败时整体回滚
+    - 同步获取释义时先在事务之外获取全部释义，事务中不发出网络请求
+    - progress(result) 在每批写入后调用，可用于报告进度。这时事务尚未提交，进度是暂时的：
+      导入失败时已报告的条目会全部回滚，调用方应在失败时清除进度
+    """
+    try:
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+        sheet = workbook.active
+        rows = sheet.iter_rows(values_only=True)
+        headers = list(next(rows, None) or [])
+    except Exception as e:
+        raise ImportFormatError(f"文件读取失败: {str(e)}")
+
+    if "Item" not in headers:
+        workbook.close()
+        raise ImportFormatError("文件格式错误，缺少必要的列。")
+
+    column_index = {header: index for index, header in reversed(list(enumerate(headers)))}
+    categories = {category.name: category for category in Category.objects.filter(user=user)}
+    result = ImportResult()
+    importer = _ItemImporter(user, result, progress)
+
+    def value(row, header, default=None):
+        index = column_index.get(header)
+        if index is None or index >= len(row):
+            return default
+        return row[index]
+
+    try:
+        if fetch_definitions and not ENRICHMENT_IN_BACKGROUND:
+            _prefetch_definitions(sheet, column_index)
+        with transaction.atomic():
+            for row_idx, row in enumerate(rows, start=2):
+                result.rows_processed += 1
+                try:
+                    item_name = value(row, "Item")
+                    if not item_name:
+                        result.add_error(f"第 {row_idx} 行缺少 Item 字段，已跳过。")
+                        continue
+
+                    # 替换 _x000D_ 字符为换行符，content 为 None 时赋空字符串
+                    content = value(row, "Content") or ""
+                    if content:
+                        content = str(content).replace("_x000D_", "\n")
+
+                    input_date = _to_date(value(row, "Input Date"))
+                    init_date = _to_date(value(row, "Init Date"))
+
+                    # 处理 Proficiency 字段
+                    proficiency_name = value(row, "Proficiency") or "Unfamiliar"
+                    proficiency_degree = PROFICIENCY_MAP.get(proficiency_name, Proficiency.UNFAMILIAR)
+
+                    # 获取分类对象，不存在时创建
+                    category = None
+                    category_name = value(row, "Category") or ""
+                    if category_name:
+                        category = categories.get(category_name)
+                        if category is None:
+                            category = Category.objects.create(name=category_name, user=user)
+                            categories[category_name] = category
+
+                    item = Item(
+                        user=user,
+                        item=item_name,
+                        content=content,
+                        inputDate=input_date,
+                        initDate=init_date,
+                        proficiency=proficiency_degree,
+                        category=category,
+                        src_tts="",
+                        us_phonetic="",
+                        uk_phonetic="",
+                    )
+                except Exception as e:
+                    result.add_error(f"第 {row_idx} 行处理失败: {str(e)}")
+                    continue
+
+                # 只有类别为“单词”的条目才获取释义
+                importer.add(item, fetch_definitions and category is not None and category.name == "单词")
+            importer.flush()
+    finally:
+        workbook.close()
+
+    return result
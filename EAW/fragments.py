@@ -0,0 +1,71 @@
+# fragments.py
+
+import hashlib
+import logging
+from time import perf_counter
+import environ
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from .models import Item
+
+logger = logging.getLogger(__name__)
+
+env = environ.Env()
+
+# 复习弹窗片段的缓存时间（秒）；键中包含 updated_at，条目修改后旧片段不会再被读取
+REVIEW_MODAL_CACHE_TIMEOUT = env.int('REVIEW_MODAL_CACHE_TIMEOUT', default=7 * 24 * 3600)
+# 一次请求最多获取的条目详情数量
+REVIEW_DETAILS_BATCH_LIMIT = 50
+
+
+def review_modal_key(item_id, updated_at):
+    return f"review-modal:{item_id}:{updated_at.timestamp()}"
+
+
+def review_item_versions(user, item_ids):
+    """
+    返回当前用户这些条目的 {id: updated_at}，不存在或不属于该用户的条目不在结果中。
+    """
+    return dict(Item.objects.filter(user=user, id__in=item_ids).values_list('id', 'updated_at'))
+
+
+def versions_etag(versions):
+    """
+    由条目的 (id, updated_at) 计算 ETag，任一条目修改后 ETag 随之改变。
+    """
+    digest = hashlib.md5(repr(sorted(versions.items())).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+
+def render_review_modals(versions):
+    """
+    返回 {条目 id: 弹窗 HTML}，versions 为 review_item_versions 的结果。
+    已缓存的片段用一次 get_many 取回；只有新增或修改过的条目（updated_at 改变）才从数据库加载并渲染，
+    渲染结果用一次 set_many 写回。
+    """
+    keys = {item_id: review_modal_key(item_id, updated_at) for item_id, updated_at in versions.items()}
+    cached = cache.get_many(keys.values())
+    modals = {item_id: cached[key] for item_id, key in keys.items() if key in cached}
+
+    missing = [item_id for item_id in keys if item_id not in modals]
+    if missing:
+        start = perf_counter()
+        rendered = {}
+        for item in Item.objects.filter(id__in=missing).select_related('category'):
+            html = render_to_string('includes/review_modal.html', {'item': item})
+            modals[item.pk] = html
+            rendered[review_modal_key(item.pk, item.updated_at)] = html
+        cache.set_many(rendered, REVIEW_MODAL_CACHE_TIMEOUT)
+        logger.debug(f"Review modals: {len(keys)} items, {len(rendered)} rendered in {perf_counter() - start:.4f}s")
+    return modals
+
+
+def review_page_rows(output):
+    """
+    把 build_review_output 的结果转换为模板使用的行：{类别名称: [{'interval', 'item'}, ...]}。
+    模板按键名取值比按列表下标取值快得多。
+    """
+    return {
+        name: [{'interval': interval, 'item': item} for interval, item, url in value]
+        for name, value in output.items()
+    }
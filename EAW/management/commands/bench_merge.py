@@ -0,0 +1,82 @@
+import difflib
+import random
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from EAW.utils import compare_and_merge
+
+# 生成模拟释义用的词性和词汇
+PARTS = ["n.", "v.", "adj.", "adv.", "vt.", "vi.", "prep."]
+WORDS = [
+    "记忆", "复习", "曲线", "单词", "短语", "理解", "掌握", "遗忘", "练习", "测试", "方法", "时间",
+    "学习", "重复", "间隔", "内容", "释义", "翻译", "发音", "例句", "用法", "含义", "表达", "结构",
+]
+
+
+def legacy_compare_and_merge(existing_lines, new_lines, threshold=0.8):
+    """
+    优化前的实现：对每一对 (新行, 旧行) 计算完整的 SequenceMatcher.ratio()，用作对照。
+    """
+    merged_lines = existing_lines.copy()
+    existing_set = set(existing_lines)
+
+    for new_line in new_lines:
+        is_duplicate = False
+        for existing_line in existing_lines:
+            similarity = difflib.SequenceMatcher(None, existing_line, new_line).ratio()
+            if similarity >= threshold:
+                is_duplicate = True
+                break
+        if not is_duplicate and new_line not in existing_set:
+            merged_lines.append(new_line)
+
+    return merged_lines
+
+
+class Command(BaseCommand):
+    help = "比较 compare_and_merge 与逐对计算 ratio() 的原实现的耗时，并校验两者的合并结果一致。"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10, 50, 200],
+                            help="已有内容的行数，新释义的行数相同")
+        parser.add_argument('--rounds', type=int, default=20, help="每种行数重复的次数")
+        parser.add_argument('--seed', type=int, default=0, help="随机数种子")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.stdout.write(f"{'lines':>6} {'legacy s':>10} {'new s':>10} {'speedup':>8}")
+        for size in options['sizes']:
+            cases = [self._case(rng, size) for _ in range(options['rounds'])]
+
+            start = perf_counter()
+            expected = [legacy_compare_and_merge(existing, new) for existing, new in cases]
+            legacy = perf_counter() - start
+
+            start = perf_counter()
+            actual = [compare_and_merge(existing, new) for existing, new in cases]
+            current = perf_counter() - start
+
+            if actual != expected:
+                raise CommandError(f"{size} 行时合并结果与原实现不一致")
+            self.stdout.write(f"{size:>6} {legacy:>10.4f} {current:>10.4f} {legacy / max(current, 1e-9):>7.1f}x")
+
+    @staticmethod
+    def _line(rng):
+        return f"{rng.choice(PARTS)} " + "；".join(rng.choice(WORDS) + rng.choice(WORDS) for _ in range(rng.randint(1, 6)))
+
+    def _case(self, rng, size):
+        """
+        模拟反复获取释义后积累的内容：新释义中约三分之一与已有行相同，三分之一略有改动，其余为新行。
+        """
+        existing = [self._line(rng) for _ in range(size)]
+        new = []
+        for _ in range(size):
+            kind = rng.random()
+            if kind < 1 / 3:
+                new.append(rng.choice(existing))
+            elif kind < 2 / 3:
+                new.append(rng.choice(existing) + rng.choice(WORDS))
+            else:
+                new.append(self._line(rng))
+        return existing, new
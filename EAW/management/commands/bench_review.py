@@ -0,0 +1,92 @@
+from datetime import timedelta
+from time import perf_counter
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.template.loader import render_to_string
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import localdate
+
+from EAW.fragments import render_review_modals, review_item_versions, review_modal_key, review_page_rows
+from EAW.models import Category, Item, ReviewDay
+from EAW.review import build_review_output, rebuild_review_schedule
+
+
+class Command(BaseCommand):
+    help = (
+        "测量复习页面的查询次数和耗时，验证查询次数不随条目数量增长；"
+        "并分别测量条目列表页面、以及弹窗片段缓存为空（全部渲染）和命中时获取全部条目详情的耗时（数据在事务中生成并回滚）。"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[100, 1000, 5000],
+                            help="依次测试的条目数量")
+
+    def handle(self, *args, **options):
+        review_date = localdate()
+        self.stdout.write(
+            f"{'items':>8} {'queries':>8} {'rows':>8} {'seconds':>10} {'page':>10} {'details cold':>13} {'details warm':>13}"
+        )
+        for size in options['sizes']:
+            with transaction.atomic():
+                user = self._seed(size, review_date)
+                with CaptureQueriesContext(connection) as ctx:
+                    start = perf_counter()
+                    output = build_review_output(user, review_date)
+                    elapsed = perf_counter() - start
+                rows = sum(len(value) for value in output.values())
+                versions = review_item_versions(user, [row[1].pk for value in output.values() for row in value])
+                cache.delete_many([review_modal_key(item_id, updated_at) for item_id, updated_at in versions.items()])
+                page = self._render_page(output, review_date)
+                cold = self._render_details(versions)
+                warm = self._render_details(versions)
+                self.stdout.write(
+                    f"{size:>8} {len(ctx.captured_queries):>8} {rows:>8} {elapsed:>10.4f} {page:>10.4f} {cold:>13.4f} {warm:>13.4f}"
+                )
+                transaction.set_rollback(True)
+
+    @staticmethod
+    def _render_page(output, review_date):
+        """
+        与 ReviewView 相同，渲染只包含条目列表的复习页面，返回耗时。
+        """
+        start = perf_counter()
+        render_to_string('review_day.html', {'output': review_page_rows(output), 'reviewdate': review_date})
+        return perf_counter() - start
+
+    @staticmethod
+    def _render_details(versions):
+        """
+        取得（或渲染）全部条目的弹窗片段，相当于页面上所有条目的详情都被加载，返回耗时。
+        """
+        start = perf_counter()
+        render_review_modals(versions)
+        return perf_counter() - start
+
+    def _seed(self, size, review_date):
+        """
+        创建一个临时用户，包含默认复习曲线、两个类别，以及分布在过去一年内的 size 个条目。
+        """
+        user = User.objects.create(username=f"bench-{uuid.uuid4().hex[:12]}")
+        ReviewDay.objects.bulk_create(
+            [ReviewDay(user=user, day=day) for day in [1, 2, 4, 7, 15, 30, 90, 180, 365]]
+        )
+        categories = [
+            Category.objects.create(user=user, name="单词", sort_order=1, is_default=True),
+            Category.objects.create(user=user, name="短语", sort_order=2),
+        ]
+        Item.objects.bulk_create([
+            Item(
+                user=user,
+                item=f"word{i}",
+                inputDate=review_date - timedelta(days=i % 400),
+                initDate=review_date - timedelta(days=i % 400),
+                category=categories[i % len(categories)],
+            )
+            for i in range(size)
+        ], batch_size=1000)
+        rebuild_review_schedule(user)
+        return user
@@ -0,0 +1,190 @@
+from collections import Counter, defaultdict
+from http.client import HTTPConnection, HTTPSConnection
+from http.cookies import SimpleCookie
+import threading
+from time import perf_counter
+from urllib.parse import urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+# 默认请求的路径：登录页面（动态页面，不需要登录）和两个静态文件
+DEFAULT_PATHS = ['/accounts/login/', '/static/css/styles.css', '/static/bootstrap/js/bootstrap.bundle.min.js']
+
+
+class _Client:
+    """
+    一个保持连接（keep-alive）的 HTTP 客户端，自行保存 Cookie，每个压测线程使用一个。
+    """
+
+    def __init__(self, base_url, timeout, headers):
+        parts = urlsplit(base_url)
+        connection_class = HTTPSConnection if parts.scheme == 'https' else HTTPConnection
+        self._connect = lambda: connection_class(parts.hostname, parts.port, timeout=timeout)
+        self.connection = self._connect()
+        self.headers = headers
+        self.cookies = {}
+
+    def request(self, method, path, body=None, headers=None):
+        """
+        发送请求并读取完整的响应，返回 (状态码, 响应字节数)。连接被服务器关闭时重新连接一次。
+        """
+        headers = dict(self.headers, **(headers or {}))
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f"{name}={value}" for name, value in self.cookies.items())
+        for attempt in range(2):
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                size = len(response.read())
+                break
+            except (ConnectionError, OSError):
+                self.connection.close()
+                self.connection = self._connect()
+                if attempt:
+                    raise
+        for header in response.headers.get_all('Set-Cookie') or []:
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        return response.status, size
+
+    def login(self, username, password):
+        self.request('GET', '/accounts/login/')
+        if 'csrftoken' not in self.cookies:
+            raise CommandError("登录页面没有返回 csrftoken Cookie")
+        body = urlencode({
+            'username': username,
+            'password': password,
+            'csrfmiddlewaretoken': self.cookies['csrftoken'],
+        })
+        status, _ = self.request('POST', '/accounts/login/', body=body, headers={
+            'Content-Type': 'application/x-www-form-urlencoded',
+        })
+        if status != 302 or 'sessionid' not in self.cookies:
+            raise CommandError(f"用户 {username} 登录失败（状态码 {status}）")
+
+    def close(self):
+        self.connection.close()
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class Command(BaseCommand):
+    help = (
+        "对正在运行的服务器进行简单的压力测试：多个线程各自保持一个连接，轮流请求指定的路径，"
+        "输出吞吐量（req/s）和延迟分位数。可分别对 runserver 和 gunicorn 运行，比较两种运行方式。"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="服务器地址")
+        parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS, help="依次轮流请求的路径")
+        parser.add_argument('--concurrency', type=int, default=16, help="并发的连接（线程）数")
+        parser.add_argument('--duration', type=float, default=10.0, help="持续时间（秒）")
+        parser.add_argument('--requests', type=int, help="总请求数，设置后达到该数量即停止")
+        parser.add_argument('--timeout', type=float, default=30.0, help="单个请求的超时时间（秒）")
+        parser.add_argument('--accept-encoding', default='gzip, br',
+                            help="Accept-Encoding 请求头，用于测试预压缩的静态文件；设为空字符串则不压缩")
+        parser.add_argument('--username', help="先用该用户登录，之后的请求带上会话 Cookie")
+        parser.add_argument('--password', help="登录密码")
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError("--concurrency 至少为 1")
+        if options['username'] and not options['password']:
+            raise CommandError("使用 --username 时需要同时提供 --password")
+
+        headers = {'User-Agent': 'EAW-loadtest'}
+        if options['accept_encoding']:
+            headers['Accept-Encoding'] = options['accept_encoding']
+
+        clients = []
+        for _ in range(options['concurrency']):
+            client = _Client(options['url'], options['timeout'], headers)
+            if options['username']:
+                client.login(options['username'], options['password'])
+            clients.append(client)
+
+        lock = threading.Lock()
+        latencies = defaultdict(list)  # 路径 -> [耗时（秒）, ...]
+        statuses = Counter()
+        errors = Counter()
+        received = [0]
+        remaining = [options['requests']]
+        paths = options['paths']
+
+        def take_request():
+            # 限定了总请求数时，每个线程先领取一个名额
+            if remaining[0] is None:
+                return True
+            with lock:
+                if remaining[0] <= 0:
+                    return False
+                remaining[0] -= 1
+                return True
+
+        def run(client, offset):
+            index = offset
+            local_latencies = defaultdict(list)
+            local_statuses = Counter()
+            local_errors = Counter()
+            local_bytes = 0
+            while perf_counter() < deadline and take_request():
+                path = paths[index % len(paths)]
+                index += 1
+                start = perf_counter()
+                try:
+                    status, size = client.request('GET', path)
+                except Exception as e:
+                    local_errors[type(e).__name__] += 1
+                    continue
+                local_latencies[path].append(perf_counter() - start)
+                local_statuses[status] += 1
+                local_bytes += size
+            with lock:
+                for path, values in local_latencies.items():
+                    latencies[path].extend(values)
+                statuses.update(local_statuses)
+                errors.update(local_errors)
+                received[0] += local_bytes
+
+        threads = [
+            threading.Thread(target=run, args=(client, offset), daemon=True)
+            for offset, client in enumerate(clients)
+        ]
+        started = perf_counter()
+        deadline = started + options['duration']
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = perf_counter() - started
+        for client in clients:
+            client.close()
+
+        self._report(options, latencies, statuses, errors, received[0], elapsed)
+
+    def _report(self, options, latencies, statuses, errors, received, elapsed):
+        total = sum(len(values) for values in latencies.values())
+        self.stdout.write(
+            f"{options['url']}  concurrency={options['concurrency']}  {elapsed:.1f}s  "
+            f"{total} requests  {total / max(elapsed, 1e-9):.1f} req/s  {received / max(elapsed, 1e-9) / 1024:.1f} KB/s"
+        )
+        self.stdout.write(f"status: {dict(sorted(statuses.items()))}" + (f"  errors: {dict(errors)}" if errors else ""))
+        self.stdout.write(f"{'path':<50} {'count':>7} {'mean ms':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+        all_values = []
+        for path in options['paths']:
+            values = sorted(latencies.get(path, []))
+            all_values.extend(values)
+            self._row(path, values)
+        self._row('(all)', sorted(all_values))
+
+    def _row(self, label, values):
+        mean = sum(values) / len(values) if values else 0.0
+        self.stdout.write(
+            f"{label[:50]:<50} {len(values):>7} {mean * 1000:>8.1f} {_percentile(values, 0.5) * 1000:>8.1f} "
+            f"{_percentile(values, 0.9) * 1000:>8.1f} {_percentile(values, 0.99) * 1000:>8.1f} "
+            f"{(values[-1] if values else 0.0) * 1000:>8.1f}"
+        )
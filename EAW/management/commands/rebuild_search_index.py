@@ -0,0 +1,21 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from EAW.search import get_backend, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "重建条目的搜索索引（切换 SEARCH_BACKEND 后需要运行一次）"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="只重建指定用户名的索引，默认重建全部用户")
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"用户不存在: {options['user']}")
+
+        rebuild_search_index(user)
+        self.stdout.write(self.style.SUCCESS(f"搜索索引已重建（后端: {get_backend().name}）"))
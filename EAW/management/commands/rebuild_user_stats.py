@@ -0,0 +1,23 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from EAW.stats import rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = "按条目表重新计算首页使用的 UserStats 统计数据"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="只重建指定用户名的统计，默认重建全部用户")
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['user']:
+            users = users.filter(username=options['user'])
+            if not users.exists():
+                raise CommandError(f"用户不存在: {options['user']}")
+
+        count = 0
+        for user_id in users.values_list('id', flat=True).iterator():
+            rebuild_user_stats(user_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"已重建 {count} 个用户的统计数据"))
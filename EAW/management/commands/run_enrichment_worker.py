@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from EAW.enrichment import claim_jobs, process_jobs, purge_finished_jobs, requeue_stale_jobs
+from EAW.metrics import registry
+
+
+class Command(BaseCommand):
+    help = "后台处理获取释义的任务队列（EnrichmentJob），不依赖外部消息队列。"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help="每轮领取的任务数量")
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="队列为空时的等待秒数")
+        parser.add_argument('--purge-after-days', type=int, default=7, help="删除多少天前已完成的任务")
+        parser.add_argument('--once', action='store_true', help="处理完当前队列后退出")
+
+    def handle(self, *args, **options):
+        purge_finished_jobs(options['purge_after_days'])
+        while True:
+            close_old_connections()
+            requeue_stale_jobs()
+            jobs = claim_jobs(options['batch_size'])
+            if jobs:
+                done, failed = process_jobs(jobs)
+                self.stdout.write(f"processed {len(jobs)} jobs: {done} done, {failed} failed")
+                # 百度接口的耗时统计写入共享缓存，由 /metrics 汇总
+                registry.flush()
+                continue
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
@@ -0,0 +1,173 @@
+from collections import defaultdict
+from datetime import date, timedelta
+import math
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+
+from django.contrib.auth.models import User
+from django.utils.timezone import localdate
+
+from EAW.models import ReviewEvent
+from EAW.srs import AGAIN, GOOD, SCHEDULERS, CardState, get_scheduler
+
+
+class _Learner:
+    """
+    模拟的学习者对一个条目的真实记忆：回忆概率随时间按 (1 + t / 9S)^-1 衰减（S 为保持率降到 90% 的天数），
+    回忆成功时稳定性 S 增长（间隔越接近遗忘，增长越多），忘记时 S 大幅下降。
+    """
+
+    def __init__(self, rng):
+        self.stability = rng.uniform(0.5, 3.0)
+        self.growth = rng.uniform(0.8, 2.0)
+        self.last_seen = None
+
+    def recall_probability(self, today):
+        if self.last_seen is None:
+            return 0.0
+        return (1 + (today - self.last_seen).days / (9 * self.stability)) ** -1
+
+    def review(self, today, rng):
+        probability = self.recall_probability(today)
+        recalled = self.last_seen is not None and rng.random() < probability
+        if recalled:
+            self.stability *= 1 + self.growth * (math.exp(3 * (1 - probability)) - 0.5)
+        elif self.last_seen is not None:
+            self.stability = max(0.5, self.stability * 0.3)
+        self.last_seen = today
+        return recalled
+
+
+class Command(BaseCommand):
+    help = "用模拟的学习者（或 --from-events 回放已记录的复习）比较各调度算法的每日复习量和记忆保持率。"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365, help="模拟的天数")
+        parser.add_argument('--new-per-day', type=int, default=20, help="每天录入的新条目数量")
+        parser.add_argument('--schedulers', nargs='+', default=list(SCHEDULERS), help="参与比较的调度算法")
+        parser.add_argument('--seed', type=int, default=0, help="随机数种子，相同种子下各算法面对同样的学习者")
+        parser.add_argument('--from-events', action='store_true', help="回放 ReviewEvent 中的复习记录，而不是模拟学习者")
+        parser.add_argument('--user', help="回放时只使用该用户名的记录")
+
+    def handle(self, *args, **options):
+        unknown = [name for name in options['schedulers'] if name not in SCHEDULERS]
+        if unknown:
+            raise CommandError(f"未知的调度算法: {', '.join(unknown)}")
+
+        if options['from_events']:
+            self._replay_events(options)
+            return
+
+        self.stdout.write(
+            f"{'scheduler':>10} {'reviews':>9} {'avg/day':>8} {'peak/day':>9} {'retention':>10} {'recall@end':>11}"
+        )
+        for name in options['schedulers']:
+            result = self._simulate(get_scheduler(name=name), options['days'], options['new_per_day'], options['seed'])
+            self.stdout.write(
+                f"{name:>10} {result['reviews']:>9} {result['avg']:>8.1f} {result['peak']:>9} "
+                f"{result['retention']:>10.3f} {result['recall_at_end']:>11.3f}"
+            )
+
+    @staticmethod
+    def _simulate(scheduler, days, new_per_day, seed):
+        """
+        逐日模拟：条目按到期日期放入桶中，每天只处理当天到期的桶，耗时与复习次数成正比。
+        第一次复习视为学习（不计入保持率），之后按学习者是否回忆成功给出 GOOD / AGAIN。
+        """
+        rng = random.Random(seed)
+        start = date(2000, 1, 1)
+        due = defaultdict(list)
+        cards = []
+        daily_reviews = []
+        recalled_count = 0
+        graded_count = 0
+
+        for offset in range(days):
+            today = start + timedelta(days=offset)
+            for _ in range(new_per_day):
+                card = CardState(today)
+                cards.append((card, _Learner(rng)))
+                due[today].append(len(cards) - 1)
+
+            reviews = due.pop(today, [])
+            for index in reviews:
+                card, learner = cards[index]
+                first = learner.last_seen is None
+                recalled = learner.review(today, rng)
+                if first:
+                    # 录入当天的学习：之后按调度器的首个间隔到期
+                    card.initDate = today
+                    card.next_due = scheduler.due_date(card)
+                else:
+                    graded_count += 1
+                    recalled_count += recalled
+                    scheduler.review(card, GOOD if recalled else AGAIN, today)
+                due[max(card.next_due, today + timedelta(days=1))].append(index)
+            daily_reviews.append(len(reviews))
+
+        end = start + timedelta(days=days)
+        recall_at_end = sum(learner.recall_probability(end) for _, learner in cards) / max(1, len(cards))
+        return {
+            'reviews': sum(daily_reviews),
+            'avg': sum(daily_reviews) / max(1, days),
+            'peak': max(daily_reviews, default=0),
+            'retention': recalled_count / max(1, graded_count),
+            'recall_at_end': recall_at_end,
+        }
+
+    def _replay_events(self, options):
+        events = ReviewEvent.objects.order_by('item_id', 'reviewed_at', 'id')
+        if options['user']:
+            try:
+                events = events.filter(user=User.objects.get(username=options['user']))
+            except User.DoesNotExist:
+                raise CommandError(f"用户不存在: {options['user']}")
+        # 每个条目的记录按时间排列：[(复习日期, 操作, 距上次复习的天数), ...]
+        histories = defaultdict(list)
+        for item_id, reviewed_at, action, interval in events.values_list(
+            'item_id', 'reviewed_at', 'action', 'interval'
+        ).iterator(chunk_size=5000):
+            # 与复习日历和 apply_feedback 一样按当前时区的日期计算
+            histories[item_id].append((localdate(reviewed_at), action, interval))
+        if not histories:
+            self.stdout.write("没有可回放的复习记录。")
+            return
+
+        self.stdout.write(f"{len(histories)} items, {sum(len(h) for h in histories.values())} events")
+        self.stdout.write(f"{'scheduler':>10} {'reviews':>9} {'avg/day':>8} {'peak/day':>9} {'retention':>10}")
+        for name in options['schedulers']:
+            result = self._replay(get_scheduler(name=name), histories)
+            self.stdout.write(
+                f"{name:>10} {result['reviews']:>9} {result['avg']:>8.1f} {result['peak']:>9} {result['retention']:>10.3f}"
+            )
+
+    @staticmethod
+    def _replay(scheduler, histories):
+        """
+        按记录的答题结果依次驱动调度器。记录中早于调度器到期日期的复习视为该算法不会安排的复习，
+        不计入工作量，但答题结果仍用于更新状态；保持率只统计该算法会安排的复习。
+        """
+        daily = defaultdict(int)
+        recalled_count = 0
+        graded_count = 0
+        for history in histories.values():
+            first_date, _, first_interval = history[0]
+            card = CardState(first_date - timedelta(days=first_interval))
+            for review_date, action, interval in history:
+                if action == ReviewEvent.RESET:
+                    scheduler.reset(card, review_date)
+                    continue
+                if review_date >= scheduler.due_date(card):
+                    daily[review_date] += 1
+                    graded_count += 1
+                    recalled_count += action == ReviewEvent.YES
+                scheduler.review(card, GOOD if action == ReviewEvent.YES else AGAIN, review_date)
+
+        days = (max(daily) - min(daily)).days + 1 if daily else 1
+        return {
+            'reviews': sum(daily.values()),
+            'avg': sum(daily.values()) / days,
+            'peak': max(daily.values(), default=0),
+            'retention': recalled_count / max(1, graded_count),
+        }
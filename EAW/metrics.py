@@ -0,0 +1,351 @@
+# metrics.py
+
+import contextvars
+import os
+import random
+import socket
+import threading
+import time
+from contextlib import contextmanager
+import environ
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates
+
+env = environ.Env()
+
+# 是否记录请求指标
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=True)
+# 详细计时（数据库、模板渲染、百度接口）的采样比例，0 ~ 1。请求数和总耗时对所有请求都记录
+METRICS_SAMPLE_RATE = env.float('METRICS_SAMPLE_RATE', default=1.0)
+# 是否在被采样的请求的响应中加入 Server-Timing 头
+METRICS_SERVER_TIMING = env.bool('METRICS_SERVER_TIMING', default=True)
+# 设置后 /metrics 可以用 Authorization: Bearer <token> 访问；否则只允许超级用户访问
+METRICS_TOKEN = env.str('METRICS_TOKEN', default='')
+# 每个进程把累计值写入共享缓存的间隔（秒）；/metrics 汇总所有 worker 进程写入的数据
+METRICS_FLUSH_SECONDS = env.float('METRICS_FLUSH_SECONDS', default=10)
+# 超过这么久没有写入的进程（已退出的 worker）不再计入
+METRICS_STALE_SECONDS = env.int('METRICS_STALE_SECONDS', default=600)
+
+# 请求耗时和百度接口耗时的直方图分桶（秒）
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 指标名称 -> (类型, 说明)
+METRICS = {
+    'eaw_requests_total': ('counter', "Requests by view, method and status."),
+    'eaw_request_duration_seconds': ('histogram', "Request wall time by view."),
+    'eaw_sampled_requests_total': ('counter', "Requests with detailed timing, by view."),
+    'eaw_db_queries_total': ('counter', "Database queries in sampled requests, by view."),
+    'eaw_db_query_seconds_total': ('counter', "Database time in sampled requests, by view."),
+    'eaw_template_render_seconds_total': ('counter', "Template render time in sampled requests, by view."),
+    'eaw_baidu_seconds_total': ('counter', "Baidu API time in sampled requests, by view."),
+    'eaw_baidu_request_duration_seconds': ('histogram', "Baidu API requests from any caller (including the worker)."),
+}
+
+_WORKERS_KEY = 'metrics:workers'
+
+
+class Registry:
+    """
+    进程内的指标累计值。counter 为 {(名称, 标签): 值}，histogram 为 {(名称, 标签): [各分桶计数..., 总和, 次数]}，
+    标签为排好序的 (键, 值) 元组。定期写入共享缓存，由 /metrics 汇总。
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._flushed_at = 0.0
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            values = self._histograms.get(key)
+            if values is None:
+                values = self._histograms[key] = [0] * (len(DURATION_BUCKETS) + 2)
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    values[index] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'histograms': {key: list(values) for key, values in self._histograms.items()},
+            }
+
+    def flush_due(self):
+        return time.monotonic() - self._flushed_at >= METRICS_FLUSH_SECONDS
+
+    def flush(self, force=False):
+        """
+        把本进程的累计值写入共享缓存（距上次写入不足 METRICS_FLUSH_SECONDS 时跳过），只能在同步代码中调用。
+        """
+        if not force and not self.flush_due():
+            return
+        self._flushed_at = time.monotonic()
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        cache.set(f"metrics:{worker}", self.snapshot(), METRICS_STALE_SECONDS)
+        workers = cache.get(_WORKERS_KEY) or set()
+        if worker not in workers:
+            cache.set(_WORKERS_KEY, workers | {worker}, None)
+
+
+registry = Registry()
+
+
+class RequestTimings:
+    """
+    一个被采样的请求中累计的耗时（秒），在处理请求的各线程和协程之间共享。
+    """
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.baidu = 0.0
+        self.baidu_requests = 0
+        self._lock = threading.Lock()
+
+    def add(self, field, seconds, count_field=None):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + seconds)
+            if count_field:
+                setattr(self, count_field, getattr(self, count_field) + 1)
+
+
+# 当前请求的 RequestTimings；未被采样或不在请求中（如后台 worker）时为 None
+current_timings = contextvars.ContextVar('eaw_request_timings', default=None)
+
+
+@contextmanager
+def timed_upstream():
+    """
+    包住一次对百度接口的请求（transport 中使用）：记录到全局直方图，并计入当前请求的耗时。
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if METRICS_ENABLED:
+            registry.observe('eaw_baidu_request_duration_seconds', {}, elapsed)
+            timings = current_timings.get()
+            if timings is not None:
+                timings.add('baidu', elapsed, 'baidu_requests')
+
+
+def _timed_execute(execute, sql, params, many, context):
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add('db', time.perf_counter() - start, 'db_queries')
+
+
+def _install_db_wrapper(sender, connection, **kwargs):
+    """
+    每个数据库连接建立时挂上计时的 execute_wrapper。连接按线程区分，请求中的查询可能在 sync_to_async 的线程
+    或 batch_translate 的线程池中执行，因此不在中间件所在的线程上挂载，而是由 _timed_execute 按上下文中的
+    current_timings 判断是否属于被采样的请求。
+    """
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _timed_execute)
+
+
+connection_created.connect(_install_db_wrapper)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    Django 模板后端，记录经由 render() / render_to_string() 渲染模板的耗时。
+    {% include %} 的子模板在父模板的渲染中完成，不会重复计算。
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class TimedTemplate:
+
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, context=None, request=None):
+        timings = current_timings.get()
+        if timings is None:
+            return self._template.render(context, request)
+        start = time.perf_counter()
+        try:
+            return self._template.render(context, request)
+        finally:
+            timings.add('template', time.perf_counter() - start)
+
+
+def _view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unresolved'
+
+
+def server_timing_header(total, timings):
+    parts = [
+        f'total;dur={total * 1000:.1f}',
+        f'db;dur={timings.db * 1000:.1f};desc="{timings.db_queries} queries"',
+        f'tpl;dur={timings.template * 1000:.1f}',
+    ]
+    if timings.baidu_requests:
+        parts.append(f'baidu;dur={timings.baidu * 1000:.1f};desc="{timings.baidu_requests} requests"')
+    return ', '.join(parts)
+
+
+class MetricsMiddleware:
+    """
+    记录每个请求的总耗时；按 METRICS_SAMPLE_RATE 采样的请求另外记录数据库查询次数和耗时、模板渲染耗时
+    和百度接口耗时，并在响应中加入 Server-Timing 头。放在 MIDDLEWARE 的最前面，耗时包含其他中间件。
+    同时支持同步和异步调用：ASGI 下不会让整个中间件链退回到同步模式而为每个请求占用线程。
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not METRICS_ENABLED:
+            return self.get_response(request)
+
+        timings, token, start = self._begin()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        self._finish(request, response, timings, start)
+        registry.flush()
+        return response
+
+    async def __acall__(self, request):
+        if not METRICS_ENABLED:
+            return await self.get_response(request)
+
+        timings, token, start = self._begin()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        self._finish(request, response, timings, start)
+        # 写入缓存是同步操作，只在到期时才切换到线程中执行
+        if registry.flush_due():
+            await sync_to_async(registry.flush)()
+        return response
+
+    @staticmethod
+    def _begin():
+        timings = RequestTimings() if random.random() < METRICS_SAMPLE_RATE else None
+        return timings, current_timings.set(timings), time.perf_counter()
+
+    @staticmethod
+    def _finish(request, response, timings, start):
+        total = time.perf_counter() - start
+        view = _view_label(request)
+        registry.inc('eaw_requests_total', {'view': view, 'method': request.method, 'status': str(response.status_code)})
+        registry.observe('eaw_request_duration_seconds', {'view': view}, total)
+        if timings is not None:
+            labels = {'view': view}
+            registry.inc('eaw_sampled_requests_total', labels)
+            registry.inc('eaw_db_queries_total', labels, timings.db_queries)
+            registry.inc('eaw_db_query_seconds_total', labels, timings.db)
+            registry.inc('eaw_template_render_seconds_total', labels, timings.template)
+            registry.inc('eaw_baidu_seconds_total', labels, timings.baidu)
+            if METRICS_SERVER_TIMING:
+                response['Server-Timing'] = server_timing_header(total, timings)
+
+
+def collect():
+    """
+    汇总所有 worker 进程写入缓存的累计值（包括本进程的最新值）。
+    """
+    registry.flush(force=True)
+    workers = cache.get(_WORKERS_KEY) or set()
+    snapshots = cache.get_many([f"metrics:{worker}" for worker in workers])
+    alive = {worker for worker in workers if f"metrics:{worker}" in snapshots}
+    if alive != workers:
+        cache.set(_WORKERS_KEY, alive, None)
+
+    counters = {}
+    histograms = {}
+    for snapshot in snapshots.values():
+        for key, value in snapshot['counters'].items():
+            counters[key] = counters.get(key, 0) + value
+        for key, values in snapshot['histograms'].items():
+            merged = histograms.setdefault(key, [0] * len(values))
+            for index, value in enumerate(values):
+                merged[index] += value
+    return counters, histograms, len(snapshots)
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for key, value in pairs
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus():
+    """
+    以 Prometheus 文本格式输出所有指标。
+    """
+    counters, histograms, workers = collect()
+    lines = [
+        '# HELP eaw_metrics_workers Worker processes that reported metrics.',
+        '# TYPE eaw_metrics_workers gauge',
+        f'eaw_metrics_workers {workers}',
+        '# HELP eaw_metrics_sample_rate Fraction of requests with detailed timing.',
+        '# TYPE eaw_metrics_sample_rate gauge',
+        f'eaw_metrics_sample_rate {METRICS_SAMPLE_RATE}',
+    ]
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_format_labels(labels)} {_format_number(value)}')
+            continue
+        for (metric, labels), values in sorted(histograms.items()):
+            if metric != name:
+                continue
+            for bound, count in zip(DURATION_BUCKETS, values):
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {count}')
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {values[-1]}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_number(values[-2])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {values[-1]}')
+    return '\n'.join(lines) + '\n'
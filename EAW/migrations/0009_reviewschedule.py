@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:40
+
+import datetime
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_review_schedule(apps, schema_editor):
+    """
+    为已有条目按各自用户的复习曲线生成到期记录。
+    """
+    Item = apps.get_model("EAW", "Item")
+    ReviewDay = apps.get_model("EAW", "ReviewDay")
+    ReviewSchedule = apps.get_model("EAW", "ReviewSchedule")
+
+    review_days = {}
+    for user_id, day in ReviewDay.objects.values_list("user_id", "day"):
+        review_days.setdefault(user_id, []).append(day)
+
+    rows = []
+    for item_id, user_id, init_date in Item.objects.values_list(
+        "id", "user_id", "initDate"
+    ).iterator(chunk_size=2000):
+        for day in review_days.get(user_id, []):
+            rows.append(
+                ReviewSchedule(
+                    user_id=user_id,
+                    item_id=item_id,
+                    due_date=init_date + datetime.timedelta(days=day),
+                    interval=day,
+                )
+            )
+        if len(rows) >= 5000:
+            ReviewSchedule.objects.bulk_create(rows)
+            rows = []
+    ReviewSchedule.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("EAW", "0008_alter_item_content"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReviewSchedule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("due_date", models.DateField()),
+                ("interval", models.IntegerField()),
+                (
+                    "item",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="schedule",
+                        to="EAW.item",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        editable=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("item", "interval")},
+                "indexes": [
+                    models.Index(
+                        fields=["user", "due_date"], name="eaw_schedule_user_due_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_review_schedule, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("EAW", "0009_reviewschedule"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(
+                fields=["user", "initDate"], name="eaw_item_user_initdate_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(
+                fields=["user", "inputDate"], name="eaw_item_user_inputdate_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(
+                fields=["user", "category"], name="eaw_item_user_category_idx"
+            ),
+        ),
+    ]
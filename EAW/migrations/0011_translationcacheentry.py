@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("EAW", "0010_item_composite_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TranslationCacheEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("query", models.CharField(max_length=200, unique=True)),
+                ("result", models.JSONField()),
+                ("version", models.PositiveSmallIntegerField(default=1)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
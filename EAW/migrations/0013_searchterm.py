@@ -0,0 +1,143 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:53
+
+import os
+import re
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import DatabaseError, migrations, models, transaction
+
+# 迁移需要保持不变，不引用 EAW.search：这里保存建表时的表名和分词规则
+FTS_TABLE = "eaw_item_fts"
+MAX_TERM_LENGTH = 32
+_CJK = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+_CJK_RE = re.compile(f"[{_CJK}]")
+_TOKEN_RE = re.compile(f"[{_CJK}]+|[^\\W_{_CJK}]+")
+
+
+def tokenize(text):
+    """
+    英文等按单词切分并转为小写，中文按相邻两个字切分，每段中文的最后一个字也单独保存。
+    """
+    terms = set()
+    for run in _TOKEN_RE.findall((text or "").lower()):
+        if _CJK_RE.match(run):
+            terms.update(run[i : i + 2] for i in range(len(run) - 1))
+            terms.add(run[-1])
+        else:
+            terms.add(run[:MAX_TERM_LENGTH])
+    return terms
+
+
+def create_fts_table(schema_editor):
+    """
+    SQLite 上尝试创建 FTS5 trigram 索引表，SQLite 未编译 FTS5 或版本低于 3.34 时返回 False。
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return False
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                f"USING fts5(item, content, user_id UNINDEXED, tokenize='trigram')"
+            )
+    except DatabaseError:
+        return False
+    return True
+
+
+def create_search_index(apps, schema_editor):
+    """
+    SQLite 上创建 FTS5 索引表，并为已有条目建立 SEARCH_BACKEND 对应的索引。
+    """
+    Item = apps.get_model("EAW", "Item")
+    SearchTerm = apps.get_model("EAW", "SearchTerm")
+
+    has_fts = create_fts_table(schema_editor)
+    backend = os.environ.get("SEARCH_BACKEND", "auto")
+    if backend == "auto":
+        backend = "fts5" if has_fts else "index"
+
+    if backend == "fts5" and has_fts:
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, item, content, user_id) "
+            f"SELECT id, item, COALESCE(content, ''), user_id FROM \"{Item._meta.db_table}\""
+        )
+    elif backend == "index":
+        rows = []
+        for item_id, user_id, name, content in Item.objects.values_list(
+            "id", "user_id", "item", "content"
+        ).iterator(chunk_size=2000):
+            item_terms = tokenize(name)
+            for term in item_terms:
+                rows.append(
+                    SearchTerm(user_id=user_id, item_id=item_id, term=term, field=0)
+                )
+            for term in tokenize(content) - item_terms:
+                rows.append(
+                    SearchTerm(user_id=user_id, item_id=item_id, term=term, field=1)
+                )
+            if len(rows) >= 5000:
+                SearchTerm.objects.bulk_create(rows)
+                rows = []
+        SearchTerm.objects.bulk_create(rows)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("EAW", "0012_enrichmentjob"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchTerm",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("term", models.CharField(max_length=32)),
+                (
+                    "field",
+                    models.PositiveSmallIntegerField(
+                        choices=[(0, "Item"), (1, "Content")]
+                    ),
+                ),
+                (
+                    "item",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_terms",
+                        to="EAW.item",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        editable=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["user", "term"], name="eaw_searchterm_user_term_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
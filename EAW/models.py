@@ -1,5 +1,6 @@
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth.models import User
 from dirtyfields import DirtyFieldsMixin
 from django.core.exceptions import ValidationError
@@ -83,6 +84,15 @@ class Item(models.Model):
         blank=True, 
         help_text="British Phonetic (optional)"
     )
+    updated_at = models.DateTimeField(auto_now=True)  # 内容版本，复习页面的弹窗片段缓存以此为键
+    # 间隔重复调度状态，由 EAW.srs 在每次复习反馈时更新；next_due 为空表示尚未复习过的新条目
+    ease = models.FloatField(default=2.5, editable=False)  # SM-2 的难易系数
+    stability = models.FloatField(default=0, editable=False)  # FSRS 的记忆稳定性（天）
+    difficulty = models.FloatField(default=0, editable=False)  # FSRS 的难度（1-10）
+    reps = models.PositiveIntegerField(default=0, editable=False)  # 连续答对次数
+    lapses = models.PositiveIntegerField(default=0, editable=False)  # 答错次数
+    last_reviewed = models.DateField(null=True, blank=True, editable=False)
+    next_due = models.DateField(null=True, blank=True, editable=False)
     def __str__(self):
         return f"{self.item} ({self.get_proficiency_display()}) in {self.category.name}"
 
@@ -101,7 +111,12 @@ class Item(models.Model):
         return reverse('review-view', args=[year, month, day, str(self.id)])
     class Meta:
         #unique_together = ('user', 'item')  # 确保每个用户的单词库中单词不重复
-        pass
+        indexes = [
+            models.Index(fields=['user', 'initDate'], name='eaw_item_user_initdate_idx'),  # 复习查询
+            models.Index(fields=['user', 'inputDate'], name='eaw_item_user_inputdate_idx'),  # 列表和首页排序
+            models.Index(fields=['user', 'category'], name='eaw_item_user_category_idx'),  # 类别统计
+            models.Index(fields=['user', 'next_due'], name='eaw_item_user_next_due_idx'),  # 自适应调度的到期查询
+        ]
 class ReviewDay(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE,editable=False)  # 关联用户
     day = models.IntegerField()
@@ -110,3 +125,134 @@ class ReviewDay(models.Model):
     class Meta:
         unique_together = ('user', 'day')  # 确保每个用户的复习曲线不重复
         ordering = ['day']  # 默认按复习时间从小到大排序
+
+class ReviewSchedule(models.Model):
+    """
+    每个条目在复习曲线上的到期日期（initDate + 间隔天数），由 EAW.review 维护。
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, editable=False)  # 关联用户
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='schedule')
+    due_date = models.DateField()
+    interval = models.IntegerField()
+    def __str__(self):
+        return f"{self.item_id} @ {self.due_date} (Day {self.interval})"
+    class Meta:
+        unique_together = ('item', 'interval')  # 每个条目在每个复习间隔上只有一行
+        indexes = [
+            models.Index(fields=['user', 'due_date'], name='eaw_schedule_user_due_idx'),
+        ]
+
+class SearchTerm(models.Model):
+    """
+    通用的倒排索引：条目 item / content 切分后的词项，由 EAW.search 维护。
+    英文按单词切分并支持前缀匹配，中文按相邻两个字（bigram）切分。
+    """
+    ITEM = 0
+    CONTENT = 1
+    FIELD_CHOICES = (
+        (ITEM, 'Item'),
+        (CONTENT, 'Content'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, editable=False)  # 关联用户
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=32)
+    field = models.PositiveSmallIntegerField(choices=FIELD_CHOICES)
+    def __str__(self):
+        return f"{self.term} -> {self.item_id}"
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'term'], name='eaw_searchterm_user_term_idx'),
+        ]
+
+class UserStats(models.Model):
+    """
+    每个用户的统计数据，由 EAW.stats 在条目变化时增量维护，首页只需按主键读取一行。
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    total_items = models.PositiveIntegerField(default=0)
+    mastered_items = models.PositiveIntegerField(default=0)
+    unfamiliar_items = models.PositiveIntegerField(default=0)
+    category_counts = models.JSONField(default=dict)  # {类别名称: 条目数量}，没有类别的条目记在 "" 下
+    first_input_date = models.DateField(null=True, blank=True)
+    due_date = models.DateField(null=True, blank=True)  # due_count 对应的日期，为空表示需要重新计算
+    due_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    def __str__(self):
+        return f"{self.user_id}: {self.total_items} items"
+
+class ReviewEvent(models.Model):
+    """
+    复习反馈的历史记录，只追加不修改，由 EAW.events 批量写入。
+    条目删除后记录仍然保留，用于统计分析和调整复习调度。
+    """
+    YES = 1
+    NO = 2
+    RESET = 3
+    ACTION_CHOICES = (
+        (YES, 'Yes'),
+        (NO, 'No'),
+        (RESET, 'Reset'),
+    )
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, editable=False)  # 关联用户
+    item = models.ForeignKey(Item, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    reviewed_at = models.DateTimeField()
+    action = models.PositiveSmallIntegerField(choices=ACTION_CHOICES)
+    interval = models.PositiveIntegerField()  # 距上次复习（或 initDate）的天数
+    def __str__(self):
+        return f"{self.item_id} {self.get_action_display()} @ {self.reviewed_at}"
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'reviewed_at'], name='eaw_event_user_time_idx'),
+        ]
+
+class TranslationCacheEntry(models.Model):
+    """
+    所有用户共享的百度释义缓存，以 standardize_input 处理后的查询词为键，由 EAW.translation_cache 维护。
+    """
+    query = models.CharField(max_length=200, unique=True)
+    result = models.JSONField()  # baidu_translate 返回的字典：phonetic, parts_and_means, simple_meaning, src_tts
+    version = models.PositiveSmallIntegerField(default=1)  # 解析格式版本，版本不一致视为未命中
+    updated_at = models.DateTimeField(auto_now=True)
+    def __str__(self):
+        return self.query
+
+class EnrichmentJob(models.Model):
+    """
+    后台获取释义的任务队列，由 manage.py run_enrichment_worker 处理。
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    DEAD = 'dead'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (DEAD, 'Dead'),  # 重试次数用尽，需要人工处理
+    )
+    APPEND = 'append'
+    MERGE = 'merge'
+    MODE_CHOICES = (
+        (APPEND, 'Append'),  # 录入页面：把释义追加到输入的内容之后
+        (MERGE, 'Merge'),  # 导入数据：逐行比较后合并释义
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, editable=False)  # 关联用户
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='enrichment_jobs')
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default=APPEND)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)  # 重试时延后执行
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    def __str__(self):
+        return f"{self.item_id} ({self.get_status_display()})"
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='eaw_job_status_run_idx'),  # worker 领取任务
+            models.Index(fields=['user', 'status'], name='eaw_job_user_status_idx'),  # 状态查询和并发限制
+        ]
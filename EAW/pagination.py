@@ -0,0 +1,81 @@
+# pagination.py
+
+import base64
+import json
+from datetime import date
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """
+    游标无法解析（被篡改或格式过期）。
+    """
+
+
+def encode_cursor(item, backwards=False):
+    """
+    把条目的 (inputDate, id) 编码为 URL 安全的游标，backwards 表示向前翻页。
+    """
+    data = {'d': item.inputDate.isoformat(), 'i': item.pk}
+    if backwards:
+        data['b'] = 1
+    token = base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+    return token.decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    解析游标，返回 (inputDate, id, backwards)。
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        return date.fromisoformat(data['d']), int(data['i']), bool(data.get('b'))
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {token}") from e
+
+
+class KeysetPage:
+    """
+    游标分页的一页结果，可以像 Paginator 的 Page 一样在模板中迭代。
+    """
+
+    def __init__(self, items, has_next, has_previous):
+        self.object_list = items
+        self.next_cursor = encode_cursor(items[-1]) if items and has_next else None
+        self.previous_cursor = encode_cursor(items[0], backwards=True) if items and has_previous else None
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def keyset_page(queryset, cursor=None, per_page=50):
+    """
+    按 (inputDate, id) 倒序的游标分页：用 WHERE (inputDate, id) < 游标位置 代替 OFFSET，
+    不需要 COUNT(*)，翻到多深都只读取 per_page + 1 行。
+    """
+    if not cursor:
+        rows = list(queryset.order_by('-inputDate', '-id')[:per_page + 1])
+        return KeysetPage(rows[:per_page], has_next=len(rows) > per_page, has_previous=False)
+
+    input_date, item_id, backwards = decode_cursor(cursor)
+    if not backwards:
+        after = Q(inputDate__lt=input_date) | Q(inputDate=input_date, id__lt=item_id)
+        rows = list(queryset.filter(after).order_by('-inputDate', '-id')[:per_page + 1])
+        return KeysetPage(rows[:per_page], has_next=len(rows) > per_page, has_previous=True)
+
+    # 向前翻页时按正序读取游标之前的行，再反转成页面顺序
+    before = Q(inputDate__gt=input_date) | Q(inputDate=input_date, id__gt=item_id)
+    rows = list(queryset.filter(before).order_by('inputDate', 'id')[:per_page + 1])
+    has_previous = len(rows) > per_page
+    rows = rows[:per_page]
+    rows.reverse()
+    return KeysetPage(rows, has_next=True, has_previous=has_previous)
@@ -0,0 +1,291 @@
+# review.py
+
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.urls import reverse
+from django.utils.timezone import localdate, now
+from .caching import cached_for_user, invalidate_user_cache
+from .events import EVENT_ACTIONS, record_review_events
+from .models import Item, Category, Proficiency, ReviewDay, ReviewEvent, ReviewSchedule
+from .srs import FEEDBACK_GRADES, SRS_FIELDS, get_scheduler, uses_fixed_curve, due_filter
+from .stats import item_snapshot, mark_due_stale, update_user_stats
+
+# 复习反馈的操作及其对应的掌握程度
+FEEDBACK_ACTIONS = {
+    'yes': Proficiency.MASTERED,
+    'no': Proficiency.UNFAMILIAR,
+    'reset': Proficiency.UNFAMILIAR,
+}
+# 一次批量反馈最多包含的条目数量
+FEEDBACK_BATCH_LIMIT = 1000
+# 复习列表不需要的详情字段，由 EAW.fragments 在打开弹窗时单独加载
+DETAIL_FIELDS = ['content', 'src_tts', 'us_phonetic', 'uk_phonetic']
+# 复习日历最多查询的天数（向前、向后各自）
+CALENDAR_MAX_DAYS = 366
+
+
+def get_review_days(user):
+    """
+    返回用户的复习曲线（按天数从小到大排序的整数列表）。
+    """
+    return list(ReviewDay.objects.filter(user=user).order_by('day').values_list('day', flat=True))
+
+
+def _schedule_rows(user, items, review_days):
+    """
+    为一组 (item_id, initDate) 生成复习曲线上每个间隔对应的 ReviewSchedule 行。
+    """
+    return [
+        ReviewSchedule(user=user, item_id=item_id, due_date=init_date + timedelta(days=day), interval=day)
+        for item_id, init_date in items
+        for day in review_days
+    ]
+
+
+def sync_review_schedule(user, items):
+    """
+    新建条目或条目的 initDate 改变后，重新生成这些条目的到期记录。
+    """
+    items = list(items)
+    if not items:
+        return
+    if any(item.pk is None for item in items):
+        # 某些数据库（如 MySQL）的 bulk_create 不回填主键，只能整体重建
+        rebuild_review_schedule(user)
+        return
+
+    review_days = get_review_days(user)
+    with transaction.atomic():
+        ReviewSchedule.objects.filter(item__in=[item.pk for item in items]).delete()
+        ReviewSchedule.objects.bulk_create(
+            _schedule_rows(user, [(item.pk, item.initDate) for item in items], review_days),
+            batch_size=1000,
+        )
+    mark_due_stale(user.pk)
+
+
+def rebuild_review_schedule(user):
+    """
+    复习曲线（ReviewDay）改变后，重建该用户全部条目的到期记录。
+    """
+    review_days = get_review_days(user)
+    with transaction.atomic():
+        ReviewSchedule.objects.filter(user=user).delete()
+        batch = []
+        for item in Item.objects.filter(user=user).values_list('id', 'initDate').iterator(chunk_size=2000):
+            batch.append(item)
+            if len(batch) >= 500:
+                ReviewSchedule.objects.bulk_create(_schedule_rows(user, batch, review_days))
+                batch = []
+        ReviewSchedule.objects.bulk_create(_schedule_rows(user, batch, review_days))
+    mark_due_stale(user.pk)
+    invalidate_user_cache(user.pk)
+
+
+def build_review_output(user, review_date):
+    """
+    计算指定日期需要复习的条目，返回 {类别名称: [[间隔天数, item, 详情页 URL], ...]}，item 不加载 DETAIL_FIELDS。
+
+    到期记录预先存放在 ReviewSchedule 中，initDate <= 复习日期 - 间隔 等价于 due_date <= 复习日期，
+    因此只需在 (user, due_date) 索引上做范围扫描；到期条目连同 category 只加载一次，
+    查询次数与条目数量无关。
+    """
+    if not uses_fixed_curve():
+        return _build_adaptive_review_output(user, review_date)
+
+    # 初始化每个类别的数据容器
+    output = {category.name: [] for category in Category.objects.filter(user=user)}
+
+    schedule = ReviewSchedule.objects.filter(user=user, due_date__lte=review_date)
+    items = (
+        Item.objects.filter(user=user, category__isnull=False, id__in=schedule.values('item_id'))
+        .select_related('category')
+        .defer(*DETAIL_FIELDS)
+        .in_bulk()
+    )
+    detail_urls = {pk: reverse('item-detail', args=[pk]) for pk in items}
+
+    for interval, item_id in schedule.order_by('interval', 'due_date', 'item_id').values_list('interval', 'item_id'):
+        item = items.get(item_id)
+        if item is not None:
+            output.setdefault(item.category.name, []).append([interval, item, detail_urls[item_id]])
+
+    return output
+
+
+def _build_adaptive_review_output(user, review_date):
+    """
+    自适应调度（SM-2 / FSRS）下按 next_due 计算到期条目，每个条目只出现一次，
+    间隔天数为当前的复习间隔（新条目为 0），按到期日期排序。
+    """
+    output = {category.name: [] for category in Category.objects.filter(user=user)}
+    scheduler = get_scheduler(user)
+    items = (
+        Item.objects.filter(due_filter(review_date, scheduler), user=user, category__isnull=False)
+        .select_related('category')
+        .defer(*DETAIL_FIELDS)
+    )
+    ordered = sorted(items, key=lambda item: (scheduler.due_date(item), item.pk))
+    for item in ordered:
+        output.setdefault(item.category.name, []).append(
+            [scheduler.current_interval(item), item, reverse('item-detail', args=[item.pk])]
+        )
+    return output
+
+
+def _upcoming_counts(user, start, end):
+    """
+    返回 {日期: 当天到期的条目数量}，日期范围为 [start, end]，每天每个条目只计一次。
+    已过期的条目计入 start 当天，因此 start 为今天时与首页的到期数量（get_user_stats）一致。
+    固定曲线按 ReviewSchedule 分组计数；自适应调度按 next_due 分组，新条目按 initDate 分组。
+    """
+    if uses_fixed_curve():
+        schedule = ReviewSchedule.objects.filter(user=user)
+        counts = dict(
+            schedule.filter(due_date__gt=start, due_date__lte=end)
+            .values_list('due_date')
+            .annotate(count=Count('item_id', distinct=True))
+            .order_by()
+        )
+        overdue = schedule.filter(due_date__lte=start).values('item_id').distinct().count()
+        if overdue:
+            counts[start] = overdue
+        return counts
+
+    scheduler = get_scheduler(user)
+    first = timedelta(days=scheduler.first_interval)
+    counts = {}
+    reviewed = (
+        Item.objects.filter(user=user, next_due__lte=end)
+        .values_list('next_due')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    new = (
+        Item.objects.filter(user=user, next_due__isnull=True, initDate__lte=end - first)
+        .values_list('initDate')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    for due_date, count in list(reviewed) + [(init_date + first, count) for init_date, count in new]:
+        due_date = max(due_date, start)
+        counts[due_date] = counts.get(due_date, 0) + count
+    return counts
+
+
+def _activity_counts(user, start, end):
+    """
+    按 ReviewEvent 统计 [start, end] 每天的复习次数，返回 {日期: {'yes': n, 'no': n, 'reset': n}}。
+    日期按当前时区计算。
+    """
+    rows = (
+        ReviewEvent.objects.filter(user=user, reviewed_at__date__range=(start, end))
+        .annotate(day=TruncDate('reviewed_at'))
+        .values_list('day')
+        .annotate(
+            yes=Count('id', filter=Q(action=ReviewEvent.YES)),
+            no=Count('id', filter=Q(action=ReviewEvent.NO)),
+            reset=Count('id', filter=Q(action=ReviewEvent.RESET)),
+        )
+        .order_by()
+    )
+    return {day: {'yes': yes, 'no': no, 'reset': reset} for day, yes, no, reset in rows}
+
+
+def review_calendar(user, days_ahead=30, days_back=30):
+    """
+    复习日历：今天起 days_ahead 天内每天的到期数量，以及包括今天在内过去 days_back 天的复习记录。
+    每部分只需一到两条分组查询；结果按用户缓存，条目、复习曲线或复习记录变化后失效。
+    """
+    days_ahead = max(0, min(days_ahead, CALENDAR_MAX_DAYS))
+    days_back = max(0, min(days_back, CALENDAR_MAX_DAYS))
+    today = localdate()
+
+    def compute():
+        upcoming = _upcoming_counts(user, today, today + timedelta(days=days_ahead - 1)) if days_ahead else {}
+        activity = _activity_counts(user, today - timedelta(days=days_back - 1), today) if days_back else {}
+        empty = {'yes': 0, 'no': 0, 'reset': 0}
+        return {
+            'today': today.isoformat(),
+            'upcoming': [
+                {'date': day.isoformat(), 'due': upcoming.get(day, 0)}
+                for day in (today + timedelta(days=offset) for offset in range(days_ahead))
+            ],
+            'activity': [
+                {'date': day.isoformat(), **activity.get(day, empty)}
+                for day in (today - timedelta(days=offset) for offset in reversed(range(days_back)))
+            ],
+        }
+
+    name = f"review-calendar:{today.isoformat()}:{days_ahead}:{days_back}"
+    return cached_for_user(user.pk, name, compute, timeout=24 * 3600)
+
+
+def apply_feedback(user, feedback):
+    """
+    批量处理复习反馈。feedback 为 [(条目 id, 操作), ...]，同一条目以最后一次操作为准。
+    - yes / no：更新 proficiency，并由调度器按评分更新该条目的调度状态（O(1)）
+    - reset：initDate 改为今天，proficiency 改为 UNFAMILIAR，调度状态清空并重新生成复习到期记录
+    只更新当前用户的条目，全部条目用一条 bulk_update 写回，每个条目的反馈另外追加一条 ReviewEvent 记录。
+    返回 (已更新的 {id: 掌握程度}, 不存在的 id 列表)。
+    """
+    actions = {}
+    for item_id, action in feedback:
+        if action not in FEEDBACK_ACTIONS:
+            raise ValueError(f"Unknown action: {action}")
+        actions[int(item_id)] = action
+    if not actions:
+        return {}, []
+
+    reviewed_at = now()
+    today = localdate(reviewed_at)
+    scheduler = get_scheduler(user)
+    with transaction.atomic():
+        items = list(
+            Item.objects.filter(user=user, id__in=list(actions))
+            .select_related('category')
+            .only('id', 'user_id', 'proficiency', 'inputDate', 'initDate', 'updated_at', 'category__name', *SRS_FIELDS)
+        )
+        found = {item.pk for item in items}
+        missing = [item_id for item_id in actions if item_id not in found]
+
+        removed = []
+        added = []
+        reset_items = []
+        events = []
+        for item in items:
+            action = actions[item.pk]
+            old_snapshot = item_snapshot(item)
+            events.append(ReviewEvent(
+                user_id=user.pk,
+                item_id=item.pk,
+                reviewed_at=reviewed_at,
+                action=EVENT_ACTIONS[action],
+                interval=max(0, (today - (item.last_reviewed or item.initDate)).days),
+            ))
+            if action == 'reset':
+                scheduler.reset(item, today)
+                reset_items.append(item)
+            else:
+                scheduler.review(item, FEEDBACK_GRADES[action], today)
+            item.proficiency = FEEDBACK_ACTIONS[action]
+            item.updated_at = reviewed_at
+            new_snapshot = item_snapshot(item)
+            if new_snapshot != old_snapshot:
+                removed.append(old_snapshot)
+                added.append(new_snapshot)
+
+        Item.objects.bulk_update(items, ['proficiency', 'initDate', 'updated_at', *SRS_FIELDS], batch_size=500)
+        if reset_items:
+            sync_review_schedule(user, reset_items)
+
+        # bulk_update 不触发信号，这里直接更新统计和缓存
+        update_user_stats(user.pk, added=added, removed=removed)
+        mark_due_stale(user.pk)
+        invalidate_user_cache(user.pk)
+        record_review_events(events)
+
+    labels = dict(Proficiency.PROFICIENCY_DEGREE)
+    return {item.pk: labels[item.proficiency] for item in items}, missing
@@ -0,0 +1,429 @@
+# search.py
+
+import hashlib
+import re
+import environ
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+from .caching import user_cache_version
+from .models import Item, SearchTerm
+
+env = environ.Env()
+
+# 搜索后端：auto（SQLite 使用 fts5，其他数据库使用 index）、fts5、index 或 scan
+SEARCH_BACKEND = env.str('SEARCH_BACKEND', default='auto')
+# 一次搜索最多返回的结果数量，排序后再分页
+SEARCH_MAX_RESULTS = env.int('SEARCH_MAX_RESULTS', default=500)
+# 搜索结果每页显示的条目数量
+SEARCH_PAGE_SIZE = env.int('SEARCH_PAGE_SIZE', default=20)
+# 输入联想：最多返回的条数、候选集缓存的有效期（秒）和可缓存的最大候选数量
+SEARCH_SUGGEST_LIMIT = env.int('SEARCH_SUGGEST_LIMIT', default=10)
+SEARCH_SUGGEST_TTL = env.int('SEARCH_SUGGEST_TTL', default=60)
+SEARCH_SUGGEST_CACHE_ROWS = env.int('SEARCH_SUGGEST_CACHE_ROWS', default=200)
+SEARCH_SUGGEST_MAX_QUERY = 100
+
+FTS_TABLE = 'eaw_item_fts'
+MAX_TERM_LENGTH = 32
+# 命中 item 的权重高于命中 content，完整匹配或前缀匹配条目名称时额外加分
+ITEM_WEIGHT = 3
+CONTENT_WEIGHT = 1
+EXACT_BONUS = 10
+PREFIX_BONUS = 5
+
+_CJK = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+_CJK_RE = re.compile(f'[{_CJK}]')
+_TOKEN_RE = re.compile(f'[{_CJK}]+|[^\\W_{_CJK}]+')
+
+
+_fts5_supported = None
+
+
+def fts5_supported():
+    """
+    当前 SQLite 能否创建 FTS5 trigram 表。FTS5 取决于编译选项（ENABLE_FTS5），trigram 分词器需要 3.34 以上，
+    只看版本号并不可靠，因此直接尝试创建一个临时表，结果在进程内缓存。
+    """
+    global _fts5_supported
+    if connection.vendor != 'sqlite':
+        return False
+    if _fts5_supported is None:
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute("CREATE VIRTUAL TABLE temp.eaw_fts5_probe USING fts5(x, tokenize='trigram')")
+                cursor.execute("DROP TABLE temp.eaw_fts5_probe")
+        except DatabaseError:
+            _fts5_supported = False
+        else:
+            _fts5_supported = True
+    return _fts5_supported
+
+
+def tokenize(text):
+    """
+    把文本切分为索引词项：英文等按单词切分并转为小写，中文按相邻两个字切分，
+    每段中文的最后一个字也单独保存，使单字查询可以通过前缀匹配找到。
+    """
+    terms = set()
+    for run in _TOKEN_RE.findall((text or '').lower()):
+        if _CJK_RE.match(run):
+            terms.update(run[i:i + 2] for i in range(len(run) - 1))
+            terms.add(run[-1])
+        else:
+            terms.add(run[:MAX_TERM_LENGTH])
+    return terms
+
+
+def parse_query(query):
+    """
+    把查询切分为 [(词项, 是否前缀匹配), ...]。英文单词和单个汉字按前缀匹配，连续的汉字按 bigram 精确匹配。
+    """
+    terms = {}
+    for run in _TOKEN_RE.findall(query.lower()):
+        if _CJK_RE.match(run) and len(run) > 1:
+            for i in range(len(run) - 1):
+                terms[run[i:i + 2]] = False
+        else:
+            terms[run[:MAX_TERM_LENGTH]] = True
+    return list(terms.items())
+
+
+def substring_score(query, name, content):
+    """
+    查询中的每个词都是 item 或 content 的子串时返回得分，否则返回 None。
+    """
+    name = name.lower()
+    content = (content or '').lower()
+    score = 0
+    for word in query.lower().split():
+        if word in name:
+            score += ITEM_WEIGHT
+        elif word in content:
+            score += CONTENT_WEIGHT
+        else:
+            return None
+    return score if score else None
+
+
+def term_score(query, name, content):
+    """
+    与 TermIndexBackend 相同的匹配规则：所有查询词项都命中 item 或 content 的词项时返回得分，否则返回 None。
+    """
+    terms = parse_query(query)
+    if not terms:
+        return None
+    item_terms = tokenize(name)
+    content_terms = tokenize(content)
+
+    def hit(index_terms, query_term, prefix):
+        return query_term in index_terms or (prefix and any(term.startswith(query_term) for term in index_terms))
+
+    score = 0
+    for query_term, prefix in terms:
+        if hit(item_terms, query_term, prefix):
+            score += ITEM_WEIGHT
+        elif hit(content_terms, query_term, prefix):
+            score += CONTENT_WEIGHT
+        else:
+            return None
+    return score
+
+
+def _rank(query, scores, names):
+    """
+    按得分从高到低排序，条目名称与查询相同或以查询开头时加分，得分相同时新条目在前。
+    """
+    query = query.strip().lower()
+
+    def sort_key(item_id):
+        name = (names.get(item_id) or '').lower()
+        bonus = EXACT_BONUS if name == query else PREFIX_BONUS if name.startswith(query) else 0
+        return -(scores[item_id] + bonus), -item_id
+
+    return sorted(scores, key=sort_key)
+
+
+class ScanBackend:
+    """
+    不建索引，用 icontains 扫描 item 和 content 后在 Python 中排序，作为兜底。
+    """
+    name = 'scan'
+    score = staticmethod(substring_score)
+
+    def index_items(self, user, items):
+        pass
+
+    def remove_items(self, item_ids):
+        pass
+
+    def rebuild(self, user=None):
+        pass
+
+    def search(self, user, query):
+        words = query.lower().split()
+        if not words:
+            return []
+        condition = Q()
+        for word in words:
+            condition &= Q(item__icontains=word) | Q(content__icontains=word)
+        items = Item.objects.filter(condition)
+        if user is not None:
+            items = items.filter(user=user)
+
+        scores = {}
+        names = {}
+        for item_id, name, content in items.values_list('id', 'item', 'content').iterator(chunk_size=2000):
+            score = substring_score(query, name, content)
+            if score is not None:
+                scores[item_id] = score
+                names[item_id] = name
+        return _rank(query, scores, names)
+
+
+class TermIndexBackend:
+    """
+    适用于所有数据库的倒排索引，词项保存在 SearchTerm 表中，在 (user, term) 上建索引。
+    英文前缀查询对应 term LIKE 'abc%'，可以使用该索引。
+    """
+    name = 'index'
+    score = staticmethod(term_score)
+
+    @staticmethod
+    def _term_rows(items):
+        rows = []
+        for item in items:
+            item_terms = tokenize(item.item)
+            for term in item_terms:
+                rows.append(SearchTerm(user_id=item.user_id, item_id=item.pk, term=term, field=SearchTerm.ITEM))
+            for term in tokenize(item.content) - item_terms:
+                rows.append(SearchTerm(user_id=item.user_id, item_id=item.pk, term=term, field=SearchTerm.CONTENT))
+        return rows
+
+    def index_items(self, user, items):
+        items = list(items)
+        if not items:
+            return
+        if any(item.pk is None for item in items):
+            # 某些数据库（如 MySQL）的 bulk_create 不回填主键，只能整体重建
+            self.rebuild(user)
+            return
+        with transaction.atomic():
+            SearchTerm.objects.filter(item__in=[item.pk for item in items]).delete()
+            SearchTerm.objects.bulk_create(self._term_rows(items), batch_size=1000)
+
+    def remove_items(self, item_ids):
+        # 条目删除时 SearchTerm 随外键级联删除
+        pass
+
+    def rebuild(self, user=None):
+        items = Item.objects.all() if user is None else Item.objects.filter(user=user)
+        terms = SearchTerm.objects.all() if user is None else SearchTerm.objects.filter(user=user)
+        with transaction.atomic():
+            terms.delete()
+            batch = []
+            for item in items.only('id', 'user_id', 'item', 'content').iterator(chunk_size=2000):
+                batch.append(item)
+                if len(batch) >= 500:
+                    SearchTerm.objects.bulk_create(self._term_rows(batch), batch_size=1000)
+                    batch = []
+            SearchTerm.objects.bulk_create(self._term_rows(batch), batch_size=1000)
+
+    def search(self, user, query):
+        terms = parse_query(query)
+        if not terms:
+            return []
+        condition = Q()
+        for term, prefix in terms:
+            condition |= Q(term__startswith=term) if prefix else Q(term=term)
+        rows = SearchTerm.objects.filter(condition)
+        if user is not None:
+            rows = rows.filter(user=user)
+
+        # 每个条目命中的查询词项及其最高权重，所有词项都命中的条目才算结果
+        matched = {}
+        names = {}
+        for item_id, term, field, name in rows.values_list('item_id', 'term', 'field', 'item__item').iterator(
+            chunk_size=2000
+        ):
+            weight = ITEM_WEIGHT if field == SearchTerm.ITEM else CONTENT_WEIGHT
+            hits = matched.setdefault(item_id, {})
+            for query_term, prefix in terms:
+                if term == query_term or (prefix and term.startswith(query_term)):
+                    hits[query_term] = max(hits.get(query_term, 0), weight)
+            names[item_id] = name
+
+        scores = {item_id: sum(hits.values()) for item_id, hits in matched.items() if len(hits) == len(terms)}
+        return _rank(query, scores, names)
+
+
+class Fts5Backend:
+    """
+    SQLite FTS5 全文索引，使用 trigram 分词器，可以匹配任意位置的子串（包括中文）。
+    索引表以条目 id 为 rowid，在保存和批量插入时同步，不依赖触发器，
+    因此 Django 在 SQLite 上重建 EAW_item 表时不会丢失同步。
+    """
+    name = 'fts5'
+    score = staticmethod(substring_score)
+
+    def index_items(self, user, items):
+        items = list(items)
+        if not items:
+            return
+        if any(item.pk is None for item in items):
+            self.rebuild(user)
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(item.pk,) for item in items])
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, item, content, user_id) VALUES (%s, %s, %s, %s)",
+                [(item.pk, item.item, item.content or '', item.user_id) for item in items],
+            )
+
+    def remove_items(self, item_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(item_id,) for item_id in item_ids])
+
+    def rebuild(self, user=None):
+        item_table = Item._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            if user is None:
+                cursor.execute(f"DELETE FROM {FTS_TABLE}")
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE} (rowid, item, content, user_id) "
+                    f"SELECT id, item, COALESCE(content, ''), user_id FROM \"{item_table}\""
+                )
+            else:
+                cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE user_id = %s", [user.pk])
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE} (rowid, item, content, user_id) "
+                    f"SELECT id, item, COALESCE(content, ''), user_id FROM \"{item_table}\" WHERE user_id = %s",
+                    [user.pk],
+                )
+
+    def search(self, user, query):
+        words = query.split()
+        if not words:
+            return []
+        if any(len(word) < 3 for word in words):
+            # trigram 索引无法匹配少于 3 个字符的词，改为直接扫描
+            return ScanBackend().search(user, query)
+
+        match = ' AND '.join('"%s"' % word.replace('"', '""') for word in words)
+        sql = f"SELECT rowid, item, bm25({FTS_TABLE}, {ITEM_WEIGHT}, {CONTENT_WEIGHT}) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+        params = [match]
+        if user is not None:
+            sql += " AND user_id = %s"
+            params.append(user.pk)
+        sql += " ORDER BY 3 LIMIT %s"
+        params.append(SEARCH_MAX_RESULTS)
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        # bm25 越小越相关，取负数作为得分
+        scores = {item_id: -rank for item_id, name, rank in rows}
+        names = {item_id: name for item_id, name, rank in rows}
+        return _rank(query, scores, names)
+
+
+_BACKENDS = {
+    'scan': ScanBackend,
+    'index': TermIndexBackend,
+    'fts5': Fts5Backend,
+}
+_backend = None
+
+
+def get_backend():
+    """
+    按 SEARCH_BACKEND 返回搜索后端实例。
+    """
+    global _backend
+    if _backend is None:
+        name = SEARCH_BACKEND
+        if name == 'auto':
+            name = 'fts5' if fts5_supported() else 'index'
+        _backend = _BACKENDS[name]()
+    return _backend
+
+
+def search_items(user, query):
+    """
+    搜索用户的条目（user 为 None 时搜索全部用户），返回按相关度排序的条目 id 列表，最多 SEARCH_MAX_RESULTS 个。
+    """
+    return get_backend().search(user, query.strip())[:SEARCH_MAX_RESULTS]
+
+
+def index_items(user, items):
+    """
+    新建或修改条目（包括 bulk_create）后更新搜索索引。
+    """
+    get_backend().index_items(user, items)
+
+
+def remove_items(item_ids):
+    get_backend().remove_items(item_ids)
+
+
+def rebuild_search_index(user=None):
+    """
+    重建某个用户（user 为 None 时为全部用户）的搜索索引。
+    """
+    get_backend().rebuild(user)
+
+
+def _suggest_key(user, version, query):
+    return f"search-suggest:{user.pk}:{version}:{hashlib.md5(query.encode('utf-8')).hexdigest()}"
+
+
+def _candidate_rows(item_ids):
+    """
+    按 item_ids 的顺序返回 [(id, item, 类别名称, content), ...]。
+    """
+    rows = {
+        row[0]: row
+        for row in Item.objects.filter(id__in=item_ids).values_list('id', 'item', 'category__name', 'content')
+    }
+    return [rows[item_id] for item_id in item_ids if item_id in rows]
+
+
+def suggest_items(user, query, limit=SEARCH_SUGGEST_LIMIT):
+    """
+    输入联想，返回最多 limit 条 [(id, item, 类别名称, content), ...]。
+
+    每个查询的完整候选集（不超过 SEARCH_SUGGEST_CACHE_ROWS 条时）按用户缓存 SEARCH_SUGGEST_TTL 秒。
+    查询在已缓存的查询后继续输入时（如 "app" -> "appl"），新结果一定是旧候选集的子集，
+    因此直接在缓存的候选集中按同样的匹配规则过滤，不再查询数据库。
+    """
+    query = ' '.join(query.lower().split())[:SEARCH_SUGGEST_MAX_QUERY]
+    if not query:
+        return []
+
+    backend = get_backend()
+    # 带上用户的缓存版本号，条目变化后旧的候选集不再使用
+    version = user_cache_version(user.pk)
+    prefix_keys = {_suggest_key(user, version, query[:length]): length for length in range(1, len(query) + 1)}
+    cached = cache.get_many(list(prefix_keys))
+    if cached:
+        best_key = max(cached, key=prefix_keys.get)
+        candidates = cached[best_key]
+        if prefix_keys[best_key] == len(query):
+            return candidates[:limit]
+
+        scores = {}
+        rows = {}
+        for row in candidates:
+            score = backend.score(query, row[1], row[3])
+            if score is not None:
+                scores[row[0]] = score
+                rows[row[0]] = row
+        candidates = [rows[item_id] for item_id in _rank(query, scores, {pk: row[1] for pk, row in rows.items()})]
+    else:
+        item_ids = search_items(user, query)
+        if len(item_ids) > SEARCH_SUGGEST_CACHE_ROWS or len(item_ids) >= SEARCH_MAX_RESULTS:
+            # 候选集太大或被截断时不缓存，只取前 limit 条
+            return _candidate_rows(item_ids[:limit])
+        candidates = _candidate_rows(item_ids)
+
+    cache.set(_suggest_key(user, version, query), candidates, SEARCH_SUGGEST_TTL)
+    return candidates[:limit]
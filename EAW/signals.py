@@ -0,0 +1,106 @@
+# signals.py
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils.timezone import now
+from .caching import invalidate_user_cache
+from .models import Item, Category, ReviewDay
+from .search import index_items, remove_items
+from .stats import STATS_FIELDS, item_snapshot, stored_snapshot, update_user_stats, refresh_user_stats
+
+
+@receiver(post_save, sender=Item)
+def update_search_index(sender, instance, created, update_fields=None, **kwargs):
+    """
+    单个条目保存后更新搜索索引；只更新了与搜索无关的字段时跳过。bulk_create 不触发信号，由调用方负责。
+    """
+    if update_fields is not None and not {'item', 'content'} & set(update_fields):
+        return
+    index_items(instance.user, [instance])
+
+
+@receiver(post_delete, sender=Item)
+def remove_from_search_index(sender, instance, **kwargs):
+    remove_items([instance.pk])
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=ReviewDay)
+@receiver(post_delete, sender=ReviewDay)
+def invalidate_item_caches(sender, instance, **kwargs):
+    """
+    条目、类别或复习曲线变化后，使该用户按版本号缓存的统计数据和页面失效。
+    """
+    invalidate_user_cache(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_caches(sender, instance, **kwargs):
+    """
+    账号信息（如首页显示的姓名）变化后，使该用户缓存的页面失效。
+    """
+    invalidate_user_cache(instance.pk)
+
+
+def _deleted_directly(instance, origin):
+    """
+    判断删除是否由该模型本身发起（而不是删除用户或类别时的级联删除）。
+    """
+    return origin is None or origin is instance or getattr(origin, 'model', None) is type(instance)
+
+
+@receiver(pre_save, sender=Item)
+def remember_item_stats(sender, instance, update_fields=None, **kwargs):
+    """
+    修改已有条目前记录统计相关字段的旧值。
+    """
+    if instance.pk is None or (update_fields is not None and not STATS_FIELDS & set(update_fields)):
+        return
+    instance._stats_snapshot = stored_snapshot(instance.pk)
+
+
+@receiver(post_save, sender=Item)
+def update_item_stats(sender, instance, created, **kwargs):
+    if created:
+        update_user_stats(instance.user_id, added=[item_snapshot(instance)])
+        return
+    if not hasattr(instance, '_stats_snapshot'):
+        return
+    old = instance.__dict__.pop('_stats_snapshot')
+    new = item_snapshot(instance)
+    if old != new:
+        update_user_stats(instance.user_id, added=[new], removed=[old] if old else [])
+
+
+@receiver(post_delete, sender=Item)
+def remove_item_stats(sender, instance, origin=None, **kwargs):
+    # 级联删除时由发起删除的类别（或用户）统一处理
+    if _deleted_directly(instance, origin):
+        update_user_stats(instance.user_id, removed=[item_snapshot(instance)])
+
+
+@receiver(pre_save, sender=Category)
+def remember_category_rename(sender, instance, **kwargs):
+    instance._renamed = instance.pk is not None and 'name' in instance.get_dirty_fields()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def refresh_category_stats(sender, instance, origin=None, **kwargs):
+    """
+    类别改名或删除后重新计算统计中的各类别数量，改名时还需使条目的弹窗缓存失效。删除类别时其下的条目不一定已经删除，因此在事务提交后再计算。
+    """
+    if kwargs['signal'] is post_save and not getattr(instance, '_renamed', False):
+        return
+    if kwargs['signal'] is post_delete and not _deleted_directly(instance, origin):
+        return
+    if kwargs['signal'] is post_save:
+        # 复习弹窗中显示类别名称，改名后更新条目的 updated_at 使缓存的片段失效
+        Item.objects.filter(category=instance).update(updated_at=now())
+    user_id = instance.user_id
+    transaction.on_commit(lambda: refresh_user_stats(user_id))
@@ -0,0 +1,220 @@
+# srs.py
+
+from abc import ABC, abstractmethod
+import math
+from datetime import timedelta
+import environ
+from django.db.models import Q
+from .models import ReviewDay
+
+env = environ.Env()
+
+# 复习调度算法：fixed（按 ReviewDay 复习曲线，默认）、sm2 或 fsrs
+SRS_SCHEDULER = env.str('SRS_SCHEDULER', default='fixed')
+# FSRS 的目标记忆保持率
+SRS_DESIRED_RETENTION = env.float('SRS_DESIRED_RETENTION', default=0.9)
+
+DEFAULT_REVIEW_DAYS = [1, 2, 4, 7, 15, 30, 90, 180, 365]
+
+# 复习评分，与 FSRS 相同：1 忘记，2 困难，3 记得，4 简单
+AGAIN, HARD, GOOD, EASY = 1, 2, 3, 4
+# 复习页面的反馈对应的评分，reset 表示从头开始
+FEEDBACK_GRADES = {'yes': GOOD, 'no': AGAIN}
+
+# 调度状态字段，批量更新时使用
+SRS_FIELDS = ['ease', 'stability', 'difficulty', 'reps', 'lapses', 'last_reviewed', 'next_due']
+
+
+class CardState:
+    """
+    模拟器使用的调度状态，属性与 Item 上的调度字段相同，调度器对两者的处理方式一样。
+    """
+
+    def __init__(self, init_date):
+        self.initDate = init_date
+        self.ease = 2.5
+        self.stability = 0.0
+        self.difficulty = 0.0
+        self.reps = 0
+        self.lapses = 0
+        self.last_reviewed = None
+        self.next_due = None
+
+
+class Scheduler(ABC):
+    """
+    调度器基类。review 根据评分原地更新条目的调度状态，只依赖条目自身的字段，复杂度为 O(1)。
+    """
+    name = ''
+    # 新条目在 initDate 之后多少天第一次到期
+    first_interval = 1
+
+    @abstractmethod
+    def review(self, card, grade, today):
+        """
+        按评分 grade 更新 card 的调度状态，today 为复习日期。
+        """
+
+    def reset(self, card, today):
+        """
+        重新开始学习：清空调度状态，条目重新成为新条目。
+        """
+        card.initDate = today
+        card.ease = 2.5
+        card.stability = 0.0
+        card.difficulty = 0.0
+        card.reps = 0
+        card.last_reviewed = None
+        card.next_due = None
+
+    def due_date(self, card):
+        if card.next_due is not None:
+            return card.next_due
+        return card.initDate + timedelta(days=self.first_interval)
+
+    @staticmethod
+    def current_interval(card):
+        if card.next_due is not None and card.last_reviewed is not None:
+            return (card.next_due - card.last_reviewed).days
+        return 0
+
+    def _schedule(self, card, interval, today):
+        card.last_reviewed = today
+        card.next_due = today + timedelta(days=max(1, int(interval)))
+
+
+class FixedCurveScheduler(Scheduler):
+    """
+    原有的固定复习曲线：第 n 次复习安排在 initDate + 曲线上的第 n 个间隔，与答对与否无关。
+    """
+    name = 'fixed'
+
+    def __init__(self, review_days=None):
+        self.review_days = sorted(review_days or DEFAULT_REVIEW_DAYS)
+        self.first_interval = self.review_days[0]
+
+    def review(self, card, grade, today):
+        card.reps += 1
+        if grade == AGAIN:
+            card.lapses += 1
+        card.last_reviewed = today
+        for day in self.review_days:
+            due = card.initDate + timedelta(days=day)
+            if due > today:
+                card.next_due = due
+                return
+        # 曲线走完后按最后一个间隔继续复习
+        card.next_due = today + timedelta(days=self.review_days[-1])
+
+
+class SM2Scheduler(Scheduler):
+    """
+    SuperMemo SM-2：答对时间隔依次为 1、6 天，之后乘以难易系数；答错时从头开始，难易系数下调。
+    """
+    name = 'sm2'
+    # 评分对应 SM-2 的 0-5 分
+    QUALITY = {AGAIN: 1, HARD: 3, GOOD: 4, EASY: 5}
+
+    def review(self, card, grade, today):
+        quality = self.QUALITY[grade]
+        if quality < 3:
+            card.reps = 0
+            card.lapses += 1
+            interval = 1
+        else:
+            card.reps += 1
+            if card.reps == 1:
+                interval = 1
+            elif card.reps == 2:
+                interval = 6
+            else:
+                interval = round(max(1, self.current_interval(card)) * card.ease)
+        card.ease = max(1.3, card.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        self._schedule(card, interval, today)
+
+
+class FSRSScheduler(Scheduler):
+    """
+    FSRS v4：用稳定性 S（记忆保持率降到 90% 所需天数）和难度 D 描述记忆，
+    每次复习根据距上次复习的天数估算当前回忆概率 R，再更新 S 和 D。
+    """
+    name = 'fsrs'
+    # FSRS v4 的默认参数
+    WEIGHTS = [0.4, 0.6, 2.4, 5.8, 4.93, 0.94, 0.86, 0.01, 1.49, 0.14, 0.94, 2.18, 0.05, 0.34, 1.26, 0.29, 2.61]
+
+    def __init__(self, desired_retention=SRS_DESIRED_RETENTION):
+        self.desired_retention = desired_retention
+
+    def _initial_difficulty(self, grade):
+        w = self.WEIGHTS
+        return min(10.0, max(1.0, w[4] - (grade - 3) * w[5]))
+
+    @staticmethod
+    def retrievability(elapsed_days, stability):
+        return (1 + elapsed_days / (9 * stability)) ** -1
+
+    def review(self, card, grade, today):
+        w = self.WEIGHTS
+        if card.stability <= 0 or card.last_reviewed is None:
+            card.stability = w[grade - 1]
+            card.difficulty = self._initial_difficulty(grade)
+        else:
+            elapsed = max(0, (today - card.last_reviewed).days)
+            r = self.retrievability(elapsed, card.stability)
+            difficulty = card.difficulty - w[6] * (grade - 3)
+            difficulty = w[7] * self._initial_difficulty(GOOD) + (1 - w[7]) * difficulty
+            if grade == AGAIN:
+                card.stability = (
+                    w[11] * card.difficulty ** -w[12] * ((card.stability + 1) ** w[13] - 1) * math.exp(w[14] * (1 - r))
+                )
+            else:
+                hard_penalty = w[15] if grade == HARD else 1
+                easy_bonus = w[16] if grade == EASY else 1
+                card.stability *= 1 + (
+                    math.exp(w[8]) * (11 - card.difficulty) * card.stability ** -w[9]
+                    * (math.exp(w[10] * (1 - r)) - 1) * hard_penalty * easy_bonus
+                )
+            card.difficulty = min(10.0, max(1.0, difficulty))
+
+        if grade == AGAIN:
+            card.reps = 0
+            card.lapses += 1
+        else:
+            card.reps += 1
+        interval = 9 * card.stability * (1 / self.desired_retention - 1)
+        self._schedule(card, round(interval), today)
+
+
+SCHEDULERS = {
+    'fixed': FixedCurveScheduler,
+    'sm2': SM2Scheduler,
+    'fsrs': FSRSScheduler,
+}
+
+
+def get_scheduler(user=None, name=None):
+    """
+    返回调度器实例。固定曲线调度器使用用户自己的复习曲线（ReviewDay）。
+    """
+    name = name or SRS_SCHEDULER
+    if name == 'fixed':
+        review_days = list(ReviewDay.objects.filter(user=user).values_list('day', flat=True)) if user else None
+        return FixedCurveScheduler(review_days)
+    return SCHEDULERS[name]()
+
+
+def uses_fixed_curve():
+    """
+    固定曲线下复习页面仍按 ReviewSchedule 计算到期条目，其他调度器按 next_due 计算。
+    """
+    return SRS_SCHEDULER == 'fixed'
+
+
+def due_filter(review_date, scheduler):
+    """
+    按 next_due 筛选到 review_date 为止到期的条目：已复习过的条目对应 (user, next_due) 索引上的范围，
+    新条目（next_due 为空）对应 (user, initDate) 索引上的范围。
+    """
+    return Q(next_due__lte=review_date) | Q(
+        next_due__isnull=True, initDate__lte=review_date - timedelta(days=scheduler.first_interval)
+    )
@@ -0,0 +1,138 @@
+# stats.py
+
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils.timezone import localdate
+from .models import Item, Proficiency, ReviewSchedule, UserStats
+from .srs import due_filter, get_scheduler, uses_fixed_curve
+
+# 这些字段变化时需要更新统计
+STATS_FIELDS = {'category', 'proficiency', 'inputDate'}
+
+
+def item_snapshot(item):
+    """
+    统计所需的条目字段：(类别名称, proficiency, inputDate)。
+    """
+    category_name = item.category.name if item.category_id else ''
+    return category_name, item.proficiency, item.inputDate
+
+
+def stored_snapshot(item_id):
+    """
+    从数据库读取条目保存前的统计字段，条目不存在时返回 None。
+    """
+    row = Item.objects.filter(pk=item_id).values_list('category__name', 'proficiency', 'inputDate').first()
+    if row is None:
+        return None
+    return row[0] or '', row[1], row[2]
+
+
+def rebuild_user_stats(user_id):
+    """
+    按条目表重新计算用户的统计数据，返回 UserStats。
+    """
+    items = Item.objects.filter(user_id=user_id)
+    totals = items.aggregate(
+        total=Count('id'),
+        mastered=Count('id', filter=Q(proficiency=Proficiency.MASTERED)),
+        first_input_date=Min('inputDate'),
+    )
+    category_counts = {
+        name or '': count
+        for name, count in items.values_list('category__name').annotate(count=Count('id')).values_list(
+            'category__name', 'count'
+        )
+    }
+    stats, created = UserStats.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            'total_items': totals['total'],
+            'mastered_items': totals['mastered'],
+            'unfamiliar_items': totals['total'] - totals['mastered'],
+            'category_counts': category_counts,
+            'first_input_date': totals['first_input_date'],
+            'due_date': None,
+        },
+    )
+    return stats
+
+
+def refresh_user_stats(user_id):
+    """
+    统计记录已存在时重新计算（类别改名或删除后），不存在时留到下次读取时再生成。
+    """
+    if UserStats.objects.filter(pk=user_id).exists():
+        rebuild_user_stats(user_id)
+
+
+def update_user_stats(user_id, added=(), removed=()):
+    """
+    按条目快照增量更新统计：added 为新增条目，removed 为删除的条目，修改视为删除旧快照再新增新快照。
+    统计记录不存在时不做处理，下次读取时会整体生成。
+    """
+    added = list(added)
+    removed = list(removed)
+    if not added and not removed:
+        return
+    with transaction.atomic():
+        stats = UserStats.objects.select_for_update().filter(pk=user_id).first()
+        if stats is None:
+            return
+
+        counts = stats.category_counts
+        for sign, snapshots in ((1, added), (-1, removed)):
+            for category_name, proficiency, input_date in snapshots:
+                stats.total_items += sign
+                if proficiency == Proficiency.MASTERED:
+                    stats.mastered_items += sign
+                else:
+                    stats.unfamiliar_items += sign
+                counts[category_name] = counts.get(category_name, 0) + sign
+                if not counts[category_name]:
+                    del counts[category_name]
+
+        added_dates = [input_date for category_name, proficiency, input_date in added]
+        removed_dates = [input_date for category_name, proficiency, input_date in removed]
+        if stats.first_input_date and any(input_date <= stats.first_input_date for input_date in removed_dates):
+            # 删除了最早的条目时重新查询最早日期
+            stats.first_input_date = Item.objects.filter(user_id=user_id).aggregate(first=Min('inputDate'))['first']
+        elif added_dates:
+            first_added = min(added_dates)
+            if stats.first_input_date is None or first_added < stats.first_input_date:
+                stats.first_input_date = first_added
+        if removed:
+            # 删除条目时其复习到期记录随之删除
+            stats.due_date = None
+        stats.save()
+
+
+def mark_due_stale(user_id):
+    """
+    复习到期记录变化后调用，下次读取统计时重新计算今日到期数量。
+    """
+    UserStats.objects.filter(pk=user_id).update(due_date=None)
+
+
+def get_user_stats(user):
+    """
+    读取用户的统计数据：通常只是一次主键查询；统计记录不存在时生成，
+    日期变化或复习到期记录变化后重新计算今日到期的条目数量。
+    到期数量与复习页面列出的条目一致：包括此前到期的条目，每个条目只计一次。
+    """
+    stats = UserStats.objects.filter(pk=user.pk).first()
+    if stats is None:
+        stats = rebuild_user_stats(user.pk)
+
+    today = localdate()
+    if stats.due_date != today:
+        if uses_fixed_curve():
+            stats.due_count = (
+                ReviewSchedule.objects.filter(user_id=user.pk, due_date__lte=today).values('item_id').distinct().count()
+            )
+        else:
+            # 自适应调度下，到期未复习的条目会一直保持到期，因此包含此前到期的条目
+            stats.due_count = Item.objects.filter(due_filter(today, get_scheduler(user)), user=user).count()
+        stats.due_date = today
+        stats.save(update_fields=['due_count', 'due_date'])
+    return stats
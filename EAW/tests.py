@@ -0,0 +1,1209 @@
+import asyncio
+import base64
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import BytesIO, StringIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import importlib
+import json
+import os
+import random
+import threading
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.apps import apps
+from django.db import OperationalError, connection, transaction
+import openpyxl
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import localdate, now
+
+from .enrichment import ENRICHMENT_STALE_SECONDS, requeue_stale_jobs
+from .excel import import_items
+from .fragments import REVIEW_DETAILS_BATCH_LIMIT
+from .models import Category, EnrichmentJob, Item, Proficiency, ReviewDay, ReviewEvent, ReviewSchedule, SearchTerm
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+from .review import FEEDBACK_BATCH_LIMIT, apply_feedback, build_review_output, rebuild_review_schedule, review_calendar
+from .stats import get_user_stats
+from .utils import compare_and_merge
+from . import events, search, translate, transport
+from .management.commands.bench_merge import Command as BenchMergeCommand, legacy_compare_and_merge
+from .management.commands.simulate_srs import Command as SimulateCommand
+from .srs import (
+    AGAIN, EASY, GOOD, HARD, CardState, FixedCurveScheduler, FSRSScheduler, SM2Scheduler, due_filter, get_scheduler,
+)
+
+REVIEW_DATE = date(2026, 6, 1)
+
+
+def create_user(username, review_days=(1, 2, 4, 7, 15, 30)):
+    """
+    创建用户、默认类别“单词”和复习曲线，返回 (user, category)。
+    """
+    user = User.objects.create_user(username=username, password='pw')
+    category = Category.objects.create(user=user, name="单词", sort_order=1, is_default=True)
+    ReviewDay.objects.bulk_create([ReviewDay(user=user, day=day) for day in review_days])
+    return user, category
+
+
+def create_items(user, category, init_dates):
+    """
+    按 init_dates 为用户创建条目并生成复习到期记录，返回条目列表。
+    """
+    items = Item.objects.bulk_create([
+        Item(user=user, category=category, item=f"word{i}", content='', inputDate=init_date, initDate=init_date)
+        for i, init_date in enumerate(init_dates)
+    ])
+    rebuild_review_schedule(user)
+    return items
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN 的输出格式依赖 SQLite")
+class ItemIndexPlanTests(TestCase):
+    """
+    在 100k 条目的数据库上用 EXPLAIN QUERY PLAN 检查复习页面、条目列表和首页实际执行的条目查询
+    使用了 (user, ...) 复合索引，而不是扫描整张表或只按 user_id 查找后排序。
+    """
+    USERS = 4
+    ITEMS_PER_USER = 25000
+    # 条目的日期从 2025-06-01 开始；复习日期选在前几天，只有少量条目到期，渲染页面不会太慢
+    REVIEW_DATE = date(2025, 6, 10)
+
+    @classmethod
+    def setUpTestData(cls):
+        users = []
+        for index in range(cls.USERS):
+            user = User.objects.create_user(username=f'plan-user{index}', password='pw')
+            Category.objects.create(user=user, name="单词", sort_order=1, is_default=True)
+            ReviewDay.objects.bulk_create([ReviewDay(user=user, day=day) for day in (1, 2, 4, 7, 15, 30)])
+            users.append(user)
+        cls.user = users[-1]
+
+        # 逐个创建 100k 个模型实例太慢，直接用 INSERT ... SELECT 生成条目和复习到期记录：
+        # 日期分布在一年内，一半条目已按自适应调度复习过（next_due 不为空）
+        item_table = Item._meta.db_table
+        category_table = Category._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < %s)
+                INSERT INTO "{item_table}" (
+                    item, content, "inputDate", "initDate", proficiency, user_id, category_id, src_tts,
+                    uk_phonetic, us_phonetic, difficulty, ease, lapses, last_reviewed, next_due, reps, stability,
+                    updated_at
+                )
+                SELECT 'word' || seq.n, '', date('2025-06-01', '+' || (seq.n % 365) || ' days'),
+                       date('2025-06-01', '+' || (seq.n % 365) || ' days'), %s, category.user_id, category.id, '',
+                       '', '', 0, 2.5, 0, NULL,
+                       CASE WHEN seq.n % 2 THEN date('2025-06-01', '+' || (seq.n % 400) || ' days') END,
+                       0, 0, %s
+                FROM seq CROSS JOIN "{category_table}" AS category
+            """, [cls.ITEMS_PER_USER - 1, Proficiency.UNFAMILIAR, now()])
+            cursor.execute(f"""
+                INSERT INTO "{ReviewSchedule._meta.db_table}" (due_date, interval, item_id, user_id)
+                SELECT date(item."initDate", '+' || review_day.day || ' days'), review_day.day, item.id, item.user_id
+                FROM "{item_table}" AS item JOIN "{ReviewDay._meta.db_table}" AS review_day
+                    ON review_day.user_id = item.user_id
+            """)
+            # 生成 sqlite_stat1，让查询规划器像在有数据的生产库上一样按统计信息选择索引
+            cursor.execute('ANALYZE')
+
+    def test_seeded_rows(self):
+        self.assertEqual(Item.objects.count(), self.USERS * self.ITEMS_PER_USER)
+        self.assertEqual(ReviewSchedule.objects.filter(user=self.user).count(), self.ITEMS_PER_USER * 6)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def query_plans(self, path, table):
+        """
+        请求 path，返回其中查询 table 的每条 SQL 的查询计划文本。
+        """
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or f'FROM "{table}"' not in sql:
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plans.append(' | '.join(str(row[-1]) for row in cursor.fetchall()))
+        self.assertTrue(plans, f"{path} 没有查询 {table}")
+        return '\n'.join(plans)
+
+    def test_item_list_uses_input_date_and_category_indexes(self):
+        plans = self.query_plans('/list/', 'EAW_item')
+        # 游标分页按 (inputDate, id) 倒序读取，类别统计按 (user, category) 分组
+        self.assertIn('eaw_item_user_inputdate_idx', plans)
+        self.assertIn('eaw_item_user_category_idx', plans)
+        self.assertNotIn('SCAN EAW_item', plans)
+
+    def test_review_view_fixed_curve_uses_schedule_index(self):
+        plans = self.query_plans(f'/review/{self.REVIEW_DATE:%Y-%m-%d}/', 'EAW_reviewschedule')
+        self.assertIn('eaw_schedule_user_due_idx', plans)
+
+    @mock.patch('EAW.srs.SRS_SCHEDULER', 'sm2')
+    def test_review_view_adaptive_uses_due_indexes(self):
+        plans = self.query_plans(f'/review/{self.REVIEW_DATE:%Y-%m-%d}/', 'EAW_item')
+        # next_due <= D 和 next_due IS NULL 两个分支都在 (user, next_due) 索引上做范围查找
+        self.assertIn('MULTI-INDEX OR', plans)
+        self.assertIn('eaw_item_user_next_due_idx', plans)
+        self.assertNotIn('SCAN EAW_item', plans)
+
+    @mock.patch('EAW.srs.SRS_SCHEDULER', 'sm2')
+    def test_home_due_count_uses_due_indexes(self):
+        plans = self.query_plans('/', 'EAW_item')
+        self.assertIn('MULTI-INDEX OR', plans)
+        self.assertIn('eaw_item_user_next_due_idx', plans)
+        self.assertNotIn('SCAN EAW_item', plans)
+
+
+class RequeueStaleJobsTests(TestCase):
+    """
+    worker 退出后遗留的 running 任务：还有重试次数的放回队列，次数用尽的转入 dead 状态。
+    """
+
+    def test_stale_jobs_requeued_or_dead(self):
+        user = User.objects.create_user(username='worker-user', password='pw')
+        category = Category.objects.create(user=user, name="单词", sort_order=1, is_default=True)
+        today = localdate()
+        items = [
+            Item.objects.create(user=user, category=category, item=f"word{i}", inputDate=today, initDate=today)
+            for i in range(3)
+        ]
+        stale_at = now() - timedelta(seconds=ENRICHMENT_STALE_SECONDS + 60)
+        retry = EnrichmentJob.objects.create(
+            user=user, item=items[0], status=EnrichmentJob.RUNNING, attempts=2, locked_at=stale_at
+        )
+        exhausted = EnrichmentJob.objects.create(
+            user=user, item=items[1], status=EnrichmentJob.RUNNING, attempts=5, max_attempts=5, locked_at=stale_at
+        )
+        running = EnrichmentJob.objects.create(
+            user=user, item=items[2], status=EnrichmentJob.RUNNING, attempts=5, max_attempts=5, locked_at=now()
+        )
+
+        self.assertEqual(requeue_stale_jobs(), 1)
+
+        retry.refresh_from_db()
+        exhausted.refresh_from_db()
+        running.refresh_from_db()
+        self.assertEqual(retry.status, EnrichmentJob.PENDING)
+        self.assertIsNone(retry.locked_at)
+        self.assertEqual(exhausted.status, EnrichmentJob.DEAD)
+        self.assertTrue(exhausted.last_error)
+        self.assertEqual(running.status, EnrichmentJob.RUNNING)
+
+
+class _BaiduStub(BaseHTTPRequestHandler):
+    """
+    模拟百度的 OAuth 和翻译接口。token_delay 让并发的刷新请求在服务器端重叠；
+    translate_errors 中的错误码依次作为翻译接口的响应返回，用完后返回正常结果。
+    """
+    token_requests = 0
+    token_delay = 0
+    expires_in = 1000
+    translate_requests = 0
+    translate_errors = []
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        cls = type(self)
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.path.startswith('/token'):
+            with cls.lock:
+                cls.token_requests += 1
+                count = cls.token_requests
+            threading.Event().wait(cls.token_delay)
+            body = {'access_token': f"token{count}", 'expires_in': cls.expires_in}
+        else:
+            with cls.lock:
+                cls.translate_requests += 1
+                error_code = cls.translate_errors.pop(0) if cls.translate_errors else None
+            if error_code:
+                body = {'error_code': error_code, 'error_msg': "Access token invalid"}
+            else:
+                word = json.dumps({'word_result': {'simple_means': {
+                    'word_means': ["苹果"],
+                    'symbols': [{'ph_en': "ap", 'ph_am': "ap", 'parts': [{'part': "n.", 'means': ["苹果"]}]}],
+                }}})
+                body = {'result': {'trans_result': [{'dict': word, 'src_tts': ''}]}}
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class AccessTokenManagerTests(SimpleTestCase):
+    """
+    AccessTokenManager 对本地模拟的百度接口：缓存到 expires_in - margin、并发时只刷新一次、
+    翻译接口返回 110 / 111 时刷新 token 并重试一次。
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _BaiduStub)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        _BaiduStub.token_requests = 0
+        _BaiduStub.token_delay = 0
+        _BaiduStub.expires_in = 1000
+        _BaiduStub.translate_requests = 0
+        _BaiduStub.translate_errors = []
+        self.manager = translate.AccessTokenManager('test-key', 'test-secret', f"{self.base_url}/token", 50)
+
+    def test_token_cached_until_refresh_margin(self):
+        with mock.patch.object(translate.time, 'time', return_value=1000000.0):
+            self.assertEqual(self.manager.get_token(), 'token1')
+        # expires_in=1000，提前 50 秒刷新：第 949 秒仍使用缓存，第 951 秒重新获取
+        with mock.patch.object(translate.time, 'time', return_value=1000000.0 + 949):
+            self.assertEqual(self.manager.get_token(), 'token1')
+        self.assertEqual(_BaiduStub.token_requests, 1)
+        with mock.patch.object(translate.time, 'time', return_value=1000000.0 + 951):
+            self.assertEqual(self.manager.get_token(), 'token2')
+        self.assertEqual(_BaiduStub.token_requests, 2)
+
+    def test_token_shared_through_django_cache(self):
+        self.assertEqual(self.manager.get_token(), 'token1')
+        # 同一 API Key 的另一个实例（其他进程）从 Django 缓存中读取，不再请求
+        other = translate.AccessTokenManager('test-key', 'test-secret', f"{self.base_url}/token", 50)
+        self.assertEqual(other.get_token(), 'token1')
+        self.assertEqual(_BaiduStub.token_requests, 1)
+
+    def test_concurrent_threads_refresh_once(self):
+        _BaiduStub.token_delay = 0.2
+        barrier = threading.Barrier(10)
+        tokens = []
+
+        def worker():
+            barrier.wait()
+            tokens.append(self.manager.get_token())
+
+        threads = [threading.Thread(target=worker) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(tokens, ['token1'] * 10)
+        self.assertEqual(_BaiduStub.token_requests, 1)
+
+    def fetch(self, query):
+        with mock.patch.multiple(
+            translate,
+            BAIDU_API_KEY='test-key',
+            BAIDU_SECRET_KEY='test-secret',
+            BAIDU_TRANSLATE_URL=f"{self.base_url}/translate",
+            token_manager=self.manager,
+        ):
+            return translate.fetch_translation(query, raise_errors=True)
+
+    def test_auth_error_refreshes_and_retries_once(self):
+        for error_code in translate.AUTH_ERROR_CODES:
+            with self.subTest(error_code=error_code):
+                self.setUp()
+                _BaiduStub.translate_errors = [error_code]
+                result = self.fetch('apple')
+                self.assertEqual(result['parts_and_means'], ["词性: n.\n释义: 苹果"])
+                self.assertEqual(_BaiduStub.translate_requests, 2)
+                self.assertEqual(_BaiduStub.token_requests, 2)
+                self.assertEqual(self.manager.get_token(), 'token2')
+
+    def test_auth_error_retried_only_once(self):
+        _BaiduStub.translate_errors = [110, 110, 110]
+        with self.assertRaises(translate.TranslationError):
+            self.fetch('apple')
+        self.assertEqual(_BaiduStub.translate_requests, 2)
+        self.assertEqual(_BaiduStub.token_requests, 2)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    """
+    请求被取消或中断时只释放试探名额，不计为上游失败；请求错误才计为失败。
+    """
+
+    def setUp(self):
+        self.breaker = transport.CircuitBreaker(threshold=2, cooldown=0)
+        self.sync = transport.Transport(
+            pool_size=1, connect_timeout=1, read_timeout=1, max_retries=0,
+            backoff_base=0, backoff_max=0, breaker=self.breaker,
+        )
+
+    def open_breaker(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.is_open)
+
+    def test_interrupt_releases_trial_without_failure(self):
+        with mock.patch.object(self.sync, '_send', side_effect=KeyboardInterrupt):
+            for _ in range(5):
+                with self.assertRaises(KeyboardInterrupt):
+                    self.sync.post('http://upstream.invalid/')
+        self.assertFalse(self.breaker.is_open)
+
+    def test_request_error_counts_as_failure(self):
+        with mock.patch.object(self.sync, '_send', side_effect=ValueError("bad url")):
+            for _ in range(2):
+                with self.assertRaises(ValueError):
+                    self.sync.post('http://upstream.invalid/')
+        self.assertTrue(self.breaker.is_open)
+
+    def test_interrupted_trial_is_released(self):
+        self.open_breaker()
+        with mock.patch.object(self.sync, '_send', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                self.sync.post('http://upstream.invalid/')
+        # 试探名额已释放，下一个请求可以继续试探
+        self.assertTrue(self.breaker.allow_request())
+
+    @skipUnless(transport.httpx, "需要 httpx")
+    def test_cancelled_async_requests_do_not_open_breaker(self):
+        async_transport = transport.AsyncTransport(
+            pool_size=1, connect_timeout=1, read_timeout=1, sync_transport=self.sync,
+        )
+
+        async def slow_send(method, url, **kwargs):
+            await asyncio.sleep(10)
+
+        async def cancel_requests():
+            with mock.patch.object(async_transport, '_send', slow_send):
+                for _ in range(5):
+                    with self.assertRaises(asyncio.TimeoutError):
+                        await asyncio.wait_for(async_transport.post('http://upstream.invalid/'), 0.01)
+
+        asyncio.run(cancel_requests())
+        self.assertFalse(self.breaker.is_open)
+
+        self.open_breaker()
+        asyncio.run(cancel_requests())
+        self.assertTrue(self.breaker.allow_request())
+
+
+class ImportItemsTests(TestCase):
+    """
+    同步获取释义的导入：释义在打开事务之前获取，事务中只读取释义缓存。
+    """
+
+    def workbook(self, rows):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(["Item", "Content", "Input Date", "Init Date", "Proficiency", "Category"])
+        for row in rows:
+            sheet.append(row)
+        data = BytesIO()
+        workbook.save(data)
+        data.seek(0)
+        return data
+
+    def test_definitions_fetched_outside_transaction(self):
+        user = User.objects.create_user(username='import-user', password='pw')
+        rows = [[f"word{i}", "", "2026-01-01", "2026-01-01", "Unfamiliar", "单词" if i % 2 else "句子"] for i in range(1200)]
+        # TestCase 本身运行在事务中，导入的事务表现为多一层保存点
+        depth = len(connection.savepoint_ids)
+        in_transaction = []
+        stored = {}
+
+        def fake_batch_translate(queries):
+            in_transaction.append(len(connection.savepoint_ids) > depth)
+            stored.update((query, {'simple_meaning': [f"简明释义: {query}"]}) for query in queries)
+            return [stored[query] for query in queries]
+
+        def fake_get_many(queries):
+            return {query: stored[query] for query in queries if query in stored}
+
+        progress = []
+        with mock.patch('EAW.excel.ENRICHMENT_IN_BACKGROUND', False), \
+                mock.patch('EAW.excel.batch_translate', fake_batch_translate), \
+                mock.patch('EAW.translate.translation_cache.get_many', fake_get_many):
+            result = import_items(user, self.workbook(rows), fetch_definitions=True,
+                                  progress=lambda r: progress.append(r.success_count))
+
+        self.assertEqual(result.success_count, 1200)
+        self.assertEqual(progress, [500, 1000, 1200])
+        # 600 个“单词”条目分两批请求，都不在事务中
+        self.assertEqual(in_transaction, [False, False])
+        self.assertIn("简明释义: word1", Item.objects.get(user=user, item="word1").content)
+        self.assertFalse(Item.objects.get(user=user, item="word2").content)
+
+
+class DueCountTests(TestCase):
+    """
+    首页的今日到期数量与复习页面列出的条目一致：包括此前到期的条目，每个条目只计一次。
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user, category = create_user('due-user', review_days=(1, 2, 4))
+        today = localdate()
+        # 早已到期（三个间隔都已过）、今天第一次到期、今天第二次到期、今天新录入（未到期）
+        create_items(self.user, category, [today - timedelta(days=d) for d in (10, 1, 2, 0)])
+
+    def test_fixed_curve_due_count_matches_review_page(self):
+        output = build_review_output(self.user, localdate())
+        listed = {item.pk for rows in output.values() for interval, item, url in rows}
+        self.assertEqual(len(listed), 3)
+        self.assertEqual(get_user_stats(self.user).due_count, 3)
+
+    @mock.patch('EAW.srs.SRS_SCHEDULER', 'sm2')
+    def test_adaptive_due_count_matches_review_page(self):
+        output = build_review_output(self.user, localdate())
+        listed = {item.pk for rows in output.values() for interval, item, url in rows}
+        self.assertEqual(get_user_stats(self.user).due_count, len(listed))
+
+    def assert_calendar_today_matches_due_count(self):
+        calendar = review_calendar(self.user, days_ahead=7, days_back=0)
+        self.assertEqual(calendar['upcoming'][0]['date'], localdate().isoformat())
+        self.assertEqual(calendar['upcoming'][0]['due'], get_user_stats(self.user).due_count)
+        return calendar
+
+    def test_fixed_curve_calendar_today_matches_due_count(self):
+        calendar = self.assert_calendar_today_matches_due_count()
+        # 之后每天只计当天新到期的条目，例如明天：昨天录入的条目（第 2 天）和今天录入的条目（第 1 天）
+        self.assertEqual([day['due'] for day in calendar['upcoming'][:5]], [3, 2, 2, 1, 1])
+
+    @mock.patch('EAW.srs.SRS_SCHEDULER', 'sm2')
+    def test_adaptive_calendar_today_matches_due_count(self):
+        self.assert_calendar_today_matches_due_count()
+
+
+class ReviewFeedbackTests(TestCase):
+    """
+    批量复习反馈：同一条目以最后一次操作为准、不存在或其他用户的条目返回在 missing 中、
+    reset 重新生成复习到期记录，以及批量接口对请求体的校验。
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user, category = create_user('feedback-user', review_days=(1, 2, 4))
+        self.items = create_items(self.user, category, [localdate() - timedelta(days=10)] * 3)
+        other, other_category = create_user('feedback-other')
+        self.other_item = create_items(other, other_category, [localdate()])[0]
+        self.client.force_login(self.user)
+
+    def post_batch(self, body):
+        return self.client.post('/review-feedback/batch/', data=body, content_type='application/json')
+
+    def test_last_action_wins(self):
+        item = self.items[0]
+        results, missing = apply_feedback(self.user, [(item.pk, 'yes'), (str(item.pk), 'no')])
+        self.assertEqual(missing, [])
+        self.assertEqual(list(results), [item.pk])
+        item.refresh_from_db()
+        self.assertEqual(item.proficiency, Proficiency.UNFAMILIAR)
+        # 每个条目只记录最终的一次反馈
+        self.assertEqual(list(ReviewEvent.objects.filter(item_id=item.pk).values_list('action', flat=True)),
+                         [ReviewEvent.NO])
+
+    def test_missing_and_other_users_items(self):
+        results, missing = apply_feedback(self.user, [(self.items[0].pk, 'yes'), (999999, 'yes'), (self.other_item.pk, 'no')])
+        self.assertEqual(list(results), [self.items[0].pk])
+        self.assertEqual(missing, [999999, self.other_item.pk])
+        self.other_item.refresh_from_db()
+        self.assertEqual(self.other_item.proficiency, Proficiency.UNFAMILIAR)
+
+    def test_reset_regenerates_schedule(self):
+        item = self.items[1]
+        apply_feedback(self.user, [(item.pk, 'reset')])
+        item.refresh_from_db()
+        today = localdate()
+        self.assertEqual(item.initDate, today)
+        self.assertEqual(
+            sorted(ReviewSchedule.objects.filter(item=item).values_list('due_date', flat=True)),
+            [today + timedelta(days=day) for day in (1, 2, 4)],
+        )
+
+    def test_unknown_action_rejected(self):
+        with self.assertRaises(ValueError):
+            apply_feedback(self.user, [(self.items[0].pk, 'maybe')])
+
+    def test_batch_view(self):
+        response = self.post_batch({'feedback': [
+            {'id': self.items[0].pk, 'action': 'yes'},
+            {'id': self.items[1].pk, 'action': 'no'},
+            {'id': 999999, 'action': 'yes'},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(set(data['results']), {str(self.items[0].pk), str(self.items[1].pk)})
+        self.assertEqual(data['missing'], [999999])
+        self.items[0].refresh_from_db()
+        self.assertEqual(self.items[0].proficiency, Proficiency.MASTERED)
+
+    def test_batch_limit(self):
+        entries = [{'id': self.items[0].pk, 'action': 'yes'}] * (FEEDBACK_BATCH_LIMIT + 1)
+        response = self.post_batch({'feedback': entries})
+        self.assertEqual(response.status_code, 400)
+        self.items[0].refresh_from_db()
+        self.assertEqual(self.items[0].proficiency, Proficiency.UNFAMILIAR)
+        self.assertFalse(ReviewEvent.objects.exists())
+
+    def test_batch_rejects_invalid_bodies(self):
+        for body in ([{'id': self.items[0].pk, 'action': 'yes'}], {'feedback': {'id': 1}}, {'feedback': [1, 2]},
+                     {'feedback': [{'id': self.items[0].pk}]}, {'feedback': [{'id': 'abc', 'action': 'yes'}]},
+                     {'feedback': [{'id': self.items[0].pk, 'action': 'maybe'}]}, 'not json'):
+            with self.subTest(body=body):
+                response = self.post_batch(body if body != 'not json' else '{not json')
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.json()['success'])
+                self.assertNotIn('object has no attribute', response.json()['message'])
+
+    def test_batch_requires_post(self):
+        self.assertEqual(self.client.get('/review-feedback/batch/').status_code, 405)
+
+
+class SchedulerTests(SimpleTestCase):
+    """
+    调度算法的确定性测试：从新条目开始按给定评分依次在到期日复习，检查每次安排的间隔和状态。
+    """
+    INIT_DATE = date(2026, 1, 1)
+
+    def run_reviews(self, scheduler, grades):
+        """
+        返回 (每次复习后安排的间隔天数列表, 条目)。第一次复习在 initDate 之后一天，之后都在到期日复习。
+        """
+        card = CardState(self.INIT_DATE)
+        today = self.INIT_DATE + timedelta(days=1)
+        intervals = []
+        for grade in grades:
+            scheduler.review(card, grade, today)
+            self.assertEqual(card.last_reviewed, today)
+            intervals.append((card.next_due - today).days)
+            today = card.next_due
+        return intervals, card
+
+    def test_sm2_interval_growth(self):
+        intervals, card = self.run_reviews(SM2Scheduler(), [GOOD] * 5)
+        # 1、6 天之后乘以难易系数 2.5：round(6 * 2.5) = 15，round(15 * 2.5) = 38，round(38 * 2.5) = 95
+        self.assertEqual(intervals, [1, 6, 15, 38, 95])
+        self.assertAlmostEqual(card.ease, 2.5)
+        self.assertEqual((card.reps, card.lapses), (5, 0))
+
+    def test_sm2_easy_and_hard_adjust_ease(self):
+        intervals, card = self.run_reviews(SM2Scheduler(), [EASY] * 4)
+        self.assertEqual(intervals, [1, 6, 16, 45])
+        self.assertAlmostEqual(card.ease, 2.9)
+        intervals, card = self.run_reviews(SM2Scheduler(), [HARD] * 4)
+        self.assertEqual(intervals, [1, 6, 13, 27])
+        self.assertAlmostEqual(card.ease, 1.94)
+
+    def test_sm2_lapse_and_ease_floor(self):
+        intervals, card = self.run_reviews(SM2Scheduler(), [GOOD, GOOD, GOOD] + [AGAIN] * 5 + [GOOD])
+        # 答错后从 1 天重新开始，难易系数每次下调 0.54，最低为 1.3
+        self.assertEqual(intervals, [1, 6, 15, 1, 1, 1, 1, 1, 1])
+        self.assertAlmostEqual(card.ease, 1.3)
+        self.assertEqual((card.reps, card.lapses), (1, 5))
+
+    def test_fsrs_first_review_uses_initial_weights(self):
+        scheduler = FSRSScheduler(desired_retention=0.9)
+        for grade, stability, difficulty in ((AGAIN, 0.4, 6.81), (HARD, 0.6, 5.87), (GOOD, 2.4, 4.93), (EASY, 5.8, 3.99)):
+            with self.subTest(grade=grade):
+                card = CardState(self.INIT_DATE)
+                scheduler.review(card, grade, self.INIT_DATE)
+                self.assertAlmostEqual(card.stability, stability)
+                self.assertAlmostEqual(card.difficulty, difficulty)
+
+    def test_fsrs_stability_and_difficulty_updates(self):
+        intervals, card = self.run_reviews(FSRSScheduler(desired_retention=0.9), [GOOD] * 4)
+        # 目标保持率 0.9 时间隔约等于稳定性
+        self.assertEqual(intervals, [2, 7, 21, 58])
+        self.assertAlmostEqual(card.stability, 57.6295, places=3)
+        self.assertAlmostEqual(card.difficulty, 4.93)
+
+        intervals, card = self.run_reviews(FSRSScheduler(desired_retention=0.9), [GOOD, GOOD, AGAIN, GOOD])
+        self.assertEqual(intervals, [2, 7, 2, 6])
+        self.assertAlmostEqual(card.stability, 5.7848, places=3)
+        self.assertAlmostEqual(card.difficulty, 6.6158, places=3)
+        self.assertEqual((card.reps, card.lapses), (1, 1))
+
+    def test_fsrs_desired_retention(self):
+        intervals, card = self.run_reviews(FSRSScheduler(desired_retention=0.8), [GOOD, GOOD])
+        # 保持率要求越低，同样的稳定性对应的间隔越长
+        self.assertEqual(intervals, [5, 30])
+        self.assertAlmostEqual(FSRSScheduler.retrievability(10, 10), 0.9)
+
+    def test_fixed_curve_follows_review_days(self):
+        intervals, card = self.run_reviews(FixedCurveScheduler([4, 1, 2]), [GOOD, AGAIN, GOOD, GOOD])
+        # 按 initDate + 曲线安排，与评分无关；曲线走完后按最后一个间隔继续
+        self.assertEqual(intervals, [1, 2, 4, 4])
+        self.assertEqual(card.lapses, 1)
+
+    def test_reset_clears_state(self):
+        scheduler = SM2Scheduler()
+        intervals, card = self.run_reviews(scheduler, [GOOD, GOOD])
+        scheduler.reset(card, date(2026, 3, 1))
+        self.assertEqual(card.initDate, date(2026, 3, 1))
+        self.assertIsNone(card.next_due)
+        self.assertEqual(scheduler.due_date(card), date(2026, 3, 2))
+
+
+class DueFilterTests(TestCase):
+    """
+    due_filter：已复习的条目按 next_due，新条目按 initDate + 第一个间隔判断是否到期。
+    """
+
+    def test_due_filter(self):
+        user, category = create_user('due-filter-user', review_days=(3, 7))
+        review_date = date(2026, 6, 10)
+        items = {}
+        for name, init_date, next_due in (
+            ('reviewed-due', date(2026, 5, 1), review_date),
+            ('reviewed-overdue', date(2026, 5, 1), date(2026, 6, 1)),
+            ('reviewed-later', date(2026, 5, 1), review_date + timedelta(days=1)),
+            ('new-due-sm2', review_date - timedelta(days=1), None),
+            ('new-due-fixed', review_date - timedelta(days=3), None),
+            ('new-today', review_date, None),
+        ):
+            items[name] = Item.objects.create(user=user, category=category, item=name,
+                                              inputDate=init_date, initDate=init_date, next_due=next_due)
+
+        def due(scheduler):
+            return set(Item.objects.filter(due_filter(review_date, scheduler), user=user).values_list('item', flat=True))
+
+        self.assertEqual(due(get_scheduler(name='sm2')),
+                         {'reviewed-due', 'reviewed-overdue', 'new-due-sm2', 'new-due-fixed'})
+        # 固定曲线的第一个间隔来自用户的复习曲线（3 天）
+        self.assertEqual(due(get_scheduler(user, name='fixed')), {'reviewed-due', 'reviewed-overdue', 'new-due-fixed'})
+
+
+class ReviewViewETagTests(TestCase):
+    """
+    复习页面和条目详情接口的 ETag：内容未变化时按 If-None-Match 返回 304，写入后返回 200 和新的 ETag。
+    复习页面的 ETag 还包含当前的调度算法，切换 SRS_SCHEDULER 后不会返回旧页面的 304。
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_review_page_revalidates_until_write(self):
+        user, category = create_user('etag-review-user')
+        items = create_items(user, category, [REVIEW_DATE - timedelta(days=1), REVIEW_DATE - timedelta(days=2)])
+        self.client.force_login(user)
+        path = f'/review/{REVIEW_DATE:%Y-%m-%d}/'
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        # 第二次请求由按用户缓存的响应返回，仍然按 If-None-Match 返回 304
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+        self.assertNotEqual(self.client.get(f'/review/{REVIEW_DATE + timedelta(days=1):%Y-%m-%d}/')['ETag'], etag)
+
+        response = self.client.post(
+            '/review-feedback/batch/', json.dumps({'feedback': [{'id': items[0].pk, 'action': 'yes'}]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_item_details_revalidate_until_write(self):
+        user, category = create_user('etag-details-user')
+        items = create_items(user, category, [REVIEW_DATE, REVIEW_DATE])
+        other, other_category = create_user('etag-details-other')
+        other_item = create_items(other, other_category, [REVIEW_DATE])[0]
+        self.client.force_login(user)
+        params = {'ids': f'{items[0].pk},{items[1].pk},{other_item.pk}'}
+
+        response = self.client.get('/api/review-items/', params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(set(data['items']), {str(items[0].pk), str(items[1].pk)})
+        self.assertEqual(data['missing'], [other_item.pk])
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+
+        self.assertEqual(self.client.get('/api/review-items/', params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(
+            self.client.get('/api/review-items/', params, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304
+        )
+
+        items[1].content = "修改后的内容"
+        items[1].save()
+        response = self.client.get('/api/review-items/', params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn("修改后的内容", response.json()['items'][str(items[1].pk)])
+
+    def test_item_details_rejects_bad_ids(self):
+        user, category = create_user('etag-bad-ids-user')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get('/api/review-items/', {'ids': '1,x'}).status_code, 400)
+        ids = ','.join(str(i) for i in range(1, REVIEW_DETAILS_BATCH_LIMIT + 2))
+        self.assertEqual(self.client.get('/api/review-items/', {'ids': ids}).status_code, 400)
+        response = self.client.get('/api/review-items/', {'ids': ''})
+        self.assertEqual(response.json(), {'success': True, 'items': {}, 'missing': []})
+
+    def test_etag_follows_scheduler(self):
+        user, category = create_user('etag-scheduler-user')
+        self.client.force_login(user)
+        path = f'/review/{REVIEW_DATE:%Y-%m-%d}/'
+        etag = self.client.get(path)['ETag']
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with mock.patch('EAW.srs.SRS_SCHEDULER', 'sm2'):
+            response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class ReviewEventTests(TestCase):
+    """
+    record_review_events：直接写入时随当前事务提交或回滚；使用缓冲区时事务提交后才放入缓冲区，由 flush 批量写入。
+    """
+
+    def setUp(self):
+        self.user, category = create_user('event-user')
+        self.item = create_items(self.user, category, [localdate()])[0]
+
+    def event(self, action=ReviewEvent.YES):
+        return ReviewEvent(user_id=self.user.pk, item_id=self.item.pk, reviewed_at=now(), action=action, interval=1)
+
+    @mock.patch('EAW.events.REVIEW_EVENT_BUFFERED', False)
+    def test_direct_write(self):
+        with self.assertNumQueries(1):
+            events.record_review_events([self.event(), self.event(ReviewEvent.NO)])
+        self.assertEqual(ReviewEvent.objects.count(), 2)
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            events.record_review_events([self.event()])
+            raise RuntimeError
+        self.assertEqual(ReviewEvent.objects.count(), 2)
+
+    @mock.patch('EAW.events.REVIEW_EVENT_BUFFERED', True)
+    def test_buffered_write_after_commit(self):
+        buffer = events.EventBuffer(flush_size=100, flush_ms=1000)
+        # 不启动后台线程，由测试调用 flush；测试运行在事务中，不能关闭连接
+        with mock.patch.object(events, '_buffer', buffer), \
+                mock.patch.object(buffer, '_ensure_thread'), \
+                mock.patch.object(events, 'close_old_connections'):
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertNumQueries(0):
+                    events.record_review_events([self.event(), self.event()])
+                self.assertEqual(buffer._events, [])
+            self.assertEqual(len(buffer._events), 2)
+
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                events.record_review_events([self.event()])
+            # 未提交（回滚）的反馈不会进入缓冲区
+            self.assertEqual(len(callbacks), 1)
+            self.assertEqual(len(buffer._events), 2)
+
+            self.assertEqual(buffer.flush(), 2)
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(ReviewEvent.objects.count(), 2)
+
+
+class SimulateEventsReplayTests(TestCase):
+    """
+    simulate_srs --from-events 回放已记录的复习，复习日期按当前时区计算。
+    """
+
+    def test_replay_uses_local_dates(self):
+        user, category = create_user('replay-user')
+        item = create_items(user, category, [date(2026, 3, 1)])[0]
+        # UTC 16:30 在 Asia/Shanghai 已是次日 00:30
+        reviewed_at = [datetime(2026, 3, 2, 16, 30, tzinfo=dt_timezone.utc), datetime(2026, 3, 5, 16, 30, tzinfo=dt_timezone.utc)]
+        ReviewEvent.objects.bulk_create([
+            ReviewEvent(user=user, item_id=item.pk, reviewed_at=reviewed_at[0], action=ReviewEvent.YES, interval=2),
+            ReviewEvent(user=user, item_id=item.pk, reviewed_at=reviewed_at[1], action=ReviewEvent.NO, interval=3),
+        ])
+
+        histories = []
+
+        def replay(scheduler, item_histories):
+            histories.append(dict(item_histories))
+            return {'reviews': 0, 'avg': 0.0, 'peak': 0, 'retention': 0.0}
+
+        with mock.patch.object(SimulateCommand, '_replay', staticmethod(replay)):
+            call_command('simulate_srs', '--from-events', '--schedulers', 'sm2', stdout=StringIO())
+        self.assertEqual(histories, [{item.pk: [
+            (date(2026, 3, 3), ReviewEvent.YES, 2),
+            (date(2026, 3, 6), ReviewEvent.NO, 3),
+        ]}])
+
+        out = StringIO()
+        call_command('simulate_srs', '--from-events', '--user', 'replay-user', stdout=out)
+        self.assertIn("1 items, 2 events", out.getvalue())
+        for name in ('fixed', 'sm2', 'fsrs'):
+            self.assertIn(name, out.getvalue())
+
+    def test_replay_without_events(self):
+        out = StringIO()
+        call_command('simulate_srs', '--from-events', stdout=out)
+        self.assertIn("没有可回放的复习记录", out.getvalue())
+
+
+def without_fts5():
+    """
+    让 SQLite 创建 FTS5 表的语句失败，模拟未编译 FTS5 或版本过低的 SQLite。
+    """
+    real_cursor = connection.cursor
+
+    def cursor():
+        wrapper = real_cursor()
+        execute = wrapper.execute
+
+        def failing_execute(sql, params=None):
+            if 'fts5' in sql:
+                raise OperationalError('no such module: fts5')
+            return execute(sql, params)
+
+        wrapper.execute = failing_execute
+        return wrapper
+
+    return mock.patch.object(connection, 'cursor', cursor)
+
+
+class SearchBackendTests(TestCase):
+    """
+    FTS5 trigram 和 SearchTerm 倒排索引两个后端对同样的查询返回同样的条目，包括中文和少于 3 个字符的查询。
+    """
+    ENTRIES = [
+        ("apple", "苹果，一种常见的水果"),
+        ("application", "应用程序；申请"),
+        ("apply", "申请；应用"),
+        ("banana", "香蕉，一种热带水果"),
+        ("orange juice", "橙汁"),
+    ]
+    QUERIES = [
+        "apple", "app", "appl", "APPLY", "orange juice", "juice", "一种常见", "应用程序", "热带水果",
+        # 少于 3 个字符：FTS5 后端改为扫描
+        "ap", "应用", "果", "申请 app",
+        "pear", "水果 orange",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, category = create_user('search-user')
+        other, other_category = create_user('search-other')
+        Item.objects.bulk_create(
+            [Item(user=cls.user, category=category, item=name, content=content, inputDate=REVIEW_DATE, initDate=REVIEW_DATE)
+             for name, content in cls.ENTRIES]
+            + [Item(user=other, category=other_category, item="apple", content="苹果", inputDate=REVIEW_DATE,
+                    initDate=REVIEW_DATE)]
+        )
+        cls.ids = dict(Item.objects.filter(user=cls.user).values_list('item', 'id'))
+
+    def backends(self):
+        backends = [search.TermIndexBackend()]
+        if search.fts5_supported():
+            backends.append(search.Fts5Backend())
+        for backend in backends:
+            backend.rebuild()
+        return backends
+
+    def names(self, item_ids):
+        names = {item_id: name for name, item_id in self.ids.items()}
+        return [names[item_id] for item_id in item_ids]
+
+    def test_backends_return_same_items(self):
+        if not search.fts5_supported():
+            self.skipTest("SQLite 不支持 FTS5 trigram")
+        index, fts5 = self.backends()
+        for query in self.QUERIES:
+            with self.subTest(query=query):
+                expected = index.search(self.user, query)
+                self.assertCountEqual(fts5.search(self.user, query), expected)
+                # 两个后端的打分不同，但完整匹配条目名称的结果都排在第一位
+                if query.lower() in self.ids:
+                    self.assertEqual(self.names(expected[:1]), [query.lower()])
+                    self.assertEqual(self.names(fts5.search(self.user, query)[:1]), [query.lower()])
+
+    def test_matches(self):
+        for backend in self.backends():
+            with self.subTest(backend=backend.name):
+                self.assertCountEqual(self.names(backend.search(self.user, "app")), ["apple", "application", "apply"])
+                self.assertCountEqual(self.names(backend.search(self.user, "应用")), ["application", "apply"])
+                self.assertCountEqual(self.names(backend.search(self.user, "果")), ["apple", "banana"])
+                self.assertEqual(self.names(backend.search(self.user, "一种常见")), ["apple"])
+                self.assertCountEqual(self.names(backend.search(self.user, "申请 app")), ["application", "apply"])
+                self.assertEqual(backend.search(self.user, "pear"), [])
+                self.assertEqual(backend.search(self.user, "   "), [])
+                # 其他用户的条目不出现在结果中
+                self.assertEqual(len(backend.search(None, "apple")), 2)
+
+    def test_item_name_ranked_above_content(self):
+        for backend in self.backends():
+            with self.subTest(backend=backend.name):
+                # "apply" 的名称命中 appl，"申请；应用" 只在 content 中命中 应用
+                self.assertEqual(self.names(backend.search(self.user, "apply")), ["apply"])
+                self.assertEqual(self.names(backend.search(self.user, "apple")[:1]), ["apple"])
+
+    def test_short_queries_fall_back_to_scan(self):
+        if not search.fts5_supported():
+            self.skipTest("SQLite 不支持 FTS5 trigram")
+        fts5 = search.Fts5Backend()
+        fts5.rebuild(self.user)
+        for query in ("ap", "应用", "果", "申请 app"):
+            with self.subTest(query=query):
+                with CaptureQueriesContext(connection) as ctx:
+                    item_ids = fts5.search(self.user, query)
+                self.assertTrue(item_ids)
+                self.assertEqual(item_ids, search.ScanBackend().search(self.user, query))
+                self.assertFalse([q for q in ctx.captured_queries if search.FTS_TABLE in q['sql']])
+
+    def test_index_follows_saves_and_deletes(self):
+        for backend in self.backends():
+            with self.subTest(backend=backend.name), mock.patch('EAW.search._backend', backend):
+                item = Item.objects.get(pk=self.ids["banana"])
+                item.content = "香蕉；芭蕉"
+                item.save()
+                self.assertEqual(self.names(backend.search(self.user, "芭蕉")), ["banana"])
+                self.assertEqual(backend.search(self.user, "热带水果"), [])
+
+                created = Item.objects.create(user=self.user, category=item.category, item="pineapple", content="菠萝",
+                                              inputDate=REVIEW_DATE, initDate=REVIEW_DATE)
+                self.assertEqual(backend.search(self.user, "pineapple"), [created.pk])
+                created.delete()
+                self.assertEqual(backend.search(self.user, "pineapple"), [])
+
+    def test_search_view(self):
+        self.client.force_login(self.user)
+        search.rebuild_search_index()
+        response = self.client.get('/search/', {'q': 'app'})
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual([item.item for item in response.context['query']], ["apple", "application", "apply"])
+        response = self.client.get('/search/', {'q': '水果'})
+        self.assertCountEqual([item.item for item in response.context['query']], ["apple", "banana"])
+
+
+class SearchBackendProbeTests(TestCase):
+    """
+    SQLite 不支持 FTS5 时，运行时的探测和迁移 0013 都退回到 SearchTerm 倒排索引。
+    """
+    migration = importlib.import_module('EAW.migrations.0013_searchterm')
+
+    def test_runtime_probe_falls_back_to_index(self):
+        with mock.patch('EAW.search._fts5_supported', None), mock.patch('EAW.search._backend', None), \
+                mock.patch('EAW.search.SEARCH_BACKEND', 'auto'):
+            with without_fts5():
+                self.assertFalse(search.fts5_supported())
+            self.assertIsInstance(search.get_backend(), search.TermIndexBackend)
+
+    def test_migration_probe(self):
+        schema_editor = mock.Mock(connection=connection)
+        schema_editor.execute.side_effect = OperationalError('no such module: fts5')
+        self.assertFalse(self.migration.create_fts_table(schema_editor))
+
+        schema_editor = mock.Mock(connection=mock.Mock(vendor='mysql'))
+        self.assertFalse(self.migration.create_fts_table(schema_editor))
+        schema_editor.execute.assert_not_called()
+
+    def test_migration_builds_term_index_without_fts5(self):
+        user, category = create_user('probe-user')
+        items = Item.objects.bulk_create([
+            Item(user=user, category=category, item="apple", content="苹果", inputDate=REVIEW_DATE, initDate=REVIEW_DATE),
+            Item(user=user, category=category, item="apply", content="申请", inputDate=REVIEW_DATE, initDate=REVIEW_DATE),
+        ])
+        SearchTerm.objects.all().delete()
+        schema_editor = mock.Mock(connection=connection)
+        schema_editor.execute.side_effect = OperationalError('no such module: fts5')
+        with mock.patch.dict(os.environ):
+            os.environ.pop('SEARCH_BACKEND', None)
+            self.migration.create_search_index(apps, schema_editor)
+
+        expected = {(row.item_id, row.term, row.field) for row in search.TermIndexBackend._term_rows(items)}
+        self.assertEqual(set(SearchTerm.objects.values_list('item_id', 'term', 'field')), expected)
+        self.assertEqual(search.TermIndexBackend().search(user, "苹果"), [items[0].pk])
+
+
+class SearchSuggestTests(TestCase):
+    """
+    输入联想接口：limit 参数的解析，以及继续输入时在缓存的候选集中过滤而不再查询数据库。
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, category = create_user('suggest-user')
+        Item.objects.bulk_create([
+            Item(user=cls.user, category=category, item=name, content=content, inputDate=REVIEW_DATE, initDate=REVIEW_DATE)
+            for name, content in [
+                ("apple", "苹果"), ("application", "应用程序"), ("apply", "申请；应用"), ("banana", "香蕉"),
+            ]
+        ])
+        cls.category = category
+
+    def setUp(self):
+        cache.clear()
+        search.rebuild_search_index()
+        self.client.force_login(self.user)
+
+    def suggest(self, **params):
+        response = self.client.get('/api/search-suggest/', params)
+        self.assertEqual(response.status_code, 200)
+        return [row['item'] for row in response.json()['results']]
+
+    def test_results(self):
+        response = self.client.get('/api/search-suggest/', {'q': 'apple'})
+        item = Item.objects.get(user=self.user, item='apple')
+        self.assertEqual(response.json(), {'success': True, 'results': [
+            {'id': item.pk, 'item': 'apple', 'category': '单词', 'url': f'/item/{item.pk}/'},
+        ]})
+        self.assertCountEqual(self.suggest(q='app'), ["apple", "application", "apply"])
+        self.assertCountEqual(self.suggest(q='应用'), ["application", "apply"])
+        self.assertEqual(self.suggest(q='苹'), ["apple"])
+        self.assertEqual(self.suggest(q='   '), [])
+
+    @mock.patch('EAW.views.SEARCH_SUGGEST_LIMIT', 2)
+    def test_limit_parsing(self):
+        self.assertEqual(len(self.suggest(q='app', limit='1')), 1)
+        # 超过上限、无法解析或小于 1 的 limit 分别按上限、默认值和 1 处理
+        self.assertEqual(len(self.suggest(q='app', limit='100')), 2)
+        self.assertEqual(len(self.suggest(q='app', limit='abc')), 2)
+        self.assertEqual(len(self.suggest(q='app', limit='0')), 1)
+        self.assertEqual(len(self.suggest(q='app', limit='-5')), 1)
+
+    def test_longer_query_filters_cached_candidates(self):
+        self.assertCountEqual(
+            [row[1] for row in search.suggest_items(self.user, 'app')], ["apple", "application", "apply"]
+        )
+        with self.assertNumQueries(0):
+            self.assertCountEqual([row[1] for row in search.suggest_items(self.user, 'appl')], ["apple", "application", "apply"])
+            self.assertEqual([row[1] for row in search.suggest_items(self.user, 'APPLI')], ["application"])
+            self.assertEqual(search.suggest_items(self.user, 'appz'), [])
+            self.assertEqual(len(search.suggest_items(self.user, 'app', limit=1)), 1)
+
+    def test_item_writes_invalidate_candidates(self):
+        search.suggest_items(self.user, 'app')
+        Item.objects.create(user=self.user, category=self.category, item="applause", content="掌声",
+                            inputDate=REVIEW_DATE, initDate=REVIEW_DATE)
+        self.assertIn("applause", [row[1] for row in search.suggest_items(self.user, 'appl')])
+
+
+def base64_cursor(data):
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+
+
+class KeysetPaginationTests(TestCase):
+    """
+    条目列表的游标分页：排序键 inputDate 相同时按 id 区分，前后翻页不重复不遗漏，无效游标被拒绝。
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, category = create_user('keyset-user')
+        other, other_category = create_user('keyset-other')
+        # 多个条目落在同一天，翻页边界会落在日期相同的条目之间
+        days = [date(2026, 5, 1)] * 3 + [date(2026, 5, 2)] * 3 + [date(2026, 5, 3)]
+        create_items(cls.user, category, days)
+        create_items(other, other_category, days)
+        cls.expected = list(Item.objects.filter(user=cls.user).order_by('-inputDate', '-id').values_list('id', flat=True))
+
+    def items(self):
+        return Item.objects.filter(user=self.user)
+
+    def test_cursor_round_trip(self):
+        item = self.items().first()
+        self.assertEqual(decode_cursor(encode_cursor(item)), (item.inputDate, item.pk, False))
+        self.assertEqual(decode_cursor(encode_cursor(item, backwards=True)), (item.inputDate, item.pk, True))
+        self.assertNotIn('=', encode_cursor(item))
+
+    def test_invalid_cursors(self):
+        garbage = [
+            'not-a-cursor', '!!!', 'é',
+            base64_cursor('[1, 2]'), base64_cursor('"text"'), base64_cursor('{"d": "2026-05-01"}'),
+            base64_cursor('{"d": "05/01/2026", "i": 1}'), base64_cursor('{"d": 20260501, "i": 1}'),
+            base64_cursor('{"d": "2026-05-01", "i": "x"}'), base64_cursor('{"d": "2026-05-01", "i": null}'),
+        ]
+        for token in garbage:
+            with self.subTest(token=token):
+                with self.assertRaises(InvalidCursor):
+                    keyset_page(self.items(), token, 2)
+
+    def test_pages_forward_and_backward(self):
+        pages = []
+        page = keyset_page(self.items(), None, 2)
+        self.assertFalse(page.has_previous())
+        pages.append([item.pk for item in page])
+        while page.has_next():
+            page = keyset_page(self.items(), page.next_cursor, 2)
+            self.assertTrue(page.has_previous())
+            pages.append([item.pk for item in page])
+        self.assertEqual([pk for rows in pages for pk in rows], self.expected)
+        self.assertEqual([len(rows) for rows in pages], [2, 2, 2, 1])
+
+        # 从最后一页向前翻，得到同样的各页
+        backwards = []
+        while page.has_previous():
+            page = keyset_page(self.items(), page.previous_cursor, 2)
+            self.assertTrue(page.has_next())
+            backwards.append([item.pk for item in page])
+        self.assertEqual(backwards, pages[-2::-1])
+
+    def test_item_list_view(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/list/')
+        self.assertEqual([item.pk for item in response.context['page_obj']], self.expected)
+        self.assertTrue(response.context['keyset'])
+        # 无效游标退回第一页
+        response = self.client.get('/list/', {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item.pk for item in response.context['page_obj']], self.expected)
+        response = self.client.get('/list/', {'page': '1'})
+        self.assertEqual([item.pk for item in response.context['page_obj']], self.expected)
+        self.assertFalse(response.context['keyset'])
+
+
+class CompareAndMergeTests(SimpleTestCase):
+    """
+    compare_and_merge 先用上界排除不相似的行，合并结果必须与逐对计算 ratio() 的原实现相同。
+    """
+
+    def test_merge(self):
+        existing = ["n. 苹果", "adj. 常见的；普通的"]
+        # "n. 苹果树" 与 "n. 苹果" 的相似度约为 0.91，视为重复
+        new = ["n. 苹果", "n. 苹果树", "adj. 常见的；普通的。", "n. 香蕉", "v. 申请", ""]
+        self.assertEqual(compare_and_merge(existing, new), existing + ["n. 香蕉", "v. 申请", ""])
+        self.assertEqual(compare_and_merge([], ["a", "a"]), ["a", "a"])
+        self.assertEqual(compare_and_merge(existing, []), existing)
+
+    def test_matches_legacy_implementation(self):
+        rng = random.Random(1)
+        command = BenchMergeCommand()
+        for size in (1, 5, 30):
+            for _ in range(10):
+                existing, new = command._case(rng, size)
+                for threshold in (0.5, 0.8, 1.0):
+                    self.assertEqual(
+                        compare_and_merge(existing, new, threshold), legacy_compare_and_merge(existing, new, threshold)
+                    )
+
+    def test_bench_command(self):
+        out = StringIO()
+        call_command('bench_merge', '--sizes', '5', '--rounds', '2', stdout=out)
+        self.assertIn('speedup', out.getvalue())
+
+
+class ReviewHomeTests(TestCase):
+    """
+    复习首页默认选中的日期是当前时区的今天。
+    """
+
+    def test_today_uses_local_date(self):
+        user, category = create_user('review-home-user')
+        self.client.force_login(user)
+        # UTC 17:00 在 Asia/Shanghai 已是次日 01:00
+        with mock.patch('django.utils.timezone.now', return_value=datetime(2026, 3, 1, 17, 0, tzinfo=dt_timezone.utc)):
+            response = self.client.get('/review/')
+        self.assertEqual(response.context['today'], date(2026, 3, 2))
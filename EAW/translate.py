@@ -2,7 +2,16 @@ import requests
 import json
 import environ
 from django.http import JsonResponse
+from django.core.cache import cache
 import re
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from .transport import transport, async_transport, RateLimiter, ASYNC_REQUEST_ERRORS
+from .translation_cache import translation_cache
 
 env = environ.Env(
     DEBUG=(bool, False)
@@ -12,81 +21,307 @@ env = environ.Env(
 BAIDU_API_KEY = env('BAIDU_API_KEY', default=None)
 BAIDU_SECRET_KEY = env('BAIDU_SECRET_KEY', default=None)
 
+# 百度接口地址，可通过环境变量指向本地的模拟服务器进行测试
+BAIDU_TOKEN_URL = env('BAIDU_TOKEN_URL', default="https://aip.baidubce.com/oauth/2.0/token")
+BAIDU_TRANSLATE_URL = env('BAIDU_TRANSLATE_URL', default="https://aip.baidubce.com/rpc/2.0/mt/texttrans-with-dict/v1")
+# access_token 到期前多少秒主动刷新
+BAIDU_TOKEN_REFRESH_MARGIN = env.int('BAIDU_TOKEN_REFRESH_MARGIN', default=24 * 3600)
+
+# 百度返回的 access_token 无效 / 过期错误码
+AUTH_ERROR_CODES = (110, 111)
+
+class TranslationError(Exception):
+    """
+    百度接口暂时不可用（网络错误、HTTP 错误或返回错误码）。
+    """
+
+
+# 批量翻译时每个 API Key 每秒最多请求次数，以及并发线程数
+BAIDU_QPS = env.float('BAIDU_QPS', default=10)
+BAIDU_BATCH_WORKERS = env.int('BAIDU_BATCH_WORKERS', default=8)
+# 异步批量翻译时同时进行的请求数上限（仍受 BAIDU_QPS 限流）
+BAIDU_ASYNC_CONCURRENCY = env.int('BAIDU_ASYNC_CONCURRENCY', default=100)
+
+
+class AccessTokenManager:
+    """
+    缓存百度 access_token：先查进程内缓存，再查 Django 缓存，都失效时才请求 OAuth 接口。
+    - 在 expires_in 到期前 refresh_margin 秒主动刷新
+    - 同一进程内同一时间只有一个线程执行刷新（single-flight），其余线程等待并复用结果
+    """
+
+    def __init__(self, api_key, secret_key, token_url, refresh_margin):
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.token_url = token_url
+        self.refresh_margin = refresh_margin
+        self.cache_key = f"baidu-access-token:{api_key}"
+        self._token = None
+        self._refresh_at = 0
+        self._lock = threading.Lock()
+
+    def get_token(self):
+        """
+        返回可用的 access_token，获取失败时返回 None。
+        """
+        token = self._cached_token()
+        if token:
+            return token
+
+        with self._lock:
+            # 等待锁期间其他线程可能已经完成刷新
+            token = self._cached_token()
+            if token:
+                return token
+            return self._refresh()
+
+    async def aget_token(self):
+        """
+        get_token 的异步版本。进程内缓存有效时直接返回，否则在线程池中执行 get_token
+        （查询 Django 缓存和刷新 token 都是同步操作，且很少发生）。
+        """
+        if self._token and time.time() < self._refresh_at:
+            return self._token
+        return await sync_to_async(self.get_token, thread_sensitive=False)()
+
+    def invalidate(self, token):
+        """
+        百度返回鉴权错误时调用。只有当前缓存的仍是这个 token 时才清除，避免重复刷新。
+        """
+        with self._lock:
+            if self._token == token:
+                self._token = None
+                self._refresh_at = 0
+            cached = cache.get(self.cache_key)
+            if cached and cached.get('token') == token:
+                cache.delete(self.cache_key)
+
+    def _cached_token(self):
+        now = time.time()
+        if self._token and now < self._refresh_at:
+            return self._token
+
+        cached = cache.get(self.cache_key)
+        if cached and now < cached['refresh_at']:
+            self._token = cached['token']
+            self._refresh_at = cached['refresh_at']
+            return self._token
+        return None
+
+    def _refresh(self):
+        if not self.api_key or not self.secret_key:
+            return None
+
+        params = {"grant_type": "client_credentials", "client_id": self.api_key, "client_secret": self.secret_key}
+        try:
+            response = transport.post(self.token_url, params=params)
+        except requests.exceptions.RequestException as e:
+            print(f"获取 access_token 失败: {e}")
+            return None
+
+        if response.status_code != 200:
+            print(f"获取 access_token 失败: {response.status_code}")
+            return None
+
+        data = response.json()
+        token = data.get("access_token")
+        if not token:
+            print(f"获取 access_token 失败: {data.get('error_description', data)}")
+            return None
+
+        # 有效期较短时按比例提前刷新，避免提前量超过有效期本身
+        expires_in = int(data.get("expires_in", 0))
+        margin = min(self.refresh_margin, expires_in // 10)
+        lifetime = max(expires_in - margin, 0)
+
+        self._token = str(token)
+        self._refresh_at = time.time() + lifetime
+        if lifetime:
+            cache.set(self.cache_key, {'token': self._token, 'refresh_at': self._refresh_at}, timeout=lifetime)
+        return self._token
+
+
+token_manager = AccessTokenManager(BAIDU_API_KEY, BAIDU_SECRET_KEY, BAIDU_TOKEN_URL, BAIDU_TOKEN_REFRESH_MARGIN)
+
 def baidu_translate(query):
+    """
+    查询单词释义，优先使用共享的释义缓存，未命中时才请求百度接口。
+    """
+    query = standardize_input(query)
+    return translation_cache.get_or_fetch(query, fetch_translation)
+
+
+async def abaidu_translate(query):
+    """
+    baidu_translate 的异步版本，供 async 视图使用。
+    """
+    query = standardize_input(query)
+    return await translation_cache.aget_or_fetch(query, afetch_translation)
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(api_key):
+    """
+    每个 API Key 共用一个限流器，与百度控制台的 QPS 配额对应。
+    """
+    with _rate_limiters_lock:
+        if api_key not in _rate_limiters:
+            _rate_limiters[api_key] = RateLimiter(BAIDU_QPS)
+        return _rate_limiters[api_key]
+
+
+def batch_translate(queries, max_workers=None, return_exceptions=False):
+    """
+    批量查询释义，返回与 queries 顺序一致的结果列表，失败的查询对应空字典。
+    先批量查询释义缓存，未命中的查询词去重后在线程池中并发请求百度，并按 API Key 限流。
+    return_exceptions 为 True 时，请求失败的查询对应 TranslationError 实例，且不写入缓存。
+    """
+    normalized = [standardize_input(query) for query in queries]
+    results = translation_cache.get_many(normalized)
+    missing = [query for query in dict.fromkeys(normalized) if query not in results]
+
+    if missing:
+        limiter = get_rate_limiter(BAIDU_API_KEY)
+
+        def fetch(query):
+            limiter.acquire()
+            try:
+                return translation_cache.timed_fetch(
+                    lambda q: fetch_translation(q, raise_errors=return_exceptions), query
+                )
+            except TranslationError as e:
+                return e
+
+        workers = min(max_workers or BAIDU_BATCH_WORKERS, len(missing))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # 每个任务在当前上下文的副本中运行，请求级的耗时统计（metrics）在工作线程中同样可用
+            futures = [executor.submit(contextvars.copy_context().run, fetch, query) for query in missing]
+            fetched = [future.result() for future in futures]
+
+        # 缓存写入放在当前线程，避免工作线程各自打开数据库连接
+        for query, result in zip(missing, fetched):
+            if isinstance(result, TranslationError):
+                results[query] = result
+                continue
+            if not isinstance(result, dict):
+                result = {}
+            translation_cache.set(query, result)
+            results[query] = result
+
+    return [results.get(query, {}) for query in normalized]
+
+
+def cached_translations(queries):
+    """
+    只从释义缓存中读取，不请求百度接口，返回与 queries 顺序一致的结果列表，未命中的查询对应空字典。
+    用于数据库事务中：释义需在打开事务之前通过 batch_translate 获取。
+    """
+    normalized = [standardize_input(query) for query in queries]
+    results = translation_cache.get_many(normalized)
+    return [results.get(query, {}) for query in normalized]
+
+
+async def abatch_translate(queries, concurrency=None, return_exceptions=False):
+    """
+    batch_translate 的异步版本：未命中缓存的查询词在同一个事件循环中并发请求，不为每个请求占用线程，
+    同时进行的请求最多 concurrency 个，并与同步版本共用按 API Key 的限流器。
+    """
+    normalized = [standardize_input(query) for query in queries]
+    results = await translation_cache.aget_many(normalized)
+    missing = [query for query in dict.fromkeys(normalized) if query not in results]
+
+    if missing:
+        limiter = get_rate_limiter(BAIDU_API_KEY)
+        semaphore = asyncio.Semaphore(concurrency or BAIDU_ASYNC_CONCURRENCY)
+
+        async def fetch(query):
+            async with semaphore:
+                await limiter.aacquire()
+                try:
+                    return await translation_cache.atimed_fetch(
+                        lambda q: afetch_translation(q, raise_errors=return_exceptions), query
+                    )
+                except TranslationError as e:
+                    return e
+
+        fetched = await asyncio.gather(*(fetch(query) for query in missing))
+
+        for query, result in zip(missing, fetched):
+            if isinstance(result, TranslationError):
+                results[query] = result
+                continue
+            if not isinstance(result, dict):
+                result = {}
+            await translation_cache.aset(query, result)
+            results[query] = result
+
+    return [results.get(query, {}) for query in normalized]
+
+
+def _translation_request(query):
+    """
+    返回请求百度接口的 (请求体, 请求头)。
+    """
+    payload = json.dumps({
+        "from": "en",
+        "to": "zh",
+        "q": query
+    })
+    headers = {
+        'Content-Type': 'application/json',
+        'Accept': 'application/json'
+    }
+    return payload, headers
+
+
+def fetch_translation(query, raise_errors=False):
+    """
+    直接请求百度接口查询已标准化的 query，不经过缓存。
+    raise_errors 为 True 时，网络错误、HTTP 错误和百度返回的错误码抛出 TranslationError 而不是返回空字典，
+    方便后台任务区分"暂时失败需要重试"和"没有释义"。
+    """
     #print(query)
     # 检查 API 密钥是否配置
     if not BAIDU_API_KEY or not BAIDU_SECRET_KEY:
         print("API 密钥未配置")
+        if raise_errors:
+            raise TranslationError("未配置百度 API 密钥")
         return JsonResponse({"success": False, "message": "未配置百度 API 密钥"}, status=400)
     
-    query = standardize_input(query)
-    
     try:
-        # 构造请求 URL
-        url = f"https://aip.baidubce.com/rpc/2.0/mt/texttrans-with-dict/v1?access_token={get_access_token()}"
-
         # 构造请求数据
-        payload = json.dumps({
-            "from": "en",
-            "to": "zh",
-            "q": query
-        })
-        headers = {
-            'Content-Type': 'application/json',
-            'Accept': 'application/json'
-        }
+        payload, headers = _translation_request(query)
 
-        # 发送请求
-        response = requests.request("POST", url, headers=headers, data=payload)
+        # access_token 失效时刷新后重试一次
+        for attempt in range(2):
+            access_token = get_access_token()
+            url = f"{BAIDU_TRANSLATE_URL}?access_token={access_token}"
 
-        # 检查响应状态
-        if response.status_code != 200:
-            print(f"请求失败，HTTP 状态码: {response.status_code}")
-            return {}
-
-        # 转换 JSON 数据为 Python 字典
-        json_response = response.json()
-        #print(json_response)
-        # 检查返回的数据，判断输入是否为中文
-        if 'result' in json_response:
-            trans_result = json_response['result'].get('trans_result', [])
-            if trans_result:
-                dict_content = trans_result[0].get('dict', None)
-                if dict_content:
-                    dict_data = json.loads(dict_content)  # 解析 dict 字段中的 JSON
-                    if dict_data.get('lang') == '0':  # 如果 lang == '0' 表示中文
-                        print("输入为中文，返回空结果")
-                        return {}  # 返回空字典，表示输入是中文
-
-        # 检查 API 返回的内容是否有效
-        if 'result' not in json_response or 'trans_result' not in json_response['result']:
-            print("API 返回数据不完整或无翻译结果")
-            return {}
-
-        # 提取翻译结果
-        trans_result = json_response['result']['trans_result'][0]
-        dict_content = trans_result.get('dict', None)
-        src_tts = trans_result.get('src_tts', None)
-         # 确保 TTS URL 是有效的
-        if src_tts and not is_valid_tts_url(src_tts):
-            print(f"无效的 TTS URL: {src_tts}")
-            src_tts = None
-
-        if not dict_content:
-            print("未找到字典内容")
-            return {}
-
-        # 解析字典内容并返回字典
-        try:
-            result_dict = parse_json_to_string(dict_content)
-            result_dict["src_tts"] = src_tts  # 将音频链接放到字典中
-            #print(result_dict)
-            return result_dict
-        except ValueError as e:
-            print(f"解析字典内容失败: {e}")
-            return {}
+            # 发送请求
+            response = transport.post(url, headers=headers, data=payload)
+
+            # 检查响应状态
+            if response.status_code != 200:
+                print(f"请求失败，HTTP 状态码: {response.status_code}")
+                if raise_errors:
+                    raise TranslationError(f"HTTP 状态码: {response.status_code}")
+                return {}
+
+            # 转换 JSON 数据为 Python 字典
+            json_response = response.json()
+            if json_response.get('error_code') in AUTH_ERROR_CODES and attempt == 0:
+                print(f"access_token 无效，刷新后重试: {json_response.get('error_msg')}")
+                token_manager.invalidate(access_token)
+                continue
+            break
+        return parse_translation_response(json_response, raise_errors)
     except requests.exceptions.RequestException as e:
         print(f"HTTP 请求失败: {e}")
+        if raise_errors:
+            raise TranslationError(f"HTTP 请求失败: {e}") from e
         return {}
     except json.JSONDecodeError as e:
         print(f"解析 JSON 失败: {e}")
@@ -96,24 +331,106 @@ def baidu_translate(query):
         return {}
 
 
+async def afetch_translation(query, raise_errors=False):
+    """
+    fetch_translation 的异步版本，通过 async_transport 请求百度接口，返回值和错误处理相同。
+    """
+    if not BAIDU_API_KEY or not BAIDU_SECRET_KEY:
+        print("API 密钥未配置")
+        if raise_errors:
+            raise TranslationError("未配置百度 API 密钥")
+        return {}
+
+    try:
+        payload, headers = _translation_request(query)
+
+        # access_token 失效时刷新后重试一次
+        for attempt in range(2):
+            access_token = await token_manager.aget_token()
+            url = f"{BAIDU_TRANSLATE_URL}?access_token={access_token}"
+
+            response = await async_transport.post(url, headers=headers, content=payload)
+
+            if response.status_code != 200:
+                print(f"请求失败，HTTP 状态码: {response.status_code}")
+                if raise_errors:
+                    raise TranslationError(f"HTTP 状态码: {response.status_code}")
+                return {}
+
+            json_response = response.json()
+            if json_response.get('error_code') in AUTH_ERROR_CODES and attempt == 0:
+                print(f"access_token 无效，刷新后重试: {json_response.get('error_msg')}")
+                await sync_to_async(token_manager.invalidate, thread_sensitive=False)(access_token)
+                continue
+            break
+        return parse_translation_response(json_response, raise_errors)
+    except ASYNC_REQUEST_ERRORS as e:
+        print(f"HTTP 请求失败: {e}")
+        if raise_errors:
+            raise TranslationError(f"HTTP 请求失败: {e}") from e
+        return {}
+    except json.JSONDecodeError as e:
+        print(f"解析 JSON 失败: {e}")
+        return {}
+    except KeyError as e:
+        print(f"关键字段缺失: {e}")
+        return {}
+
+
+def parse_translation_response(json_response, raise_errors=False):
+    """
+    从百度接口返回的 JSON 中提取释义，同步和异步请求共用。
+    """
+    if raise_errors and 'error_code' in json_response:
+        raise TranslationError(f"百度返回错误 {json_response.get('error_code')}: {json_response.get('error_msg')}")
+    #print(json_response)
+    # 检查返回的数据，判断输入是否为中文
+    if 'result' in json_response:
+        trans_result = json_response['result'].get('trans_result', [])
+        if trans_result:
+            dict_content = trans_result[0].get('dict', None)
+            if dict_content:
+                dict_data = json.loads(dict_content)  # 解析 dict 字段中的 JSON
+                if dict_data.get('lang') == '0':  # 如果 lang == '0' 表示中文
+                    print("输入为中文，返回空结果")
+                    return {}  # 返回空字典，表示输入是中文
+
+    # 检查 API 返回的内容是否有效
+    if 'result' not in json_response or 'trans_result' not in json_response['result']:
+        print("API 返回数据不完整或无翻译结果")
+        return {}
+
+    # 提取翻译结果
+    trans_result = json_response['result']['trans_result'][0]
+    dict_content = trans_result.get('dict', None)
+    src_tts = trans_result.get('src_tts', None)
+    # 确保 TTS URL 是有效的
+    if src_tts and not is_valid_tts_url(src_tts):
+        print(f"无效的 TTS URL: {src_tts}")
+        src_tts = None
+
+    if not dict_content:
+        print("未找到字典内容")
+        return {}
+
+    # 解析字典内容并返回字典
+    try:
+        result_dict = parse_json_to_string(dict_content)
+        result_dict["src_tts"] = src_tts  # 将音频链接放到字典中
+        #print(result_dict)
+        return result_dict
+    except ValueError as e:
+        print(f"解析字典内容失败: {e}")
+        return {}
+
+
 
 def get_access_token():
     """
-    使用 AK，SK 生成鉴权签名（Access Token）
+    使用 AK，SK 生成鉴权签名（Access Token），结果由 token_manager 缓存到过期前
     :return: access_token，或是None(如果错误)
     """
-    if not BAIDU_API_KEY or not BAIDU_SECRET_KEY:
-        return None
-    
-    url = "https://aip.baidubce.com/oauth/2.0/token"
-    params = {"grant_type": "client_credentials", "client_id": BAIDU_API_KEY, "client_secret": BAIDU_SECRET_KEY}
-    response = requests.post(url, params=params)
-    
-    if response.status_code == 200:
-        return str(response.json().get("access_token"))
-    else:
-        print(f"获取 access_token 失败: {response.status_code}")
-        return None
+    return token_manager.get_token()
 
 def parse_json_to_string(json_string):
     try:
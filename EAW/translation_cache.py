@@ -0,0 +1,227 @@
+# translation_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+import environ
+from django.db import IntegrityError
+from django.utils.timezone import now
+from .models import TranslationCacheEntry
+
+env = environ.Env()
+
+# 数据库缓存的有效期（天）和进程内 LRU 的容量
+TRANSLATION_CACHE_TTL_DAYS = env.int('TRANSLATION_CACHE_TTL_DAYS', default=90)
+TRANSLATION_CACHE_LRU_SIZE = env.int('TRANSLATION_CACHE_LRU_SIZE', default=2048)
+# parse_json_to_string 输出格式变化时递增，旧版本的缓存会被视为未命中并重新获取
+TRANSLATION_CACHE_VERSION = 1
+
+
+class LRUCache:
+    """
+    线程安全的进程内 LRU 缓存，条目带过期时间。
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TranslationCache:
+    """
+    位于 baidu_translate 之前的两级释义缓存：进程内 LRU + 数据库 TranslationCacheEntry。
+    键为 standardize_input 处理后的查询词；只缓存成功解析的结果，失败的查询下次仍会请求百度。
+    """
+
+    def __init__(self, ttl_days, lru_size, version):
+        self.ttl = timedelta(days=ttl_days)
+        self.version = version
+        self.lru = LRUCache(lru_size)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self._stats = {'lru_hits': 0, 'db_hits': 0, 'misses': 0, 'fetch_seconds': 0.0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _lru_lookup(self, queries):
+        """
+        先查进程内 LRU，返回 ({query: result}, 未命中的查询列表)。
+        """
+        found = {}
+        missing = []
+        for query in dict.fromkeys(queries):
+            result = self.lru.get(query)
+            if result is not None:
+                self._count('lru_hits')
+                found[query] = result
+            else:
+                missing.append(query)
+        return found, missing
+
+    def _fresh_entries(self, queries):
+        return TranslationCacheEntry.objects.filter(
+            query__in=queries,
+            version=self.version,
+            updated_at__gte=now() - self.ttl,
+        )
+
+    def _found_in_db(self, found, missing, entries):
+        db_hits = 0
+        for entry in entries:
+            db_hits += 1
+            self._remember(entry.query, entry.result, entry.updated_at)
+            found[entry.query] = entry.result
+        self._count('db_hits', db_hits)
+        self._count('misses', len(missing) - db_hits)
+
+    def get_many(self, queries):
+        """
+        批量查询缓存，返回 {query: result}，未命中的查询不在结果中。
+        """
+        found, missing = self._lru_lookup(queries)
+        if missing:
+            self._found_in_db(found, missing, self._fresh_entries(missing))
+        return found
+
+    async def aget_many(self, queries):
+        """
+        get_many 的异步版本，使用异步 ORM 查询数据库缓存。
+        """
+        found, missing = self._lru_lookup(queries)
+        if missing:
+            self._found_in_db(found, missing, [entry async for entry in self._fresh_entries(missing)])
+        return found
+
+    def get(self, query):
+        return self.get_many([query]).get(query)
+
+    def set(self, query, result):
+        """
+        保存成功的翻译结果，已存在的旧记录会被覆盖。
+        """
+        if not isinstance(result, dict) or not result:
+            return
+        try:
+            entry, created = TranslationCacheEntry.objects.update_or_create(
+                query=query,
+                defaults={'result': result, 'version': self.version},
+            )
+        except IntegrityError:
+            # 并发写入同一个查询词时，以先写入的为准
+            return
+        self._remember(query, result, entry.updated_at)
+
+    async def aset(self, query, result):
+        """
+        set 的异步版本。
+        """
+        if not isinstance(result, dict) or not result:
+            return
+        try:
+            entry, created = await TranslationCacheEntry.objects.aupdate_or_create(
+                query=query,
+                defaults={'result': result, 'version': self.version},
+            )
+        except IntegrityError:
+            return
+        self._remember(query, result, entry.updated_at)
+
+    def get_or_fetch(self, query, fetch):
+        """
+        命中缓存时直接返回，否则调用 fetch(query) 请求百度并缓存结果。
+        """
+        result = self.get(query)
+        if result is not None:
+            return result
+
+        result = self.timed_fetch(fetch, query)
+        self.set(query, result)
+        return result
+
+    def timed_fetch(self, fetch, query):
+        """
+        调用 fetch(query) 并累计耗时，可在线程池中调用。
+        """
+        start = time.perf_counter()
+        try:
+            return fetch(query)
+        finally:
+            self._count('fetch_seconds', time.perf_counter() - start)
+
+    async def aget_or_fetch(self, query, fetch):
+        """
+        get_or_fetch 的异步版本，fetch 为返回协程的函数。
+        """
+        result = (await self.aget_many([query])).get(query)
+        if result is not None:
+            return result
+
+        result = await self.atimed_fetch(fetch, query)
+        await self.aset(query, result)
+        return result
+
+    async def atimed_fetch(self, fetch, query):
+        """
+        await fetch(query) 并累计耗时。
+        """
+        start = time.perf_counter()
+        try:
+            return await fetch(query)
+        finally:
+            self._count('fetch_seconds', time.perf_counter() - start)
+
+    def stats(self):
+        """
+        返回命中计数，以及按未命中时的平均耗时估算出的节省时间。
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        hits = stats['lru_hits'] + stats['db_hits']
+        lookups = hits + stats['misses']
+        avg_fetch = stats['fetch_seconds'] / stats['misses'] if stats['misses'] else 0.0
+        stats.update({
+            'hits': hits,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'api_calls_saved': hits,
+            'estimated_seconds_saved': hits * avg_fetch,
+            'lru_size': len(self.lru),
+        })
+        return stats
+
+    def _remember(self, query, result, updated_at):
+        self.lru.set(query, result, (updated_at + self.ttl).timestamp())
+
+
+translation_cache = TranslationCache(TRANSLATION_CACHE_TTL_DAYS, TRANSLATION_CACHE_LRU_SIZE, TRANSLATION_CACHE_VERSION)
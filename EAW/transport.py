@@ -0,0 +1,313 @@
+# transport.py
+
+import asyncio
+import random
+import threading
+import time
+import weakref
+import environ
+import requests
+from asgiref.sync import sync_to_async
+from requests.adapters import HTTPAdapter
+from .metrics import timed_upstream
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+env = environ.Env()
+
+# 连接池和超时设置，均可通过环境变量调整
+TRANSLATE_POOL_SIZE = env.int('TRANSLATE_POOL_SIZE', default=10)
+TRANSLATE_CONNECT_TIMEOUT = env.float('TRANSLATE_CONNECT_TIMEOUT', default=3.05)
+TRANSLATE_READ_TIMEOUT = env.float('TRANSLATE_READ_TIMEOUT', default=10)
+# 重试次数（不含第一次请求）和指数退避的基数（秒）
+TRANSLATE_MAX_RETRIES = env.int('TRANSLATE_MAX_RETRIES', default=2)
+TRANSLATE_BACKOFF_BASE = env.float('TRANSLATE_BACKOFF_BASE', default=0.5)
+TRANSLATE_BACKOFF_MAX = env.float('TRANSLATE_BACKOFF_MAX', default=8)
+# 连续失败多少次后熔断，以及熔断后多久允许试探请求
+TRANSLATE_BREAKER_THRESHOLD = env.int('TRANSLATE_BREAKER_THRESHOLD', default=5)
+TRANSLATE_BREAKER_COOLDOWN = env.float('TRANSLATE_BREAKER_COOLDOWN', default=30)
+# 异步客户端（async 视图使用）每个事件循环的最大连接数
+TRANSLATE_ASYNC_POOL_SIZE = env.int('TRANSLATE_ASYNC_POOL_SIZE', default=100)
+
+# 这些状态码视为上游暂时不可用，需要重试
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """
+    熔断器打开时直接抛出，调用方按普通的请求失败处理即可。
+    """
+
+
+# 异步请求可能抛出的网络错误：httpx 的错误，以及未安装 httpx 时同步客户端的错误
+ASYNC_REQUEST_ERRORS = (requests.exceptions.RequestException,) + ((httpx.HTTPError,) if httpx else ())
+
+
+class CircuitBreaker:
+    """
+    连续失败达到阈值后打开熔断器，cooldown 秒内的请求直接失败；
+    冷却结束后只放行一个试探请求，成功则关闭熔断器，失败则重新计时。
+    """
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def allow_request(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+    def release_trial(self):
+        """
+        请求被取消或中断（没有得到上游的结果）时调用：不计为失败，只释放半开状态下的试探名额。
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class RateLimiter:
+    """
+    令牌桶限流器：平均每秒最多放行 rate 个请求，多个线程共用同一个实例。
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _try_acquire(self):
+        """
+        取得一个令牌时返回 0，否则返回还需等待的秒数。
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """
+        阻塞直到取得一个令牌。
+        """
+        while True:
+            wait = self._try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def aacquire(self):
+        """
+        acquire 的异步版本，等待时不占用线程。
+        """
+        while True:
+            wait = self._try_acquire()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+class Transport:
+    """
+    所有对外翻译请求共用的 HTTP 客户端：
+    - 复用 keep-alive 连接池，避免每次请求都重新建立 TCP + TLS 连接
+    - 默认设置连接 / 读取超时，避免一个卡住的请求长期占用 worker
+    - 连接错误、超时和 5xx / 429 响应按带抖动的指数退避重试
+    - 上游持续不可用时通过熔断器快速失败
+    """
+
+    def __init__(self, pool_size, connect_timeout, read_timeout, max_retries, backoff_base, backoff_max,
+                 breaker):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method, url, **kwargs):
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"翻译服务暂时不可用，已熔断: {url.split('?')[0]}")
+
+        kwargs.setdefault('timeout', self.timeout)
+        try:
+            response, error = self._send(method, url, **kwargs)
+        except Exception:
+            # TooManyRedirects、InvalidURL 等请求错误同样计为失败
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # KeyboardInterrupt、SystemExit（如 worker 平滑退出）不是上游的问题，不计为失败，
+            # 但要释放试探名额，否则半开状态下的熔断器会拒绝之后的所有请求
+            self.breaker.release_trial()
+            raise
+
+        if error is None and response.status_code not in RETRY_STATUS_CODES:
+            self.breaker.record_success()
+            return response
+        self.breaker.record_failure()
+        if error is not None:
+            raise error
+        return response
+
+    def _send(self, method, url, **kwargs):
+        """
+        发送请求，连接错误、超时和可重试的状态码按退避重试，返回 (最后的响应, 最后的连接错误)。
+        """
+        for attempt in range(self.max_retries + 1):
+            error = response = None
+            try:
+                with timed_upstream():
+                    response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    return response, None
+
+            if attempt < self.max_retries:
+                time.sleep(self._backoff(attempt))
+        return response, error
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def _backoff(self, attempt):
+        # full jitter：在 [0, base * 2^attempt] 内随机等待，避免多个 worker 同时重试
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+class AsyncTransport:
+    """
+    async 视图使用的 HTTP 客户端，重试、退避和熔断规则与 Transport 相同，并共用同一个熔断器。
+    安装了 httpx 时使用 httpx.AsyncClient，等待上游响应时不占用线程，一个进程可以同时发出大量请求；
+    httpx 的连接池绑定在事件循环上，因此每个事件循环使用各自的客户端。
+    未安装 httpx 时退回到在线程池中调用同步的 Transport。
+    """
+
+    def __init__(self, pool_size, connect_timeout, read_timeout, sync_transport):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.sync_transport = sync_transport
+        self.max_retries = sync_transport.max_retries
+        self.breaker = sync_transport.breaker
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            )
+            self._clients[loop] = client
+        return client
+
+    async def request(self, method, url, **kwargs):
+        """
+        参数与 httpx 相同（请求体使用 content=）。返回的响应与 requests 一样提供 status_code 和 json()。
+        """
+        if httpx is None:
+            if 'content' in kwargs:
+                kwargs['data'] = kwargs.pop('content')
+            return await sync_to_async(self.sync_transport.request, thread_sensitive=False)(method, url, **kwargs)
+
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"翻译服务暂时不可用，已熔断: {url.split('?')[0]}")
+
+        try:
+            response, error = await self._send(method, url, **kwargs)
+        except Exception:
+            # TooManyRedirects、DecodingError 等请求错误同样计为失败
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # asyncio.CancelledError（客户端断开、gather 超时）等不是上游的问题，不计为失败，
+            # 但要释放试探名额，否则共用的熔断器会一直拒绝同步 Transport 和后台 worker 的请求
+            self.breaker.release_trial()
+            raise
+
+        if error is None and response.status_code not in RETRY_STATUS_CODES:
+            self.breaker.record_success()
+            return response
+        self.breaker.record_failure()
+        if error is not None:
+            raise error
+        return response
+
+    async def _send(self, method, url, **kwargs):
+        client = self._client()
+        for attempt in range(self.max_retries + 1):
+            error = response = None
+            try:
+                with timed_upstream():
+                    response = await client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                error = e
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    return response, None
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.sync_transport._backoff(attempt))
+        return response, error
+
+    async def post(self, url, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+
+transport = Transport(
+    pool_size=TRANSLATE_POOL_SIZE,
+    connect_timeout=TRANSLATE_CONNECT_TIMEOUT,
+    read_timeout=TRANSLATE_READ_TIMEOUT,
+    max_retries=TRANSLATE_MAX_RETRIES,
+    backoff_base=TRANSLATE_BACKOFF_BASE,
+    backoff_max=TRANSLATE_BACKOFF_MAX,
+    breaker=CircuitBreaker(TRANSLATE_BREAKER_THRESHOLD, TRANSLATE_BREAKER_COOLDOWN),
+)
+
+async_transport = AsyncTransport(
+    pool_size=TRANSLATE_ASYNC_POOL_SIZE,
+    connect_timeout=TRANSLATE_CONNECT_TIMEOUT,
+    read_timeout=TRANSLATE_READ_TIMEOUT,
+    sync_transport=transport,
+)
@@ -26,6 +26,8 @@ urlpatterns = [
     path('list/', views.item_list, name='item-list'),
     path('item/<int:pk>/', ItemDetailView.as_view(), name='item-detail'),
     path('search/', views.SearchView, name='search'),  # 注册搜索页面的路由
+    path('api/search-suggest/', views.search_suggest, name='search_suggest'),
+    path('api/review-calendar/', views.review_calendar_api, name='review-calendar'),
     # 路由：显示选择日期的页面
     path('review/', views.ReviewHomeView, name='review-home'),    
     # 路由：根据选定的日期显示复习内容
@@ -35,13 +37,19 @@ urlpatterns = [
     path('review-feedback/yes/', views.ReviewFeedbackYes, name='review-feedback-yes'),
     path('review-feedback/no/', views.ReviewFeedbackNo, name='review-feedback-no'),
     path('review-feedback/reset/', views.ReviewFeedbackReset, name='review-feedback-reset'),
+    path('review-feedback/batch/', views.ReviewFeedbackBatch, name='review-feedback-batch'),
+    path('api/review-items/', views.review_item_details, name='review-item-details'),
     path('translate/', views.translate, name='translate'),#后端处理翻译请求
     path('translate_test/', views.translate_test, name='translate_test'),#BAIDU API获取释义测试页面
     path('api/check-baidu-keys/', views.check_api_keys_view, name='check-api-keys'),#检测是否配置了BAIDU API
+    path('api/translation-cache-stats/', views.translation_cache_stats, name='translation-cache-stats'),#释义缓存命中统计
+    path('metrics', views.metrics, name='metrics'),#Prometheus 格式的请求指标
     path('input/', views.InputView, name='input-view'),#输入内容页面
+    path('api/enrichment-status/', views.enrichment_status, name='enrichment-status'),#后台获取释义任务的进度
     path('profile/', views.user_profile, name='user_profile'),
     path('export_user_data/', views.export_user_data_to_excel, name='export_user_data'),
     path('import_user_data/', views.import_items_from_excel, name='import_user_data'),
+    path('import_user_data/progress/', views.import_progress, name='import_progress'),
     path('about/', views.about, name='about'),  # 关于页面
     path('readme/', views.readme_view, name='readme'),
 ]
\ No newline at end of file
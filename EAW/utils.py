@@ -13,33 +13,78 @@ def clean_and_split_lines(content):
     cleaned_lines = [line.strip() for line in content.strip().split('\n') if line.strip()]
     return cleaned_lines
 
+def is_similar_to_any(matcher, candidates, threshold):
+    """
+    matcher 已通过 set_seq2 设置为新行，判断 candidates 中是否有与它相似度达到阈值的行。
+    先用由便宜到昂贵的上界过滤：长度比（real_quick_ratio）、字符多重集交集（quick_ratio），
+    只有两者都不低于阈值的行才计算精确的 ratio()，结果与逐对计算 ratio() 完全相同。
+    """
+    new_length = len(matcher.b)
+    for candidate in candidates:
+        # 2 * min(la, lb) / (la + lb) 是 ratio() 的上界，不需要设置 seq1 即可排除
+        total = len(candidate) + new_length
+        if total and 2.0 * min(len(candidate), new_length) / total < threshold:
+            continue
+        matcher.set_seq1(candidate)
+        if matcher.quick_ratio() >= threshold and matcher.ratio() >= threshold:
+            return True
+    return False
+
 def compare_and_merge(existing_lines, new_lines, threshold=0.8):
     """
     逐行比较新旧内容，使用 difflib 筛选出相似度低于阈值的行，并合并。
+    每个新行只构造一次 SequenceMatcher（seq2 的索引可复用），并先用上界排除明显不相似的旧行。
     """
     merged_lines = existing_lines.copy()  # 保留原有内容
     existing_set = set(existing_lines)  # 用集合快速去重
+    matcher = difflib.SequenceMatcher(None)
 
     for new_line in new_lines:
-        is_duplicate = False
-        for existing_line in existing_lines:
-            # 计算相似度
-            similarity = difflib.SequenceMatcher(None, existing_line, new_line).ratio()
-            if similarity >= threshold:
-                is_duplicate = True
-                break
+        # 完全相同的行一定重复，不需要计算相似度
+        if new_line in existing_set:
+            continue
+        matcher.set_seq2(new_line)
         # 仅在不重复的情况下添加
-        if not is_duplicate and new_line not in existing_set:
+        if not is_similar_to_any(matcher, existing_lines, threshold):
             merged_lines.append(new_line)
 
     return merged_lines
 
+def append_translation(explain_txt, translation_result):
+    """
+    将释义追加到输入时填写的内容之后（录入页面的规则），返回 (内容, src_tts, 美式音标, 英式音标)。
+    """
+    if not translation_result:
+        return explain_txt, None, None, None
+
+    # 从 translation_result 中提取各个部分
+    phonetic = translation_result.get('phonetic', [])
+    phonetic_am = phonetic[1] if len(phonetic) > 1 else None  # 美式音标
+    phonetic_en = phonetic[0] if len(phonetic) > 0 else None  # 英式音标
+    src_tts = translation_result.get('src_tts', None)  # TTS URL
+    translated_content = translation_result.get('parts_and_means', [])  # 词性和释义
+    simple_meaning = translation_result.get('simple_meaning', [])  # 简明释义
+
+    # 有词性和释义时只拼接详细释义，否则拼接简明释义
+    lines = translated_content or simple_meaning
+    if lines:
+        if explain_txt:  # 如果原来已有内容，才添加换行
+            explain_txt += "\n\n"
+        explain_txt += "\n".join([str(line) for line in lines])
+
+    return explain_txt, src_tts, phonetic_am, phonetic_en
+
 def fetch_and_merge_translation(item_name, existing_content):
     """
     调用百度翻译 API 获取释义，并将其与现有内容进行合并。
     """
     # 调用翻译函数
-    translation_result = baidu_translate(item_name)
+    return merge_translation(baidu_translate(item_name), existing_content)
+
+def merge_translation(translation_result, existing_content):
+    """
+    将已获取的释义与现有内容逐行比较后合并，返回 (内容, src_tts, 美式音标, 英式音标)。
+    """
     if not translation_result:
         return existing_content, "", "", ""  # 返回现有内容和空值，表示翻译失败
 
@@ -4,7 +4,7 @@ from django.views import generic
 from django.db.models import Avg, Max, Min, Count, Sum
 from datetime import datetime
 from datetime import timedelta
-from django.utils.timezone import now
+from django.utils.timezone import localdate
 from django import forms
 from .forms import InputForm,  CustomUserCreationForm, EmailUpdateForm, UpdateNameForm, CustomPasswordChangeForm
 from django.utils.decorators import method_decorator
@@ -12,7 +12,7 @@ from django.views.generic.detail import DetailView
 from django.contrib.auth.decorators import permission_required
 from django.core.cache import cache
 from django.contrib.auth.models import User
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
 
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth import update_session_auth_hash
@@ -23,28 +23,46 @@ from django.shortcuts import get_object_or_404
 from django.http import Http404
 from django.shortcuts import render, redirect
 from django.http import HttpResponseRedirect, JsonResponse
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse, FileResponse
 from django.urls import reverse
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
 import json
 import csv
-from time import sleep
+from time import sleep, perf_counter
 import logging
 import re
 from django.views.decorators.csrf import csrf_exempt
-import json
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+import hashlib
 from django.template.loader import render_to_string
-from .translate import baidu_translate, parse_json_to_string, check_api_keys
+from .translate import abaidu_translate, abatch_translate, parse_json_to_string, check_api_keys
+from .translation_cache import translation_cache
 import openpyxl
 from django.db import transaction
-from .models import Item, Category, Proficiency
-import difflib
+from .models import Item, Category, Proficiency, TranslationCacheEntry, EnrichmentJob
 import uuid
-from .utils import fetch_and_merge_translation
+from .utils import fetch_and_merge_translation, append_translation
+from .enrichment import ENRICHMENT_IN_BACKGROUND, enqueue_enrichment, job_status_counts
+from . import srs
+from .review import FEEDBACK_BATCH_LIMIT, apply_feedback, build_review_output, review_calendar, sync_review_schedule
+from .caching import cached_for_user, cached_per_user, invalidate_user_cache, user_cache_version
+from .pagination import keyset_page, InvalidCursor
+from .stats import get_user_stats, update_user_stats, item_snapshot
+from .search import SEARCH_PAGE_SIZE, SEARCH_SUGGEST_LIMIT, search_items, suggest_items, index_items
+from .fragments import (
+    REVIEW_DETAILS_BATCH_LIMIT, render_review_modals, review_item_versions, review_page_rows, versions_etag,
+)
+from .excel import export_xlsx, export_csv, import_items, ImportFormatError
 import markdown
 from django.conf import settings
 import os
+from asgiref.sync import sync_to_async
+from .asyncviews import async_csrf_exempt, async_login_required
+from .metrics import METRICS_TOKEN, render_prometheus
+from django.utils.crypto import constant_time_compare
 
 logger = logging.getLogger(__name__)
 
@@ -178,16 +196,15 @@ def user_profile(request):
     })
 
 
+@cached_per_user('home')
 def home(request):
     # 检查用户是否登录
     if request.user.is_authenticated:
-        # 获取当前用户的所有 items
-        items = Item.objects.filter(user=request.user)
-        # 统计数据
-        total_items = items.count()
-        if total_items > 0:
-            first_item_date = items.order_by('inputDate').first().inputDate
-            days_since_first_item = (now().date() - first_item_date).days
+        # 统计数据，从增量维护的 UserStats 中读取
+        stats = get_user_stats(request.user)
+        total_items = stats.total_items
+        if stats.first_input_date:
+            days_since_first_item = (localdate() - stats.first_input_date).days
         else:
             days_since_first_item = 0
         
@@ -205,6 +222,7 @@ def home(request):
             'display_name': display_name,  # 修改为 display_name
             'total_items': total_items,
             'days_since_first_item': days_since_first_item,
+            'stats': stats,
         }
         # 用户已登录，返回登录后的首页
         return render(request, 'home_logged_in.html', context)
@@ -237,25 +255,54 @@ def home(request):
 
 #     return render(request, 'index.html', context)
 
+def get_category_stats(user):
+    """
+    每个类别下的条目数量及条目总数，按用户缓存，条目或类别变化时失效。
+    """
+    def compute():
+        rows = list(
+            Item.objects.filter(user=user)
+            .values('category__name')
+            .annotate(count=Count('category'), total=Count('id'))
+            .order_by('-count')
+        )
+        return {
+            'categories': [{'category__name': row['category__name'], 'count': row['count']} for row in rows],
+            'total': sum(row['total'] for row in rows),
+        }
+
+    return cached_for_user(user.pk, 'category-stats', compute)
+
+
 @login_required
+@cached_per_user('item-list')
 def item_list(request):
-    # 获取当前登录用户的所有 Item
-    item_list = Item.objects.filter(user=request.user).order_by('-inputDate')
+    # 获取当前登录用户的所有 Item，一次取出类别避免模板中逐行查询
+    item_list = Item.objects.filter(user=request.user).select_related('category')
 
-    # 统计每个类别下的条目数量
-    category_stats = item_list.values('category__name').annotate(count=Count('category')).order_by('-count')
+    # 统计每个类别下的条目数量（缓存）
+    stats = get_category_stats(request.user)
 
-    # 确保 item_list 不为空时才进行分页
-    if item_list.exists():
-        paginator = Paginator(item_list, 50)  # 每页 50 个
-        page_number = request.GET.get('page')  # 获取当前页码
-        page_obj = paginator.get_page(page_number)
+    if 'page' in request.GET:
+        # 兼容页码分页的旧链接
+        paginator = Paginator(item_list.order_by('-inputDate', '-id'), 50)  # 每页 50 个
+        page_obj = paginator.get_page(request.GET.get('page'))  # 获取当前页码
+        keyset = False
     else:
-        # 如果 item_list 为空，设置 page_obj 为一个空列表或自定义的对象
-        page_obj = []
+        # 默认使用游标分页，翻页时不需要 COUNT(*) 和 OFFSET
+        try:
+            page_obj = keyset_page(item_list, request.GET.get('cursor'), 50)
+        except InvalidCursor:
+            page_obj = keyset_page(item_list, None, 50)
+        keyset = True
 
     # 渲染模板，传递分页对象和类别统计信息
-    return render(request, 'list.html', {'page_obj': page_obj, 'category_stats': category_stats})
+    return render(request, 'list.html', {
+        'page_obj': page_obj,
+        'keyset': keyset,
+        'category_stats': stats['categories'],
+        'total_items': stats['total'],
+    })
 
 
 @method_decorator(login_required, name='dispatch')  # 确保用户已登录
@@ -278,7 +325,7 @@ class ItemDetailView(DetailView):
 @login_required
 def SearchView(request):
     word = ''
-    query = Item.objects.none()
+    page_obj = None
 
     # 获取搜索关键词
     search_input = request.GET.get('q', '').strip()
@@ -293,20 +340,26 @@ def SearchView(request):
             context={'word': word},
         )
     else:
-        # 在当前用户的数据库中搜索 item 字段包含搜索关键词的条目
+        # 通过搜索索引在当前用户的 item 和 content 中搜索，结果按相关度排序后分页
         try:
-            query = Item.objects.filter(user=request.user, item__icontains=search_input)
-            if not query.exists():
+            item_ids = search_items(request.user, search_input)
+            if not item_ids:
                 word = 'No search result.'
+            paginator = Paginator(item_ids, SEARCH_PAGE_SIZE)
+            page_obj = paginator.get_page(request.GET.get('page'))
+            items = Item.objects.select_related('category').in_bulk(page_obj.object_list)
+            page_obj.object_list = [items[item_id] for item_id in page_obj.object_list if item_id in items]
         except Exception as e:
             logger.error(f"Error during search query: {e}")
             return JsonResponse({'error': 'Error processing your search query'}, status=500)
 
+    context = {'query': page_obj.object_list, 'page_obj': page_obj, 'search_input': search_input, 'word': word}
+
     # 如果是 AJAX 请求，返回 JSON 数据
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         try:
             # 渲染搜索结果的 HTML
-            html = render_to_string('search_results.html', {'query': query, 'word': word})
+            html = render_to_string('search_results.html', context)
             logger.debug(f"Generated HTML for search results.")
             return JsonResponse({'html': html})
         except Exception as e:
@@ -317,14 +370,32 @@ def SearchView(request):
     return render(
         request,
         'search_results.html',
-        context={'query': query, 'word': word},
+        context=context,
     )
 
+@login_required
+def search_suggest(request):
+    """
+    输入联想接口，返回精简的 JSON 结果，条数不超过 SEARCH_SUGGEST_LIMIT。
+    """
+    try:
+        limit = min(int(request.GET.get('limit', SEARCH_SUGGEST_LIMIT)), SEARCH_SUGGEST_LIMIT)
+    except ValueError:
+        limit = SEARCH_SUGGEST_LIMIT
+    rows = suggest_items(request.user, request.GET.get('q', ''), max(limit, 1))
+    return JsonResponse({
+        'success': True,
+        'results': [
+            {'id': item_id, 'item': name, 'category': category or '', 'url': reverse('item-detail', args=[item_id])}
+            for item_id, name, category, content in rows
+        ],
+    })
+
 #复习单词的功能
 @login_required
 def ReviewHomeView(request):
     # print("Request routed to ReviewHomeView")  # 调试
-    today = datetime.today().date()
+    today = localdate()
     #print(today)
     return render(
         request,
@@ -333,6 +404,19 @@ def ReviewHomeView(request):
     )
 
 @login_required
+def review_calendar_api(request):
+    """
+    复习日历接口：?ahead=N 返回今天起 N 天内每天的到期数量，?back=N 返回过去 N 天的复习记录。
+    """
+    try:
+        days_ahead = int(request.GET.get('ahead', 30))
+        days_back = int(request.GET.get('back', 30))
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'ahead and back must be integers.'}, status=400)
+    return JsonResponse({'success': True, **review_calendar(request.user, days_ahead, days_back)})
+
+@login_required
+@cached_per_user('review')
 def ReviewView(request, year, month, day):
     #print(f"Request routed to ReviewView with date: {year}-{month}-{day}")  # 调试
     #print(f"Year: {year}, Month: {month}, Day: {day}")
@@ -346,59 +430,95 @@ def ReviewView(request, year, month, day):
         if review_date_str:
             reviewDate = datetime.strptime(review_date_str, '%Y-%m-%d').date()
     
-    # 初始化每个类别的数据容器
-    output = {}
-    categories = Category.objects.filter(user=request.user)
-    for category in categories:
-        output[category.name] = []
-    
-    # 根据复习曲线匹配单词
-    for interval in ReviewDay.objects.filter(user=request.user):
-        checkday = reviewDate - timedelta(days=interval.day)
-        # 修改查询逻辑：查找所有在checkday或之前输入的项目，而不只是checkday当天的
-        review_items = Item.objects.filter(user=request.user, initDate__lte=checkday)
-        for item in review_items:
-            # 生成 item 的详细页面 URL
-            detail_url = reverse('item-detail', args=[item.pk])
-            output[item.category.name].append([interval.day, item, detail_url])
-    
-    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        return HttpResponse(render_to_string('review_day.html', {'output': output, 'reviewdate': reviewDate}, request))
-
-    return render(request, 'review_day.html', {'output': output, 'reviewdate': reviewDate})
+    # 页面内容只随条目、复习曲线和日期变化：按用户缓存版本号生成 ETag，未变化时直接返回 304。
+    # 页面中含 CSRF 令牌，get_token 每次返回的令牌都经过随机掩码，因此使用 Cookie 中未掩码的值
+    get_token(request)
+    digest = hashlib.md5(
+        f"{user_cache_version(request.user.pk)}:{reviewDate}:{srs.SRS_SCHEDULER}:{request.META['CSRF_COOKIE']}".encode('utf-8')
+    ).hexdigest()
+    etag = f'"{digest}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        # 按类别汇总到期条目，查询次数与条目数量无关；页面只包含条目列表，详情由 review_item_details 按需提供
+        start = perf_counter()
+        output = review_page_rows(build_review_output(request.user, reviewDate))
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            response = HttpResponse(render_to_string('review_day.html', {'output': output, 'reviewdate': reviewDate}, request))
+        else:
+            response = render(request, 'review_day.html', {'output': output, 'reviewdate': reviewDate})
+        logger.info(f"Review page {reviewDate} for user {request.user.pk}: {sum(len(value) for value in output.values())} rows rendered in {perf_counter() - start:.4f}s")
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 @login_required
-def ReviewFeedbackYes(request):
+def review_item_details(request):
     """
-    更新指定 Item 的 proficiency 为 MASTERED（熟练）。
+    复习页面的条目详情：?ids=1,2,3 返回这些条目的弹窗 HTML（每次最多 REVIEW_DETAILS_BATCH_LIMIT 个）。
+    ETag 和 Last-Modified 由条目的 updated_at 计算，条目未修改时返回 304。
     """
     try:
-        if request.method == "POST":
-            # 解析请求数据
-            data = json.loads(request.body.decode("utf-8"))
-            item_id = data.get('id')
+        item_ids = [int(item_id) for item_id in request.GET.get('ids', '').split(',') if item_id]
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'ids must be comma separated integers.'}, status=400)
+    if len(item_ids) > REVIEW_DETAILS_BATCH_LIMIT:
+        return JsonResponse({'success': False, 'message': f'At most {REVIEW_DETAILS_BATCH_LIMIT} ids per request.'}, status=400)
+
+    versions = review_item_versions(request.user, item_ids)
+    etag = versions_etag(versions)
+    last_modified = int(max(versions.values()).timestamp()) if versions else None  # HTTP 日期精确到秒
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        modals = render_review_modals(versions)
+        response = JsonResponse({
+            'success': True,
+            'items': {str(item_id): html for item_id, html in modals.items()},
+            'missing': [item_id for item_id in item_ids if item_id not in versions],
+        })
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
-            # 获取当前用户的 Item
-            curword = Item.objects.get(user=request.user, id=item_id)
 
-            # 更新 proficiency 为 MASTERED
-            curword.proficiency = Proficiency.MASTERED
-            curword.save()
+@login_required
+def ReviewFeedbackBatch(request):
+    """
+    批量提交复习反馈，请求体为 {"feedback": [{"id": 1, "action": "yes"}, ...]}，action 为 yes / no / reset。
+    复习页面在前端缓存用户的选择，定期或离开页面时一次提交。
+    """
+    if request.method != "POST":
+        return JsonResponse({'success': False, 'message': 'POST required.'}, status=405)
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'Invalid JSON.'}, status=400)
+    entries = data.get('feedback', []) if isinstance(data, dict) else None
+    if not isinstance(entries, list) or not all(
+        isinstance(entry, dict) and 'id' in entry and 'action' in entry for entry in entries
+    ):
+        return JsonResponse({
+            'success': False,
+            'message': 'Body must be {"feedback": [{"id": ..., "action": ...}, ...]}.',
+        }, status=400)
+    if len(entries) > FEEDBACK_BATCH_LIMIT:
+        return JsonResponse({'success': False, 'message': f'At most {FEEDBACK_BATCH_LIMIT} entries per request.'}, status=400)
+    try:
+        results, missing = apply_feedback(request.user, [(entry['id'], entry['action']) for entry in entries])
+    except (ValueError, TypeError):
+        return JsonResponse({
+            'success': False,
+            'message': 'Each id must be an integer and each action one of yes / no / reset.',
+        }, status=400)
 
-            return JsonResponse({
-                'success': True,
-                'message': 'Proficiency updated to MASTERED.',
-                'mastery': curword.get_proficiency_display()  # 返回最新的掌握程度
-            })
-    except Exception as e:
-        return JsonResponse({'success': False, 'message': str(e)})
+    return JsonResponse({'success': True, 'results': results, 'missing': missing})
 
 
-@login_required
-def ReviewFeedbackNo(request):
+def _single_feedback(request, action, message):
     """
-    更新指定 Item 的 proficiency 为 UNFAMILIAR（不熟练）。
+    单个条目的复习反馈，与批量提交使用同一套处理逻辑（包括调度状态的更新）。
     """
     try:
         if request.method == "POST":
@@ -406,56 +526,47 @@ def ReviewFeedbackNo(request):
             data = json.loads(request.body.decode("utf-8"))
             item_id = data.get('id')
 
-            # 获取当前用户的 Item
-            curword = Item.objects.get(user=request.user, id=item_id)
-
-            # 更新 proficiency 为 UNFAMILIAR
-            curword.proficiency = Proficiency.UNFAMILIAR
-            curword.save()
+            results, missing = apply_feedback(request.user, [(item_id, action)])
+            if missing:
+                raise Item.DoesNotExist("Item matching query does not exist.")
 
             return JsonResponse({
                 'success': True,
-                'message': 'Proficiency updated to UNFAMILIAR.',
-                'mastery': curword.get_proficiency_display()  # 返回最新的掌握程度
+                'message': message,
+                'mastery': next(iter(results.values()))  # 返回最新的掌握程度
             })
     except Exception as e:
         return JsonResponse({'success': False, 'message': str(e)})
 
 
 @login_required
-def ReviewFeedbackReset(request):
+def ReviewFeedbackYes(request):
     """
-    重置指定 Item 的 initDate 为今天的日期，并将 proficiency 改为 UNFAMILIAR。
+    更新指定 Item 的 proficiency 为 MASTERED（熟练）。
     """
-    try:
-        if request.method == "POST":
-            # 解析请求数据
-            data = json.loads(request.body.decode("utf-8"))
-            item_id = data.get('id')
+    return _single_feedback(request, 'yes', 'Proficiency updated to MASTERED.')
 
-            # 获取当前用户的 Item
-            curword = Item.objects.get(user=request.user, id=item_id)
 
-            # 更新 initDate 为当前日期
-            curword.initDate = datetime.today()
+@login_required
+def ReviewFeedbackNo(request):
+    """
+    更新指定 Item 的 proficiency 为 UNFAMILIAR（不熟练）。
+    """
+    return _single_feedback(request, 'no', 'Proficiency updated to UNFAMILIAR.')
 
-            # 更新 proficiency 为 UNFAMILIAR
-            curword.proficiency = Proficiency.UNFAMILIAR
-            curword.save()
 
-            return JsonResponse({
-                'success': True,
-                'message': 'initDate reset to today and proficiency set to UNFAMILIAR.',
-                'mastery': curword.get_proficiency_display()  # 返回最新的掌握程度
-            })
-    except Exception as e:
-        return JsonResponse({'success': False, 'message': str(e)})
+@login_required
+def ReviewFeedbackReset(request):
+    """
+    重置指定 Item 的 initDate 为今天的日期，并将 proficiency 改为 UNFAMILIAR。
+    """
+    return _single_feedback(request, 'reset', 'initDate reset to today and proficiency set to UNFAMILIAR.')
 
 #BAIDU API调试页面
 def translate_test(request):
     return render(request, 'translate.html')  # 渲染index.html页面
-@csrf_exempt
-def translate(request):
+@async_csrf_exempt
+async def translate(request):
     if request.method == 'POST':
         try:
             # 获取前端传来的查询词
@@ -465,8 +576,8 @@ def translate(request):
             if not query:
                 return JsonResponse({'success': False, 'message': 'No query provided'})
 
-            # 调用百度翻译接口
-            result = baidu_translate(query)
+            # 调用百度翻译接口，等待响应时不占用线程
+            result = await abaidu_translate(query)
             
             if result:
                 return JsonResponse({'success': True, 'result': result})
@@ -477,6 +588,29 @@ def translate(request):
             return JsonResponse({'success': False, 'message': 'Invalid JSON'})
     
     return JsonResponse({'success': False, 'message': 'Invalid request method'})
+@user_passes_test(lambda user: user.is_superuser)
+def translation_cache_stats(request):
+    """
+    返回当前进程中释义缓存的命中统计，用于评估节省的 API 调用次数和耗时
+    :return: JsonResponse
+    """
+    stats = translation_cache.stats()
+    stats['entries'] = TranslationCacheEntry.objects.count()
+    return JsonResponse({"success": True, "stats": stats})
+
+def metrics(request):
+    """
+    以 Prometheus 文本格式输出所有 worker 进程的请求指标。
+    设置了 METRICS_TOKEN 时可用 Authorization: Bearer <token> 访问（供 Prometheus 抓取），超级用户登录后也可访问。
+    """
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    token_ok = bool(METRICS_TOKEN) and constant_time_compare(authorization, f"Bearer {METRICS_TOKEN}")
+    if not token_ok and not request.user.is_superuser:
+        return HttpResponse("Forbidden", status=403, content_type='text/plain')
+    response = HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    patch_cache_control(response, no_store=True)
+    return response
+
 def check_api_keys_view(request):
     """
     检查是否配置了百度 API 密钥
@@ -488,82 +622,99 @@ def check_api_keys_view(request):
         return JsonResponse({"success": False, "message": "百度 API 密钥未配置"}, status=400)
     
 
-@login_required
-def InputView(request):
+def _save_input_items(user, items_to_create, enrich_later):
+    """
+    保存录入的条目并更新复习记录、搜索索引和统计（同步的数据库事务，由 InputView 在线程中调用）。
+    """
+    with transaction.atomic():
+        Item.objects.bulk_create(items_to_create)
+        # 生成新条目的复习到期记录
+        sync_review_schedule(user, items_to_create)
+        index_items(user, items_to_create)
+        invalidate_user_cache(user.pk)
+        update_user_stats(user.pk, added=[item_snapshot(item) for item in items_to_create])
+        if enrich_later:
+            enqueue_enrichment(user, items_to_create, EnrichmentJob.APPEND)
+
+
+@async_login_required
+async def InputView(request):
+    """
+    录入页面。async 视图：直接获取释义时，批量查询在事件循环中并发进行，不为每个单词占用线程；
+    表单校验、保存和页面渲染会访问数据库，在线程中执行。
+    """
     if request.method == 'POST':
         form = InputForm(request.POST, user=request.user)  # 传递当前用户
-        if form.is_valid():
+        if await sync_to_async(form.is_valid)():
             data = {
                 'input_date': form.cleaned_data['input_date'],
                 'category': form.cleaned_data['category'].name,
                 'input': form.cleaned_data['input']
             }
             split = data['input'].split('\r\n')
-            category_object = Category.objects.get(name=data['category'], user=request.user)  # 仅查找当前用户的类别
+            category_object = await Category.objects.aget(name=data['category'], user=request.user)  # 仅查找当前用户的类别
 
             # 获取是否勾选了翻译复选框，并且类别为"单词"
             translate = 'translate' in request.POST and data['category'] == '单词'
 
+            # 拆分条目名称和内容（如果有冒号）
+            entries = []
             for item in split:
-                explain_txt = ''
-                result_dict = None
-                translated_content = ''
-                simple_meaning = ''
-                item_name = item
-                item_name, explain_txt = split_string(item)  # 如果有拆分功能
-                item_name = item_name.strip()
-                # 初始化 phonetic_am 和 phonetic_en 为 None
-                phonetic_am = phonetic_en = None
-                src_tts = None
-
-                # 如果勾选了 "获取释义" 复选框，则调用百度翻译函数
-                if translate:
-                    result_dict = baidu_translate(item_name)
-                    if result_dict:  # 如果返回的字典非空
-                        # 从 result_dict 中提取各个部分
-                        phonetic = result_dict.get('phonetic', [])
-                        phonetic_am = phonetic[1] if len(phonetic) > 1 else None  # 美式音标
-                        phonetic_en = phonetic[0] if len(phonetic) > 0 else None  # 英式音标
-                        src_tts = result_dict.get('src_tts', None)  # TTS URL
-                        translated_content = result_dict.get('parts_and_means', [])  # 词性和释义
-                        simple_meaning = result_dict.get('simple_meaning', [])  # 简明释义
-
-                        # 拼接解释文本
-                    # 确保是字符串并避免空行
-                        if translated_content:
-                            if explain_txt:  # 如果原来已有内容，才添加换行
-                                explain_txt += "\n\n"
-                            explain_txt += "\n".join([str(item) for item in translated_content])  # 拼接详细释义
-
-                        # 如果有 translated_content 或音标，则不存储 simple_meaning
-                        if not translated_content:
-                            # 如果没有翻译内容才拼接简明释义
-                            if simple_meaning:
-                                if explain_txt:  # 如果原来已有内容，才添加换行
-                                    explain_txt += "\n\n"
-                                explain_txt += "\n".join([str(item) for item in simple_meaning])  # 拼接简明释义
-                    else:
-                        phonetic_am = phonetic_en = src_tts = None
-
-                # 创建 Item 实例，并保存到数据库
-                Item.objects.create(
+                item_name, explain_txt = split_string(item)
+                entries.append((item_name.strip(), explain_txt))
+
+            # 后台模式下先保存条目，释义由 run_enrichment_worker 获取；否则并发批量调用百度翻译，结果顺序与输入一致
+            enrich_later = translate and ENRICHMENT_IN_BACKGROUND
+            if translate and not enrich_later:
+                results = await abatch_translate([item_name for item_name, explain_txt in entries])
+            else:
+                results = [None] * len(entries)
+
+            items_to_create = []
+            for (item_name, explain_txt), result_dict in zip(entries, results):
+                # 拼接释义，并提取音标和 TTS URL
+                content, src_tts, phonetic_am, phonetic_en = append_translation(explain_txt, result_dict)
+
+                # 创建 Item 实例，稍后一次性保存到数据库
+                items_to_create.append(Item(
                     user=request.user,
                     item=item_name,
                     inputDate=data['input_date'],
                     initDate=data['input_date'],
                     category=category_object,
-                    content=explain_txt,
+                    content=content,
                     src_tts=src_tts if translate else None,  # 如果未勾选翻译，TTS 地址为 None
                     us_phonetic=phonetic_am,  # 存储美式音标
                     uk_phonetic=phonetic_en   # 存储英式音标
-                )
+                ))
+
+            await sync_to_async(_save_input_items)(request.user, items_to_create, enrich_later)
+
+            if enrich_later:
+                messages.info(request, f"已保存 {len(items_to_create)} 个条目，释义将在后台获取。")
 
             return redirect(reverse('item-list'))  # 重定向到项列表页面
     else:
         form = InputForm(user=request.user)  # 传递当前用户
 
-    return render(request, 'input.html', {'form': form})
+    return await sync_to_async(render)(request, 'input.html', {'form': form})
+
+
 
+@login_required
+def enrichment_status(request):
+    """
+    查询后台获取释义任务的进度。传入 ids（逗号分隔的条目 ID）时同时返回这些条目的任务状态。
+    """
+    response = {'success': True, 'counts': job_status_counts(request.user)}
+    ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk.strip().isdigit()]
+    if ids:
+        jobs = EnrichmentJob.objects.filter(user=request.user, item_id__in=ids).order_by('id')
+        response['items'] = {
+            job.item_id: {'status': job.status, 'attempts': job.attempts, 'error': job.last_error}
+            for job in jobs
+        }
+    return JsonResponse(response)
 
 
 def split_string(s):
@@ -585,42 +736,25 @@ def split_string(s):
 
 @login_required
 def export_user_data_to_excel(request):
-    # 获取当前用户数据
+    """
+    导出当前用户的数据。默认导出 Excel，?format=csv 时逐行流式输出 CSV。
+    """
     user = request.user
-    items = Item.objects.filter(user=user)
-
-    # 创建一个新的 Excel 工作簿
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = "User Data"
-
-    # 写入表头
-    headers = ["Item", "Content", "Input Date", "Init Date", "Proficiency", "Category", "TTS URL", "US Phonetic", "UK Phonetic"]
-    sheet.append(headers)
-
-    # 写入用户数据
-    for item in items:
-        sheet.append([
-            item.item,
-            item.content,
-            item.inputDate,
-            item.initDate,
-            item.get_proficiency_display(),
-            item.category.name if item.category else "",
-            item.src_tts,
-            item.us_phonetic,
-            item.uk_phonetic,
-        ])
-
-    # 创建 HTTP 响应
-    response = HttpResponse(content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-    response["Content-Disposition"] = 'attachment; filename="user_data.xlsx"'
-
-    # 将工作簿保存到响应中
-    workbook.save(response)
 
-    return response
-    
+    if request.GET.get('format') == 'csv':
+        response = StreamingHttpResponse(export_csv(user), content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = 'attachment; filename="user_data.csv"'
+        return response
+
+    # 工作簿以 write-only 模式写入临时文件，再由 FileResponse 分块发送。
+    # 内存占用不随条目数量增长，但要写完整个文件才发出第一个字节，大量数据请用 ?format=csv
+    return FileResponse(
+        export_xlsx(user),
+        as_attachment=True,
+        filename="user_data.xlsx",
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
+
 
 
 @login_required
@@ -632,106 +766,36 @@ def import_items_from_excel(request):
         # 检查是否选择了“获取释义”选项
         fetch_definitions = "fetch_definitions" in request.POST
 
-        try:
-            workbook = openpyxl.load_workbook(file)
-            sheet = workbook.active
-        except Exception as e:
-            messages.error(request, f"文件读取失败: {str(e)}")
-            return render(request, "import_data.html")
-
-        headers = [cell.value for cell in sheet[1]]
-        required_columns = ["Item"]
-        if not all(col in headers for col in required_columns):
-            messages.error(request, "文件格式错误，缺少必要的列。")
-            return render(request, "import_data.html")
-
-        column_index = {header: headers.index(header) for header in headers}
-        items_to_create = []
-        errors = []
+        # 每批写入后记录进度，可通过 import_progress 查询
+        progress_key = f"import-progress:{user.pk}"
 
-        # Proficiency 字段的映射
-        proficiency_map = {
-            "Unfamiliar": Proficiency.UNFAMILIAR,
-            "Mastered": Proficiency.MASTERED,
-        }
-
-        for row_idx, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-            try:
-                item_name = row[column_index["Item"]]
-                if not item_name:
-                    errors.append(f"第 {row_idx} 行缺少 Item 字段，已跳过。")
-                    continue
-
-                content_index = column_index.get("Content")
-                content = row[content_index] if content_index is not None else ""
-                # 替换 _x000D_ 字符为换行符，先检查是否为 None
-                if content:
-                    content = content.replace("_x000D_", "\n")
-                else:
-                    content = ""  # 如果 content 为 None，赋空字符串
-
-                input_date_index = column_index.get("Input Date")
-                input_date = row[input_date_index] if input_date_index is not None else now().date()
-
-                init_date_index = column_index.get("Init Date")
-                init_date = row[init_date_index] if init_date_index is not None else now().date()
-
-                # 处理 Proficiency 字段
-                proficiency_name = row[column_index.get("Proficiency", None)] or "Unfamiliar"
-                proficiency_degree = proficiency_map.get(proficiency_name, Proficiency.UNFAMILIAR)
-
-                category_index = column_index.get("Category")
-                category_name = row[category_index] if category_index is not None else ""
-
-                # 获取分类对象
-                category = None
-                if category_name:
-                    categories = Category.objects.filter(name=category_name, user=user)
-                    if categories.exists():
-                        category = categories.first()
-                    else:
-                        category = Category.objects.create(name=category_name, user=user)
-
-                # 初始化这些字段为默认值
-                src_tts = ""
-                phonetic_am = ""
-                phonetic_en = ""
-
-                # 只有类别为“单词”的条目才调用获取翻译的功能
-                if fetch_definitions and category and category.name == "单词":
-                    updated_content, src_tts, phonetic_am, phonetic_en = fetch_and_merge_translation(item_name, content)
-                    # 更新内容
-                    content = updated_content
-
-                item = Item(
-                    user=user,
-                    item=item_name,
-                    content=content,
-                    inputDate=input_date,
-                    initDate=init_date,
-                    proficiency=proficiency_degree,
-                    category=category,
-                    src_tts=src_tts,
-                    us_phonetic=phonetic_am,
-                    uk_phonetic=phonetic_en,
-                )
-                items_to_create.append(item)
-
-            except Exception as e:
-                errors.append(f"第 {row_idx} 行处理失败: {str(e)}")
+        def report_progress(result, done=False):
+            cache.set(progress_key, {
+                'done': done,
+                'rows_processed': result.rows_processed,
+                'success_count': result.success_count,
+                'error_count': result.error_count,
+            }, timeout=3600)
 
         try:
-            with transaction.atomic():
-                Item.objects.bulk_create(items_to_create)
-            success_message = f"导入完成。成功导入 {len(items_to_create)} 条记录，{len(errors)} 条记录跳过。"
-            messages.success(request, success_message)
+            result = import_items(user, file, fetch_definitions, progress=report_progress)
+        except ImportFormatError as e:
+            messages.error(request, str(e))
+            return render(request, "import_data.html")
         except Exception as e:
+            cache.delete(progress_key)
             messages.error(request, f"保存失败: {str(e)}")
+            return render(request, "import_data.html")
+
+        # 最终进度直接由本次导入的计数生成，不依赖缓存中的条目（可能已过期或被淘汰）
+        report_progress(result, done=True)
+        success_message = f"导入完成。成功导入 {result.success_count} 条记录，{result.error_count} 条记录跳过。"
+        messages.success(request, success_message)
 
         return render(request, "import_data.html", {
             "import_results": {
-                "success_count": len(items_to_create),
-                "errors": errors,
+                "success_count": result.success_count,
+                "errors": result.errors,
             }
         })
 
@@ -739,25 +803,19 @@ def import_items_from_excel(request):
     return render(request, "import_data.html")
 
 
+@login_required
+def import_progress(request):
+    """
+    查询当前用户最近一次导入的进度。
+    """
+    progress = cache.get(f"import-progress:{request.user.pk}")
+    if progress is None:
+        return JsonResponse({'success': False, 'message': 'No import in progress.'})
+    return JsonResponse({'success': True, 'progress': progress})
 
 
-@staticmethod
-def compare_lines(existing_lines, new_lines):
-    existing = [line.strip() for line in existing_lines.splitlines() if line.strip()]
-    new = [line.strip() for line in new_lines.splitlines() if line.strip()]
-
-    result = []
-    existing_set = set(existing)
-
-    # 逐行比较
-    for line in existing:
-        result.append(line)
 
-    for new_line in new:
-        if not any(difflib.SequenceMatcher(None, new_line, e_line).ratio() > 0.8 for e_line in existing_set):
-            result.append(new_line)
 
-    return "\n".join(result)
 def about(request):
     return render(request, 'about.html')  # 渲染 about.html 页面
 
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 
 from pathlib import Path
 import environ
+from django.core.exceptions import ImproperlyConfigured
 
 env = environ.Env(
     DEBUG=(bool, False)
@@ -45,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "EAW.metrics.MetricsMiddleware",  # 请求耗时统计，放在最前面以包含其他中间件的耗时
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -58,7 +60,7 @@ ROOT_URLCONF = "EbbinghausAnywhere.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "EAW.metrics.TimedDjangoTemplates",  # DjangoTemplates，另外记录模板渲染耗时
         "DIRS": [BASE_DIR / 'templates',],  # 确保包含全局模板路径
         "APP_DIRS": True,
         "OPTIONS": {
@@ -122,6 +124,57 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / "staticfiles"  # 收集的静态文件最终存放路径
 
+# 安装了 whitenoise 时由 WhiteNoise 直接提供静态文件。
+# STATIC_MANIFEST=True（Docker 镜像中设置）时 collectstatic 生成带哈希的文件名和 gzip / brotli 预压缩版本，
+# 响应带长期缓存头；这种存储要求先运行 collectstatic，否则 {% static %} 找不到清单条目会报错，
+# 因此默认（本地开发和测试）仍使用普通的 StaticFilesStorage
+STATIC_MANIFEST = env.bool('STATIC_MANIFEST', default=False)
+try:
+    import whitenoise  # noqa: F401
+except ImportError:
+    pass
+else:
+    MIDDLEWARE.insert(MIDDLEWARE.index("django.middleware.security.SecurityMiddleware") + 1,
+                      "whitenoise.middleware.WhiteNoiseMiddleware")
+    if STATIC_MANIFEST:
+        STORAGES = {
+            "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+            "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+        }
+
+# 缓存：复习页面的弹窗片段、搜索联想、各类统计和按用户缓存的页面都存放在这里。
+# CACHE_BACKEND 可选 locmem（进程内，默认）、file（文件，多个 worker 共享）、
+# db（数据库表，需先运行 python manage.py createcachetable）或 redis（需安装 redis 包）。
+# 运行多个 worker 进程时应使用可共享的后端，否则一个进程中的写入无法使其他进程的缓存失效
+CACHE_BACKEND = env.str('CACHE_BACKEND', default='locmem')
+CACHE_BACKENDS = {
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "ebbinghaus"),
+    "file": ("django.core.cache.backends.filebased.FileBasedCache", str(BASE_DIR / "cache")),
+    "db": ("django.core.cache.backends.db.DatabaseCache", "eaw_cache"),
+    "redis": ("django.core.cache.backends.redis.RedisCache", "redis://127.0.0.1:6379/1"),
+}
+if CACHE_BACKEND == "redis":
+    try:
+        import redis  # noqa: F401
+    except ImportError:
+        # 未安装 redis 包时退回到文件缓存，仍可在多个 worker 之间共享
+        import warnings
+        warnings.warn("CACHE_BACKEND=redis but the redis package is not installed, using the file cache instead.")
+        CACHE_BACKEND = "file"
+if CACHE_BACKEND not in CACHE_BACKENDS:
+    raise ImproperlyConfigured(f"Unknown CACHE_BACKEND: {CACHE_BACKEND}")
+
+_cache_backend, _cache_location = CACHE_BACKENDS[CACHE_BACKEND]
+CACHES = {
+    "default": {
+        "BACKEND": _cache_backend,
+        "LOCATION": env.str('CACHE_LOCATION', default=_cache_location),
+        "KEY_PREFIX": env.str('CACHE_KEY_PREFIX', default="eaw"),
+        # 默认的 300 条容量放不下一天的复习弹窗，会导致片段反复被淘汰和重新渲染
+        "OPTIONS": {} if CACHE_BACKEND == "redis" else {"MAX_ENTRIES": env.int('CACHE_MAX_ENTRIES', default=20000)},
+    }
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
@@ -17,7 +17,6 @@ from django.urls import path, re_path
 from django.conf.urls import include
 from django.views.generic import RedirectView
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
 
 
@@ -25,6 +24,3 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path('', include('EAW.urls')),  # 直接挂载 EAW.urls，不再加 accounts/ 前缀
 ]
-
-# 静态文件支持
-urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -0,0 +1,34 @@
+#!/bin/sh
+# 容器启动脚本
+#   SERVER_MODE=wsgi（默认）  gunicorn + gthread worker
+#   SERVER_MODE=asgi          gunicorn + uvicorn worker
+#   SERVER_MODE=dev           Django 开发服务器（runserver），仅用于调试
+#   SERVER_MODE=worker        后台获取释义的 worker（ENRICHMENT_IN_BACKGROUND=True 时需要单独运行一个）
+#   RUN_MIGRATIONS=1          启动前执行数据库迁移
+# 传入其他命令时直接执行，例如：docker run ewa python manage.py rebuild_search_index
+set -e
+
+if [ "$#" -gt 0 ]; then
+    exec "$@"
+fi
+
+if [ "${RUN_MIGRATIONS:-0}" = "1" ]; then
+    python manage.py migrate --noinput
+fi
+
+# 使用数据库缓存时需要缓存表，已存在时该命令不做任何操作
+if [ "${CACHE_BACKEND:-}" = "db" ]; then
+    python manage.py createcachetable
+fi
+
+case "${SERVER_MODE:-wsgi}" in
+    dev)
+        exec python manage.py runserver 0.0.0.0:8000
+        ;;
+    worker)
+        exec python manage.py run_enrichment_worker
+        ;;
+    *)
+        exec gunicorn -c gunicorn.conf.py
+        ;;
+esac
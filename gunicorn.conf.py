@@ -0,0 +1,40 @@
+# gunicorn.conf.py
+# 生产环境的 gunicorn 配置，docker-entrypoint.sh 通过 `gunicorn -c gunicorn.conf.py` 使用。
+# 所有参数都可以用环境变量覆盖。
+
+import multiprocessing
+import os
+
+# 运行方式：wsgi 使用 gthread worker（每个进程多个线程），asgi 使用 uvicorn worker
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi').lower()
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# 进程数默认按 CPU 核数计算（2 * 核数 + 1），容器限制了 CPU 时请显式设置
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'EbbinghausAnywhere.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'EbbinghausAnywhere.wsgi:application'
+    worker_class = 'gthread'
+    # 每个进程的线程数：请求大多在等待数据库和百度翻译接口，多线程可以提高并发
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# 单个请求的超时时间（秒），导入大文件时可能需要调大
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# worker 处理这么多请求后重启，避免内存缓慢增长；加上随机抖动，防止所有 worker 同时重启
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# 访问日志和错误日志输出到标准输出 / 标准错误，由 docker logs 收集
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+# 容器中使用内存文件系统存放心跳文件，避免 /tmp 在 overlay 文件系统上导致 worker 被误判超时
+worker_tmp_dir = os.environ.get('GUNICORN_WORKER_TMP_DIR', '/dev/shm' if os.path.isdir('/dev/shm') else None)
@@ -0,0 +1,119 @@
+// 复习条目详情按需加载：页面只包含条目列表，弹窗在条目滚动到可见区域或被点击时批量获取
+var ReviewDetails = (function () {
+  "use strict";
+
+  var BATCH_SIZE = 50;      // 每次请求最多获取的条目数量，与服务器的 REVIEW_DETAILS_BATCH_LIMIT 一致
+  var BATCH_DELAY = 100;    // 收集可见条目的等待时间（毫秒），滚动时合并为一次请求
+
+  var url = '/api/review-items/';
+  var container = null;
+  var loaded = new Set();   // 已插入页面的条目 id
+  var requested = new Map(); // 条目 id -> 正在进行的请求
+  var queued = new Set();
+  var timer = null;
+  var observer = null;
+
+  function init(options) {
+    url = options.url || url;
+    container = options.container;
+    loaded.clear();
+    requested.clear();
+    queued.clear();
+    if (observer) {
+      observer.disconnect();
+    }
+    observer = 'IntersectionObserver' in window
+      ? new IntersectionObserver(onIntersect, { rootMargin: '200px' })
+      : null;
+  }
+
+  // 观察 root 中的条目行，点击行时打开对应的弹窗
+  function observe(root) {
+    root.querySelectorAll('[data-item-id]').forEach(function (row) {
+      row.addEventListener('click', function () { open(row.getAttribute('data-item-id')); });
+      if (observer) {
+        observer.observe(row);
+      }
+    });
+  }
+
+  function onIntersect(entries) {
+    entries.forEach(function (entry) {
+      if (entry.isIntersecting) {
+        observer.unobserve(entry.target);
+        enqueue(entry.target.getAttribute('data-item-id'));
+      }
+    });
+  }
+
+  function enqueue(id) {
+    if (loaded.has(id) || requested.has(id)) {
+      return;
+    }
+    queued.add(id);
+    clearTimeout(timer);
+    timer = setTimeout(flushQueue, BATCH_DELAY);
+  }
+
+  function flushQueue() {
+    var ids = Array.from(queued);
+    queued.clear();
+    for (var i = 0; i < ids.length; i += BATCH_SIZE) {
+      load(ids.slice(i, i + BATCH_SIZE));
+    }
+  }
+
+  // 批量获取条目详情并插入弹窗，返回在全部插入后完成的 Promise
+  function load(ids) {
+    ids = ids.filter(function (id) { return !loaded.has(id); });
+    var pending = ids.filter(function (id) { return requested.has(id); })
+      .map(function (id) { return requested.get(id); });
+    ids = ids.filter(function (id) { return !requested.has(id); });
+
+    if (ids.length) {
+      // 使用浏览器的 HTTP 缓存：重复访问时带上 If-None-Match / If-Modified-Since，未变化时服务器返回 304
+      var request = fetch(url + '?ids=' + ids.join(','), { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+        .then(function (response) {
+          if (!response.ok) throw new Error('加载条目详情失败');
+          return response.json();
+        })
+        .then(function (data) {
+          var nodes = [];
+          Object.keys(data.items).forEach(function (id) {
+            if (loaded.has(id)) return;
+            var wrapper = document.createElement('div');
+            wrapper.innerHTML = data.items[id];
+            var modal = wrapper.firstElementChild;
+            container.appendChild(modal);
+            nodes.push(modal);
+            loaded.add(id);
+          });
+          if (window.MathJax && MathJax.typesetPromise && nodes.length) {
+            return MathJax.typesetPromise(nodes);
+          }
+        })
+        .finally(function () {
+          ids.forEach(function (id) { requested.delete(id); });
+        });
+      ids.forEach(function (id) { requested.set(id, request); });
+      pending.push(request);
+    }
+    return Promise.all(pending);
+  }
+
+  function open(id) {
+    load([String(id)])
+      .then(function () {
+        var element = document.getElementById('myModal' + id);
+        if (element) {
+          bootstrap.Modal.getOrCreateInstance(element).show();
+        }
+      })
+      .catch(function (error) {
+        console.error(error);
+        alert('加载失败，请稍后重试');
+      });
+  }
+
+  return { init: init, observe: observe, load: load, open: open };
+})();
@@ -0,0 +1,77 @@
+// 复习反馈缓冲：点击 YES / NO / RESET 后先在页面上更新，再定期批量提交到服务器
+var ReviewFeedback = (function () {
+  "use strict";
+
+  var MASTERY_LABELS = { yes: 'Mastered', no: 'Unfamiliar', reset: 'Unfamiliar' };
+  var FLUSH_DELAY = 5000;   // 最后一次点击后多久提交（毫秒）
+  var FLUSH_SIZE = 20;      // 缓冲达到这么多条时立即提交
+
+  var url = '/review-feedback/batch/';
+  var csrfToken = '';
+  var onError = function (message) { alert("操作失败：" + message); };
+  var buffer = new Map();   // 条目 id -> 操作，同一条目只保留最后一次操作
+  var timer = null;
+
+  function init(options) {
+    url = options.url || url;
+    csrfToken = options.csrfToken || csrfToken;
+    onError = options.onError || onError;
+
+    // 离开页面或切换到后台时提交剩余的反馈，keepalive 保证页面关闭后请求仍会发出
+    window.addEventListener('pagehide', function () { flush(true); });
+    document.addEventListener('visibilitychange', function () {
+      if (document.visibilityState === 'hidden') {
+        flush(true);
+      }
+    });
+  }
+
+  // 记录一次反馈，返回页面上应显示的掌握程度
+  function queue(id, action) {
+    buffer.set(String(id), action);
+    clearTimeout(timer);
+    if (buffer.size >= FLUSH_SIZE) {
+      flush(false);
+    } else {
+      timer = setTimeout(function () { flush(false); }, FLUSH_DELAY);
+    }
+    return MASTERY_LABELS[action];
+  }
+
+  function flush(keepalive) {
+    clearTimeout(timer);
+    if (buffer.size === 0) {
+      return;
+    }
+    var entries = Array.from(buffer, function (entry) { return { id: entry[0], action: entry[1] }; });
+    buffer.clear();
+
+    fetch(url, {
+      method: 'POST',
+      keepalive: keepalive,
+      headers: {
+        'Content-Type': 'application/json',
+        'X-CSRFToken': csrfToken,
+      },
+      body: JSON.stringify({ feedback: entries }),
+    })
+    .then(function (response) { return response.json(); })
+    .then(function (response) {
+      if (!response.success) {
+        onError(response.message);
+      }
+    })
+    .catch(function (error) {
+      // 网络错误时放回缓冲区，之后再试（不覆盖期间的新操作）
+      console.error("Error:", error);
+      entries.forEach(function (entry) {
+        if (!buffer.has(entry.id)) {
+          buffer.set(entry.id, entry.action);
+        }
+      });
+      timer = setTimeout(function () { flush(false); }, FLUSH_DELAY);
+    });
+  }
+
+  return { init: init, queue: queue, flush: flush };
+})();